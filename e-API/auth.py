@@ -1,11 +1,18 @@
 from datetime import timedelta, datetime
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, Body, Path
+from fastapi import APIRouter, Depends, HTTPException, Body, Path, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from starlette import status
-from database import db_dependency, get_db
-from models import Users, Orders
+from database import db_dependency, async_db_dependency, get_db
+from models import Users, Orders, TokenPurpose, UserToken
+from user_tokens import issue_token, find_token
+from token_revocation import revocation_cache, revoke_access_token
+from rate_limit import client_ip, enforce_account_limit
+from user_stats import bump_user_stats
+from user_search import index_users, unindex_user
+import uuid
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 from pydantic_models import (
@@ -19,15 +26,16 @@ from pydantic_models import (
     EmailVerificationRequest,
     ResendVerificationRequest,
     EmailVerificationResponse,
+    RefreshTokenRequest,
+    LogoutRequest,
 )
 
 # from main import create_user_model
-from passlib.context import CryptContext
+from password_hashing import bcrypt_context, password_hasher
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
 import os
 from dotenv import load_dotenv
 import logging
-import secrets
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -48,7 +56,6 @@ ALGORITHM = "HS256"
 FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", "http://localhost:5173")
 
 # Security contexts
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # Email configuration
@@ -78,12 +85,14 @@ conf = ConnectionConfig(
 )
 
 
-# Helper functions
-def generate_verification_token():
-    """Generate a secure verification token"""
-    return secrets.token_urlsafe(32)
+# Token lifetimes
+VERIFICATION_TOKEN_TTL = timedelta(hours=24)
+RESET_TOKEN_TTL = timedelta(minutes=30)
+ACCESS_TOKEN_TTL = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15")))
+REFRESH_TOKEN_TTL = timedelta(days=int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14")))
 
 
+# Helper functions
 def send_verification_email(email: str, username: str, token: str):
     """Send verification email using SMTP"""
     try:
@@ -245,7 +254,7 @@ def send_admin_new_order_notification(order: dict):
 
 
 # User creation helper
-def create_user_model(user_request, role: Role, db: Session):
+async def create_user_model(user_request, role: Role, db: Session):
     """Helper function to create user with proper error handling"""
     existing_user = (
         db.query(Users)
@@ -258,27 +267,33 @@ def create_user_model(user_request, role: Role, db: Session):
     if existing_user:
         raise HTTPException(status_code=400, detail="Username or email already exists")
 
+    # Outside the try: a saturated hasher's 503 + Retry-After must reach the client
+    hashed_password = await password_hasher.hash(user_request.password)
+
     try:
-        # Generate verification token for customers
+        # Customers need email verification; admins/superadmins do not
+        is_verified = role != Role.CUSTOMER
         verification_token = None
-        is_verified = True  # Default to True for admins/superadmins
-
-        if role == Role.CUSTOMER:
-            verification_token = generate_verification_token()
-            is_verified = False  # Customers need email verification
 
         user_model = Users(
             username=user_request.username,
             email=user_request.email,
-            hashed_password=bcrypt_context.hash(user_request.password),
+            hashed_password=hashed_password,
             role=role.value,
             is_verified=is_verified,
-            verification_token=verification_token,
-            verification_expires=(
-                datetime.utcnow() + timedelta(hours=24) if verification_token else None
-            ),
         )
         db.add(user_model)
+        db.flush()
+        bump_user_stats(db, role)
+        index_users(db, [(user_model.id, user_model.username, user_model.email)])
+
+        if not is_verified:
+            verification_token = issue_token(
+                db,
+                user_model.id,
+                TokenPurpose.EMAIL_VERIFICATION,
+                VERIFICATION_TOKEN_TTL,
+            )
         db.commit()
         db.refresh(user_model)
 
@@ -299,13 +314,21 @@ def create_user_model(user_request, role: Role, db: Session):
         raise HTTPException(status_code=500, detail=f"Failed to create {role.value}")
 
 
-def authenticate_user(email: str, password: str, db: Session):
+async def authenticate_user(email: str, password: str, db: AsyncSession):
     """Authenticate user by email and password"""
-    user = db.query(Users).filter(Users.email == email).first()
+    user = await db.scalar(select(Users).filter(Users.email == email))
     if not user:
         raise HTTPException(status_code=404, detail="User does not exist")
-    if not bcrypt_context.verify(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(
+        password, user.hashed_password
+    )
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid password")
+    if new_hash:
+        # Work factor changed since this hash was made; upgrade it in place
+        user.hashed_password = new_hash
+        await db.commit()
+        logger.info(f"Rehashed password for user {user.id}")
     return user
 
 
@@ -315,10 +338,30 @@ def create_access_token(
     """Create JWT access token"""
     encode = {"sub": username, "id": user_id, "role": role}
     expires = datetime.utcnow() + expires_delta
-    encode.update({"exp": expires})
+    # jti identifies the token so it can be revoked before it expires
+    encode.update({"exp": expires, "jti": uuid.uuid4().hex})
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def issue_session_tokens(user: Users, db: Session) -> dict:
+    """Short-lived access token plus a rotating refresh token; caller commits"""
+    user_role = get_user_role(user.role)
+    access_token = create_access_token(
+        user.username, user.id, user_role, ACCESS_TOKEN_TTL
+    )
+    refresh_token = issue_token(
+        db, user.id, TokenPurpose.REFRESH, REFRESH_TOKEN_TTL, replace_existing=False
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": int(ACCESS_TOKEN_TTL.total_seconds()),
+        "user_role": user_role,
+        "username": user.username,
+    }
+
+
 async def get_active_user(token: Annotated[str, Depends(oauth2_bearer)]):
     """Get current active user from JWT token"""
     try:
@@ -328,7 +371,16 @@ async def get_active_user(token: Annotated[str, Depends(oauth2_bearer)]):
         role: str = payload.get("role")
         if username is None or user_id is None or role is None:
             raise HTTPException(status_code=401, detail="Could not validate user")
-        return {"username": username, "id": user_id, "role": role}
+        jti = payload.get("jti")
+        if jti and revocation_cache.is_revoked(jti):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return {
+            "username": username,
+            "id": user_id,
+            "role": role,
+            "jti": jti,
+            "exp": payload.get("exp"),
+        }
     except jwt.ExpiredSignatureError:
         logger.warning("Token expired")
         raise HTTPException(status_code=401, detail="Token has expired")
@@ -368,12 +420,25 @@ def require_admin_or_above(current_user: dict = Depends(get_active_user)):
     return current_user
 
 
+@router.get("/superadmin/password-hashing/metrics", status_code=status.HTTP_200_OK)
+async def password_hashing_metrics(current_user: dict = Depends(require_superadmin)):
+    """Password hashing pool utilisation and queueing metrics"""
+    return password_hasher.snapshot()
+
+
 # Authentication endpoints
 @router.post("/login", response_model=Token)
-async def login(form_data: LoginUserRequest, db: db_dependency):
+async def login(
+    form_data: LoginUserRequest, request: Request, db: async_db_dependency
+):
     """User login endpoint - Works for all roles"""
     logger.info(f"Login attempt for email: {form_data.email}")
-    user = authenticate_user(form_data.email, form_data.password, db)
+    # Keyed by account and caller, so guessing at someone's password from
+    # elsewhere can't lock them out; the per-IP budget still gates first
+    await enforce_account_limit(
+        "login", f"{form_data.email}@{client_ip(request.scope)}"
+    )
+    user = await authenticate_user(form_data.email, form_data.password, db)
 
     # Check if customer account is verified
     if user.role == Role.CUSTOMER.value and not user.is_verified:
@@ -382,15 +447,57 @@ async def login(form_data: LoginUserRequest, db: db_dependency):
             detail="Please verify your email address before logging in. Check your inbox for a verification link.",
         )
 
-    user_role = get_user_role(user.role)
-    token = create_access_token(user.username, user.id, user_role, timedelta(hours=1))
-    logger.info(f"User {user.username} logged in successfully with role: {user_role}")
-    return {
-        "access_token": token,
-        "token_type": "bearer",
-        "user_role": user_role,
-        "username": user.username,
-    }
+    tokens = await db.run_sync(lambda session: issue_session_tokens(user, session))
+    await db.commit()
+    logger.info(
+        f"User {user.username} logged in successfully with role: {tokens['user_role']}"
+    )
+    return tokens
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_session(request: RefreshTokenRequest, db: db_dependency):
+    """Exchange a refresh token for a new access token; the refresh token rotates"""
+    token_record = find_token(db, request.refresh_token, TokenPurpose.REFRESH)
+    if not token_record:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if token_record.expires_at < datetime.utcnow():
+        db.delete(token_record)
+        db.commit()
+        raise HTTPException(status_code=401, detail="Refresh token has expired")
+
+    user = token_record.user
+    # Only the request whose delete lands may rotate; a concurrent refresh
+    # of the same token finds it already gone
+    deleted = db.query(UserToken).filter(UserToken.id == token_record.id).delete()
+    if deleted != 1:
+        db.rollback()
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    tokens = issue_session_tokens(user, db)
+    db.commit()
+    return tokens
+
+
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(
+    request: LogoutRequest,
+    db: db_dependency,
+    current_user: dict = Depends(get_active_user),
+):
+    """Revoke the current access token and, if given, its refresh token"""
+    if current_user.get("jti"):
+        revoke_access_token(
+            db,
+            current_user["jti"],
+            datetime.utcfromtimestamp(current_user["exp"]),
+        )
+    if request.refresh_token:
+        token_record = find_token(db, request.refresh_token, TokenPurpose.REFRESH)
+        if token_record and token_record.user_id == current_user["id"]:
+            db.delete(token_record)
+    db.commit()
+    logger.info(f"User {current_user['username']} logged out")
+    return {"message": "Logged out successfully"}
 
 
 @router.post(
@@ -404,6 +511,8 @@ async def verify_token(request_body: TokenVerifyRequest):
         payload = jwt.decode(request_body.token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         user_role: str = payload.get("role")
+        if payload.get("jti") and revocation_cache.is_revoked(payload["jti"]):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
         exp_timestamp = float(payload["exp"])
         exp_datetime = datetime.fromtimestamp(exp_timestamp)
 
@@ -428,7 +537,7 @@ async def create_admin_by_superadmin(
     logger.info(
         f"Superadmin {current_user['username']} creating admin: {create_admin_request.username}"
     )
-    user = create_user_model(create_admin_request, Role.ADMIN, db)
+    user = await create_user_model(create_admin_request, Role.ADMIN, db)
     logger.info(
         f"Admin {create_admin_request.username} created by superadmin {current_user['username']}"
     )
@@ -452,7 +561,7 @@ async def register_superadmin(
             detail="Superadmin already exists. Only one superadmin is allowed.",
         )
 
-    user = create_user_model(create_user_request, Role.SUPERADMIN, db)
+    user = await create_user_model(create_user_request, Role.SUPERADMIN, db)
     logger.info(f"Superadmin {create_user_request.username} registered successfully")
     return {"message": "Superadmin created successfully", "user_id": user.id}
 
@@ -483,6 +592,8 @@ async def delete_user(
             )
 
         user_username = user.username
+        bump_user_stats(db, user.role, -1, user.created_at)
+        unindex_user(db, user_id)
         db.delete(user)
         db.commit()
 
@@ -507,7 +618,8 @@ async def delete_user(
 async def register_customer(db: db_dependency, create_user_request: CreateUserRequest):
     """Register a new customer - Public endpoint"""
     logger.info(f"Customer registration attempt for: {create_user_request.username}")
-    user = create_user_model(create_user_request, Role.CUSTOMER, db)
+    await enforce_account_limit("register", create_user_request.email)
+    user = await create_user_model(create_user_request, Role.CUSTOMER, db)
     logger.info(f"Customer {create_user_request.username} registered successfully")
     return {"message": "Customer created successfully", "user_id": user.id}
 
@@ -521,46 +633,31 @@ async def register_customer(db: db_dependency, create_user_request: CreateUserRe
 async def verify_email(request: EmailVerificationRequest, db: db_dependency):
     """Verify email address using verification token"""
     try:
-        # Find user with the verification token
-        user = (
-            db.query(Users)
-            .filter(
-                Users.verification_token == request.token, Users.is_verified == False
-            )
-            .first()
-        )
+        # Find the verification token by its digest
+        token_record = find_token(db, request.token, TokenPurpose.EMAIL_VERIFICATION)
 
-        if not user:
+        if not token_record or token_record.user.is_verified:
             raise HTTPException(
                 status_code=400, detail="Invalid or expired verification token"
             )
 
         # Check if token has expired
-        if user.verification_expires and user.verification_expires < datetime.utcnow():
+        if token_record.expires_at < datetime.utcnow():
             raise HTTPException(
                 status_code=400, detail="Verification token has expired"
             )
 
-        # Mark user as verified
+        # Mark user as verified and consume the token
+        user = token_record.user
         user.is_verified = True
-        user.verification_token = None
-        user.verification_expires = None
-        db.commit()
+        db.delete(token_record)
 
-        # Create access token for automatic login
-        user_role = get_user_role(user.role)
-        access_token = create_access_token(
-            user.username, user.id, user_role, timedelta(hours=1)
-        )
+        # Create session tokens for automatic login
+        tokens = issue_session_tokens(user, db)
+        db.commit()
 
         logger.info(f"Email verified for user: {user.username}")
-        return {
-            "message": "Email verified successfully",
-            "access_token": access_token,
-            "token_type": "bearer",
-            "user_role": user_role,
-            "username": user.username,
-        }
+        return {"message": "Email verified successfully", **tokens}
 
     except HTTPException:
         raise
@@ -574,6 +671,7 @@ async def resend_verification_email(
     request: ResendVerificationRequest, db: db_dependency
 ):
     """Resend verification email for unverified users"""
+    await enforce_account_limit("resend_verification", request.user_id)
     try:
         user = (
             db.query(Users)
@@ -586,10 +684,10 @@ async def resend_verification_email(
                 status_code=404, detail="User not found or already verified"
             )
 
-        # Generate new verification token
-        new_token = generate_verification_token()
-        user.verification_token = new_token
-        user.verification_expires = datetime.utcnow() + timedelta(hours=24)
+        # Generate new verification token, replacing the previous one
+        new_token = issue_token(
+            db, user.id, TokenPurpose.EMAIL_VERIFICATION, VERIFICATION_TOKEN_TTL
+        )
         db.commit()
 
         # Send new verification email
@@ -617,13 +715,12 @@ async def request_password_reset(
     email: str = Body(..., embed=True), db: Session = Depends(get_db)
 ):
     """Request a password reset: send email with reset link if user exists."""
+    await enforce_account_limit("password_reset", email)
     user = db.query(Users).filter(Users.email == email).first()
     if not user:
         # Don't reveal if user exists
         return {"message": "If the email exists, a reset link has been sent."}
-    token = generate_verification_token()
-    user.reset_token = token
-    user.reset_token_expires = datetime.utcnow() + timedelta(minutes=30)
+    token = issue_token(db, user.id, TokenPurpose.PASSWORD_RESET, RESET_TOKEN_TTL)
     db.commit()
     # Send reset email
     reset_url = f"{FRONTEND_BASE_URL}/reset-password?token={token}"
@@ -657,16 +754,16 @@ async def reset_password(
     token: str = Body(...), new_password: str = Body(...), db: Session = Depends(get_db)
 ):
     """Reset password using token and new password."""
-    user = db.query(Users).filter(Users.reset_token == token).first()
-    if (
-        not user
-        or not user.reset_token_expires
-        or user.reset_token_expires < datetime.utcnow()
-    ):
+    token_record = find_token(db, token, TokenPurpose.PASSWORD_RESET)
+    if not token_record or token_record.expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="Invalid or expired reset token.")
-    user.hashed_password = bcrypt_context.hash(new_password)
-    user.reset_token = None
-    user.reset_token_expires = None
+    user = token_record.user
+    user.hashed_password = await password_hasher.hash(new_password)
+    db.delete(token_record)
+    # A password reset signs out every other session
+    db.query(UserToken).filter(
+        UserToken.user_id == user.id, UserToken.purpose == TokenPurpose.REFRESH
+    ).delete(synchronize_session=False)
     db.commit()
     logger.info(f"Password reset for user {user.email}")
     return {"message": "Password has been reset successfully."}
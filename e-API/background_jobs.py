@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from auth import require_admin_or_above
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin/jobs", tags=["Jobs"])
+
+# Finished jobs are kept for polling until this many newer jobs exist
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))
+
+
+class Job:
+    """A long-running admin task executed on a worker thread.
+
+    Jobs live in this process only; poll the worker that accepted the job
+    (or run a single worker for admin traffic).
+    """
+
+    def __init__(self, kind: str, requested_by: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.requested_by = requested_by
+        self.status = "queued"
+        self.processed = 0
+        self.total: Optional[int] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    def report(self, processed: int, total: Optional[int] = None):
+        """Called from the job body to publish progress"""
+        self.processed = processed
+        if total is not None:
+            self.total = total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "progress": (
+                round(self.processed / self.total * 100, 1) if self.total else None
+            ),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobRegistry:
+    def __init__(self, history_size: int = JOB_HISTORY_SIZE):
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks = set()
+        self._history_size = history_size
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def running(self, kind: str) -> Optional[Job]:
+        for job in self._jobs.values():
+            if job.kind == kind and job.status in ("queued", "running"):
+                return job
+        return None
+
+    def start(
+        self, kind: str, fn: Callable[[Job], Any], requested_by: Optional[int] = None
+    ) -> Job:
+        """Run fn(job) on a worker thread; its return value becomes job.result"""
+        job = Job(kind, requested_by)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._history_size:
+            oldest = next(iter(self._jobs.values()))
+            if oldest.status in ("queued", "running"):
+                break
+            self._jobs.popitem(last=False)
+
+        task = asyncio.create_task(self._run(job, fn))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, fn: Callable[[Job], Any]):
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        try:
+            job.result = await asyncio.to_thread(fn, job)
+            job.status = "succeeded"
+            logger.info(f"Job {job.kind} {job.id} finished: {job.result}")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Job {job.kind} {job.id} failed: {str(e)}")
+        finally:
+            job.finished_at = datetime.utcnow()
+
+
+jobs = JobRegistry()
+
+
+@router.get("/{job_id}", status_code=status.HTTP_200_OK)
+async def get_job(job_id: str, current_user: dict = Depends(require_admin_or_above)):
+    """Status and progress of a background job"""
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the public product endpoints.
+
+Fires requests from N concurrent clients at a running API and reports
+throughput and latency percentiles. Run it against the async handlers and
+against the previous (sync-session) build to compare, e.g.:
+
+    uvicorn main:app --workers 1 &
+    python benchmark_concurrency.py --concurrency 200 --requests 5000
+
+A single uvicorn worker makes the comparison meaningful: with a blocking
+session every query stalls that worker's event loop, so latency grows
+with concurrency; with the async session queries overlap.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_benchmark(base_url: str, paths, concurrency: int, total: int):
+    latencies = []
+    errors = 0
+    issued = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+
+        async def worker():
+            nonlocal issued, errors
+            while issued < total:
+                path = paths[issued % len(paths)]
+                issued += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API concurrency")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument(
+        "--path",
+        action="append",
+        dest="paths",
+        help="Path to request (repeatable); defaults to browse and product detail",
+    )
+    parser.add_argument("--product-id", type=int, default=1)
+    args = parser.parse_args()
+
+    paths = args.paths or [
+        "/public/products?page=1&limit=8",
+        f"/public/products/{args.product_id}",
+    ]
+    latencies, errors, elapsed = asyncio.run(
+        run_benchmark(args.url, paths, args.concurrency, args.requests)
+    )
+
+    print(f"Requests:     {len(latencies)} ({errors} errors)")
+    print(f"Concurrency:  {args.concurrency}")
+    print(f"Elapsed:      {elapsed:.2f}s")
+    print(f"Throughput:   {len(latencies) / elapsed:.1f} req/s")
+    print(f"Latency mean: {statistics.mean(latencies) * 1000:.1f} ms")
+    for pct in (50, 95, 99):
+        print(f"Latency p{pct}:  {percentile(latencies, pct) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Safaricom Daraja API (OAuth, STK push and STK query).
+Lets the full checkout/payment path run and be load-tested without network
+access to Safaricom.
+
+Start it with:
+    python daraja_simulator.py            # listens on :8001
+
+and point the API at it:
+    MPESA_LNMO_ENVIRONMENT=simulator
+    MPESA_SIMULATOR_URL=http://localhost:8001
+
+Callback behaviour is tuned through environment variables (or at runtime via
+PUT /simulator/config):
+    DARAJA_SIM_API_LATENCY_MS      delay before answering each API call
+    DARAJA_SIM_CALLBACK_LATENCY_MS mean delay before the callback fires
+    DARAJA_SIM_CALLBACK_JITTER_MS  +/- random spread around that delay
+    DARAJA_SIM_FAILURE_RATE        fraction of payments that are cancelled
+    DARAJA_SIM_DUPLICATE_RATE      fraction of callbacks delivered twice
+    DARAJA_SIM_CALLBACK_URL        overrides the CallBackURL sent by the API
+"""
+
+import asyncio
+import logging
+import os
+import random
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi import FastAPI, Header, HTTPException
+from pydantic import BaseModel, Field
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Failed payments use the code Daraja returns when the customer cancels
+CANCELLED_RESULT_CODE = 1032
+MAX_TRACKED_REQUESTS = 100_000
+
+
+class SimulatorConfig(BaseModel):
+    api_latency_ms: float = Field(0, ge=0)
+    callback_latency_ms: float = Field(2000, ge=0)
+    callback_jitter_ms: float = Field(500, ge=0)
+    failure_rate: float = Field(0.1, ge=0, le=1)
+    duplicate_rate: float = Field(0.0, ge=0, le=1)
+    callback_url: Optional[str] = None
+
+
+config = SimulatorConfig(
+    api_latency_ms=float(os.getenv("DARAJA_SIM_API_LATENCY_MS", "0")),
+    callback_latency_ms=float(os.getenv("DARAJA_SIM_CALLBACK_LATENCY_MS", "2000")),
+    callback_jitter_ms=float(os.getenv("DARAJA_SIM_CALLBACK_JITTER_MS", "500")),
+    failure_rate=float(os.getenv("DARAJA_SIM_FAILURE_RATE", "0.1")),
+    duplicate_rate=float(os.getenv("DARAJA_SIM_DUPLICATE_RATE", "0.0")),
+    callback_url=os.getenv("DARAJA_SIM_CALLBACK_URL") or None,
+)
+
+app = FastAPI(title="Daraja Simulator")
+
+# CheckoutRequestID -> request state, oldest evicted first
+requests_by_checkout_id: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+issued_tokens: Dict[str, float] = {}
+stats = {
+    "stk_requests": 0,
+    "queries": 0,
+    "callbacks_sent": 0,
+    "callbacks_failed": 0,
+    "duplicates_sent": 0,
+}
+_pending_callbacks = set()
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+@app.on_event("startup")
+async def open_http_client():
+    global _http_client
+    _http_client = httpx.AsyncClient(timeout=10.0)
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    if _http_client:
+        await _http_client.aclose()
+
+
+async def simulate_api_latency():
+    if config.api_latency_ms:
+        await asyncio.sleep(config.api_latency_ms / 1000)
+
+
+def require_bearer(authorization: Optional[str]):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Invalid Access Token")
+    expires = issued_tokens.get(authorization[len("Bearer ") :])
+    if not expires or expires < time.time():
+        raise HTTPException(status_code=401, detail="Invalid Access Token")
+
+
+def callback_payload(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a callback in the shape pydantic_models.CallbackRequest expects"""
+    stk_callback = {
+        "merchantRequestID": record["merchant_request_id"],
+        "checkoutRequestID": record["checkout_request_id"],
+        "resultCode": record["result_code"],
+        "resultDesc": record["result_desc"],
+    }
+    if record["result_code"] == 0:
+        stk_callback["callbackMetadata"] = {
+            "item": [
+                {"name": "Amount", "value": str(record["amount"])},
+                {"name": "MpesaReceiptNumber", "value": record["receipt"]},
+                {
+                    "name": "TransactionDate",
+                    "value": datetime.now().strftime("%Y%m%d%H%M%S"),
+                },
+                {"name": "PhoneNumber", "value": str(record["phone_number"])},
+            ]
+        }
+    return {"body": {"stkCallback": stk_callback}}
+
+
+async def deliver_callback(record: Dict[str, Any]):
+    delay_ms = config.callback_latency_ms + random.uniform(
+        -config.callback_jitter_ms, config.callback_jitter_ms
+    )
+    await asyncio.sleep(max(delay_ms, 0) / 1000)
+
+    success = random.random() >= config.failure_rate
+    record["result_code"] = 0 if success else CANCELLED_RESULT_CODE
+    record["result_desc"] = (
+        "The service request is processed successfully."
+        if success
+        else "Request cancelled by user"
+    )
+    record["state"] = "completed"
+
+    deliveries = 2 if random.random() < config.duplicate_rate else 1
+    payload = callback_payload(record)
+    for attempt in range(deliveries):
+        try:
+            response = await _http_client.post(record["callback_url"], json=payload)
+            stats["callbacks_sent"] += 1
+            if attempt:
+                stats["duplicates_sent"] += 1
+            logger.info(
+                f"Callback for {record['checkout_request_id']} -> {response.status_code}"
+            )
+        except Exception as e:
+            stats["callbacks_failed"] += 1
+            logger.error(
+                f"Callback for {record['checkout_request_id']} failed: {str(e)}"
+            )
+
+
+def schedule_callback(record: Dict[str, Any]):
+    task = asyncio.create_task(deliver_callback(record))
+    _pending_callbacks.add(task)
+    task.add_done_callback(_pending_callbacks.discard)
+
+
+@app.get("/oauth/v1/generate")
+async def generate_token(grant_type: str, authorization: Optional[str] = Header(None)):
+    await simulate_api_latency()
+    if grant_type != "client_credentials" or not authorization:
+        raise HTTPException(status_code=400, detail="Invalid grant type")
+    now = time.time()
+    if len(issued_tokens) > MAX_TRACKED_REQUESTS:
+        for expired in [t for t, exp in issued_tokens.items() if exp < now]:
+            del issued_tokens[expired]
+    token = secrets.token_urlsafe(24)
+    issued_tokens[token] = now + 3599
+    return {"access_token": token, "expires_in": "3599"}
+
+
+@app.post("/mpesa/stkpush/v1/processrequest")
+async def process_request(
+    payload: Dict[str, Any], authorization: Optional[str] = Header(None)
+):
+    await simulate_api_latency()
+    require_bearer(authorization)
+    stats["stk_requests"] += 1
+
+    checkout_request_id = f"ws_CO_{datetime.now():%d%m%Y%H%M%S}{secrets.token_hex(6)}"
+    record = {
+        "merchant_request_id": f"{random.randint(10000, 99999)}-{secrets.token_hex(4)}",
+        "checkout_request_id": checkout_request_id,
+        "amount": payload.get("Amount"),
+        "phone_number": payload.get("PhoneNumber"),
+        "receipt": secrets.token_hex(5).upper(),
+        "callback_url": config.callback_url or payload.get("CallBackURL"),
+        "state": "pending",
+        "result_code": None,
+        "result_desc": None,
+    }
+    requests_by_checkout_id[checkout_request_id] = record
+    while len(requests_by_checkout_id) > MAX_TRACKED_REQUESTS:
+        requests_by_checkout_id.popitem(last=False)
+
+    schedule_callback(record)
+    return {
+        "MerchantRequestID": record["merchant_request_id"],
+        "CheckoutRequestID": checkout_request_id,
+        "ResponseCode": "0",
+        "ResponseDescription": "Success. Request accepted for processing",
+        "CustomerMessage": "Success. Request accepted for processing",
+    }
+
+
+@app.post("/mpesa/stkpushquery/v1/query")
+async def query_request(
+    payload: Dict[str, Any], authorization: Optional[str] = Header(None)
+):
+    await simulate_api_latency()
+    require_bearer(authorization)
+    stats["queries"] += 1
+
+    record = requests_by_checkout_id.get(payload.get("CheckoutRequestID"))
+    if not record:
+        raise HTTPException(status_code=404, detail="Invalid CheckoutRequestID")
+    if record["state"] == "pending":
+        return {
+            "requestId": record["checkout_request_id"],
+            "errorCode": "500.001.1001",
+            "errorMessage": "The transaction is being processed",
+        }
+    return {
+        "ResponseCode": "0",
+        "ResponseDescription": "The service request has been accepted successsfully",
+        "MerchantRequestID": record["merchant_request_id"],
+        "CheckoutRequestID": record["checkout_request_id"],
+        "ResultCode": str(record["result_code"]),
+        "ResultDesc": record["result_desc"],
+    }
+
+
+@app.get("/simulator/config", response_model=SimulatorConfig)
+async def get_config():
+    return config
+
+
+@app.put("/simulator/config", response_model=SimulatorConfig)
+async def update_config(new_config: SimulatorConfig):
+    global config
+    config = new_config
+    logger.info(f"Simulator config updated: {config}")
+    return config
+
+
+@app.get("/simulator/stats")
+async def get_stats():
+    return {
+        **stats,
+        "tracked_requests": len(requests_by_checkout_id),
+        "pending_callbacks": len(_pending_callbacks),
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("DARAJA_SIM_PORT", "8001")))
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from typing import Annotated
@@ -9,17 +11,73 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from db_pool import engine_options
+
 password = os.getenv("DB_PASSWORD")
 
 
 db_name = os.getenv("DB_NAME", "ecommerce")
 db_host = os.getenv("DB_HOST", "localhost")
-URL_DATABASE = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+replica_host = os.getenv("DB_REPLICA_HOST")
+# DATABASE_URL / REPLICA_DATABASE_URL override the MySQL settings, e.g.
+# sqlite:///primary.db and sqlite:///replica.db for local testing
+URL_DATABASE = (
+    os.getenv("DATABASE_URL")
+    or f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+)
+REPLICA_URL_DATABASE = os.getenv("REPLICA_DATABASE_URL") or (
+    f"mysql+pymysql://root:{password}@{replica_host}:3306/{db_name}"
+    if replica_host
+    else None
+)
+
+# Async drivers for the sync URLs above (sqlite needs aiosqlite installed)
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url: str):
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
 
-engine = create_engine(URL_DATABASE)
+
+ASYNC_URL_DATABASE = async_url(URL_DATABASE)
+
+# Pool sizing, recycle and pre-ping come from DB_POOL_* (see db_pool.py)
+engine = create_engine(URL_DATABASE, **engine_options("primary"))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Non-blocking engine for hot request paths; its own pool, same database.
+# Objects stay usable after commit because response models read them then.
+async_engine = create_async_engine(
+    ASYNC_URL_DATABASE, **engine_options("primary_async", is_async=True)
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+# Optional read replica; read-only handlers route here (see replica_routing.py)
+replica_engine = replica_async_engine = None
+ReplicaSessionLocal = AsyncReplicaSessionLocal = None
+if REPLICA_URL_DATABASE:
+    replica_engine = create_engine(REPLICA_URL_DATABASE, **engine_options("replica"))
+    ReplicaSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, bind=replica_engine
+    )
+    replica_async_engine = create_async_engine(
+        async_url(REPLICA_URL_DATABASE),
+        **engine_options("replica_async", is_async=True),
+    )
+    AsyncReplicaSessionLocal = async_sessionmaker(
+        replica_async_engine, autoflush=False, expire_on_commit=False
+    )
+
 Base = declarative_base()
 
 
@@ -30,4 +88,11 @@ def get_db():
     finally:
         db.close()
 
-db_dependency = Annotated[Session, Depends(get_db)]
\ No newline at end of file
+db_dependency = Annotated[Session, Depends(get_db)]
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async_db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
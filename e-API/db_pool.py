@@ -0,0 +1,110 @@
+"""
+Connection pool configuration and instrumentation.
+
+Pool sizing comes from the environment so it can be matched to the worker
+count: each worker holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+per engine, and that total across workers must stay below MySQL's
+max_connections. DB_POOL_RECYCLE must stay below MySQL's wait_timeout (and
+any proxy idle timeout) so the server never closes a pooled connection
+first; pre-ping catches the ones that are closed anyway.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+# Keyed by pool label; survives engine.dispose(), which builds a new pool
+pool_stats: Dict[str, PoolStats] = {}
+live_pools: Dict[str, Any] = {}
+_stats_lock = threading.Lock()
+
+
+class PoolMetricsMixin:
+    """Times every checkout and counts checkout timeouts.
+
+    Wait time covers queueing for a free connection plus opening a new
+    one when the pool grows into its overflow.
+    """
+
+    label = "primary"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_stats.setdefault(self.label, PoolStats())
+        live_pools[self.label] = self
+
+    def _do_get(self):
+        stats = pool_stats[self.label]
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with _stats_lock:
+                stats.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with _stats_lock:
+            stats.checkouts += 1
+            stats.wait_seconds_total += waited
+            stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+        return connection
+
+
+def instrumented_pool_class(base, label: str):
+    """A pool class for one engine; the label names it in metrics"""
+    return type(
+        f"Instrumented{base.__name__}", (PoolMetricsMixin, base), {"label": label}
+    )
+
+
+def engine_options(label: str, is_async: bool = False) -> Dict[str, Any]:
+    """Pool keyword arguments for create_engine / create_async_engine"""
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    return {
+        "poolclass": instrumented_pool_class(base, label),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def pool_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Live gauges and cumulative counters for every instrumented pool"""
+    snapshot = {}
+    for label, pool in live_pools.items():
+        stats = pool_stats[label]
+        snapshot[label] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # QueuePool counts overflow from -pool_size; only report real overflow
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "wait_seconds_total": stats.wait_seconds_total,
+            "wait_seconds_max": stats.wait_seconds_max,
+        }
+    return snapshot
@@ -0,0 +1,43 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, FrozenSet, Iterable, Tuple
+
+# Each worker keeps its own copy; the TTL bounds how stale another worker's
+# copy can be after a write it did not see
+FAVORITES_CACHE_TTL_SECONDS = float(os.getenv("FAVORITES_CACHE_TTL_SECONDS", "60"))
+FAVORITES_CACHE_MAX_USERS = int(os.getenv("FAVORITES_CACHE_MAX_USERS", "10000"))
+
+
+class FavoriteIdCache:
+    """Per-user set of favorited product ids, least recently used evicted first"""
+
+    def __init__(
+        self,
+        ttl: float = FAVORITES_CACHE_TTL_SECONDS,
+        max_users: int = FAVORITES_CACHE_MAX_USERS,
+    ):
+        self._entries: "OrderedDict[int, Tuple[float, FrozenSet[int]]]" = OrderedDict()
+        self._ttl = ttl
+        self._max_users = max_users
+
+    def get(self, user_id: int, load: Callable[[], Iterable[int]]) -> FrozenSet[int]:
+        """Return the cached set, calling load() on a miss or expiry"""
+        entry = self._entries.get(user_id)
+        now = time.monotonic()
+        if entry and entry[0] > now:
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+        product_ids = frozenset(load())
+        self._entries[user_id] = (now + self._ttl, product_ids)
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self._max_users:
+            self._entries.popitem(last=False)
+        return product_ids
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+
+favorite_ids = FavoriteIdCache()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Responsive image derivatives for uploaded product images.
+
+Each original gets a thumbnail and a medium rendition in WebP and JPEG
+under derived/ (same shard layout), EXIF-free and with camera orientation
+applied. Renditions are written through the storage backend, so they live
+next to the originals on local disk or in the bucket alike. Rendering runs
+in a process pool because Pillow's resize and encoders hold the GIL; it
+reads a private local copy of the original (the upload's temp file, or one
+fetched from the backend).
+
+Run this module directly to render derivatives for every product image
+that has none yet:
+    python image_pipeline.py
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import ProductImage
+from storage import DERIVED_PREFIX, UPLOAD_DIR, storage
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = UPLOAD_DIR / DERIVED_PREFIX.rstrip("/")
+DERIVED_DIR.mkdir(exist_ok=True)
+
+# Longest edge in pixels; images are never upscaled
+DERIVATIVE_SIZES = {"thumb": 320, "medium": 960}
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+IMAGE_PROCESS_WORKERS = int(
+    os.getenv("IMAGE_PROCESS_WORKERS", str(min(2, os.cpu_count() or 1)))
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_inflight: Dict[str, asyncio.Future] = {}
+_pending = set()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS)
+    return _executor
+
+
+def shutdown_executor():
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def upload_key(img_url: str) -> Optional[str]:
+    """Storage key behind an /uploads/... URL, or None for external URLs"""
+    if not img_url.startswith("/uploads/"):
+        return None
+    return img_url[len("/uploads/") :]
+
+
+def derivative_key(source_key: str, size_name: str, fmt: str) -> str:
+    """derived/ mirrors the upload's shard directories (derived/ab/cd/...)"""
+    shard, _, filename = source_key.rpartition("/")
+    name = f"{filename.rsplit('.', 1)[0]}-{size_name}.{fmt}"
+    return f"{DERIVED_PREFIX}{shard}/{name}" if shard else f"{DERIVED_PREFIX}{name}"
+
+
+def derivative_urls(source_key: str) -> Dict[str, Dict[str, str]]:
+    return {
+        size_name: {
+            fmt: f"/uploads/{derivative_key(source_key, size_name, fmt)}"
+            for fmt in DERIVATIVE_FORMATS
+        }
+        for size_name in DERIVATIVE_SIZES
+    }
+
+
+def existing_derivatives(source_key: str) -> Optional[Dict[str, Dict[str, str]]]:
+    """URLs of already rendered derivatives, if all are present.
+
+    Originals are never rewritten in place (content-hash or unique names)
+    and derivatives are stored atomically, so existence means current.
+    The original's mtime is no signal: dedup hits touch it for the GC.
+    """
+    for size_name in DERIVATIVE_SIZES:
+        for fmt in DERIVATIVE_FORMATS:
+            if not storage.exists(derivative_key(source_key, size_name, fmt)):
+                return None
+    return derivative_urls(source_key)
+
+
+def _render_temp_path() -> Path:
+    # Hidden names are never served and are skipped by sync and the GC listing
+    return UPLOAD_DIR / f".render-{uuid.uuid4().hex}.part"
+
+
+def link_for_render(temp_path: Path) -> Path:
+    """A second name for an upload's temp file that rendering owns and deletes"""
+    link = _render_temp_path()
+    os.link(temp_path, link)
+    return link
+
+
+def fetch_original(source_key: str) -> Optional[Path]:
+    """A private local copy of a stored original, or None if it is missing"""
+    if not storage.exists(source_key):
+        return None
+    target = _render_temp_path()
+    try:
+        storage.fetch(source_key, target)
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    return target
+
+
+def render_derivatives(source: str, source_key: str) -> List[Tuple[str, str]]:
+    """Render every size/format of one original; runs in a worker process.
+
+    Returns (temp file, storage key) pairs for the caller to store.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as original:
+        # Bake the EXIF orientation in before the metadata is dropped
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    # Drop EXIF/XMP (camera, GPS) so nothing can be carried into the output
+    image.info = {
+        key: value for key, value in image.info.items() if key == "transparency"
+    }
+
+    renditions = []
+    try:
+        for size_name, edge in DERIVATIVE_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((edge, edge), Image.LANCZOS)
+            has_alpha = resized.mode in ("RGBA", "LA") or (
+                resized.mode == "P" and "transparency" in resized.info
+            )
+            for fmt, (pil_format, options) in DERIVATIVE_FORMATS.items():
+                if pil_format == "JPEG" and has_alpha:
+                    flattened = Image.new("RGB", resized.size, (255, 255, 255))
+                    flattened.paste(
+                        resized.convert("RGBA"), mask=resized.convert("RGBA")
+                    )
+                    frame = flattened
+                elif pil_format == "JPEG" or resized.mode not in ("RGB", "RGBA"):
+                    frame = resized.convert("RGBA" if has_alpha else "RGB")
+                else:
+                    frame = resized
+
+                temp = _render_temp_path()
+                key = derivative_key(source_key, size_name, fmt)
+                renditions.append((str(temp), key))
+                frame.save(temp, pil_format, **options)
+    except BaseException:
+        for temp, _ in renditions:
+            Path(temp).unlink(missing_ok=True)
+        raise
+    return renditions
+
+
+def store_renditions(renditions: List[Tuple[str, str]]) -> None:
+    """Hand rendered temp files to the storage backend, which consumes them"""
+    try:
+        for temp, key in renditions:
+            storage.store(Path(temp), key)
+    finally:
+        for temp, _ in renditions:
+            Path(temp).unlink(missing_ok=True)
+
+
+def render_and_store(source_key: str, source_path: Optional[Path] = None):
+    """Blocking render + store for scripts; fetches the original if not given"""
+    local = source_path or fetch_original(source_key)
+    if local is None:
+        return None
+    try:
+        store_renditions(render_derivatives(str(local), source_key))
+    finally:
+        local.unlink(missing_ok=True)
+    return derivative_urls(source_key)
+
+
+async def _render_in_pool(source_key: str, source_path: Optional[Path]):
+    local = source_path or await asyncio.to_thread(fetch_original, source_key)
+    if local is None:
+        return None
+    try:
+        loop = asyncio.get_running_loop()
+        renditions = await loop.run_in_executor(
+            _get_executor(), render_derivatives, str(local), source_key
+        )
+    finally:
+        local.unlink(missing_ok=True)
+    await asyncio.to_thread(store_renditions, renditions)
+    return derivative_urls(source_key)
+
+
+async def generate_derivatives(
+    img_url: str, source_path: Optional[Path] = None
+) -> Optional[Dict[str, Dict[str, str]]]:
+    """Render and store derivatives for an upload in the process pool.
+
+    source_path, if given, is a private local copy of the original that
+    this call consumes; otherwise the original is fetched from storage.
+    Concurrent calls for the same upload share one render, so rendering on
+    upload and again when the image is attached to a product costs once.
+    """
+    source_key = upload_key(img_url)
+    if source_key is None:
+        if source_path:
+            source_path.unlink(missing_ok=True)
+        return None
+    future = _inflight.get(source_key)
+    if future is None:
+        rendered = await asyncio.to_thread(existing_derivatives, source_key)
+        if rendered:
+            if source_path:
+                source_path.unlink(missing_ok=True)
+            return rendered
+        future = _inflight.get(source_key)
+    if future is None:
+        future = asyncio.ensure_future(_render_in_pool(source_key, source_path))
+        _inflight[source_key] = future
+        future.add_done_callback(lambda _: _inflight.pop(source_key, None))
+    elif source_path:
+        source_path.unlink(missing_ok=True)
+    return await asyncio.shield(future)
+
+
+def prerender_derivatives(img_url: str, source_path: Optional[Path] = None):
+    """Start rendering right after upload, before any ProductImage row exists"""
+
+    async def render():
+        try:
+            await generate_derivatives(img_url, source_path)
+        except Exception as e:
+            logger.error(f"Failed to render derivatives for {img_url}: {str(e)}")
+
+    _track(render())
+
+
+def _track(coro):
+    task = asyncio.create_task(coro)
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def _record_derivatives(image_ids: List[int], img_urls: List[str]):
+    for image_id, img_url in zip(image_ids, img_urls):
+        try:
+            derivatives = await generate_derivatives(img_url)
+        except Exception as e:
+            logger.error(f"Failed to render derivatives for {img_url}: {str(e)}")
+            continue
+        if not derivatives:
+            continue
+        with SessionLocal() as db:
+            db.query(ProductImage).filter(ProductImage.id == image_id).update(
+                {ProductImage.derivatives: derivatives}, synchronize_session=False
+            )
+            db.commit()
+
+
+def schedule_derivatives(images: Iterable[ProductImage]):
+    """Render and record derivatives for saved ProductImage rows in the background"""
+    images = list(images)
+    if images:
+        _track(
+            _record_derivatives(
+                [image.id for image in images], [image.img_url for image in images]
+            )
+        )
+
+
+def backfill_derivatives(db: Session) -> int:
+    """Render derivatives for every image that has none; returns the count"""
+    rendered = 0
+    pending = (
+        db.query(ProductImage.id, ProductImage.img_url)
+        .filter(ProductImage.derivatives.is_(None))
+        .all()
+    )
+    for image_id, img_url in pending:
+        source_key = upload_key(img_url)
+        if source_key is None:
+            continue
+        try:
+            derivatives = existing_derivatives(source_key) or render_and_store(
+                source_key
+            )
+        except Exception as e:
+            logger.error(f"Failed to render derivatives for {img_url}: {str(e)}")
+            continue
+        if not derivatives:
+            continue
+        db.query(ProductImage).filter(ProductImage.id == image_id).update(
+            {ProductImage.derivatives: derivatives}, synchronize_session=False
+        )
+        db.commit()
+        rendered += 1
+    return rendered
+
+
+if __name__ == "__main__":
+    with SessionLocal() as session:
+        count = backfill_derivatives(session)
+    logger.info(f"Rendered derivatives for {count} product images")
@@ -1,17 +1,22 @@
 import os
+import json
+import zlib
 import requests
 import base64
 from datetime import datetime
 from decimal import Decimal
 from typing import Dict, Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic_models import TransactionRequest, QueryRequest, APIResponse, CallbackRequest , CheckTransactionStatus
-from database import db_dependency
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic_models import TransactionRequest, QueryRequest, APIResponse, CallbackRequest , CheckTransactionStatus, Role
+from database import db_dependency, async_db_dependency
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_, and_
 import models
 from auth import get_active_user
+from realtime import publish_event, order_channel, ADMIN_ORDERS_CHANNEL
+from pagination import encode_cursor, decode_cursor
 import logging
 
 # Setup logging
@@ -25,6 +30,21 @@ router = APIRouter(prefix="/payments", tags=["Payments"])
 from typing import Annotated
 user_dependency = Annotated[dict, Depends(get_active_user)]
 
+
+def compress_payload(kind: str, data: Dict[str, Any]) -> models.TransactionPayload:
+    """Build a zlib-compressed side-table row for a raw gateway payload"""
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return models.TransactionPayload(
+        kind=kind, encoding="zlib", payload=zlib.compress(raw, 6)
+    )
+
+
+def decompress_payload(row: models.TransactionPayload) -> Dict[str, Any]:
+    """Inverse of compress_payload"""
+    if row.encoding != "zlib":
+        raise ValueError(f"Unsupported payload encoding: {row.encoding}")
+    return json.loads(zlib.decompress(row.payload))
+
 class LNMORepository:
     """MPESA LNMO Repository for handling M-Pesa payments"""
     
@@ -37,6 +57,8 @@ class LNMORepository:
     MPESA_LNMO_PASS_KEY = os.getenv("MPESA_LNMO_PASS_KEY")
     MPESA_LNMO_SHORT_CODE = os.getenv("MPESA_LNMO_SHORT_CODE")
     MPESA_LNMO_CALLBACK_URL = os.getenv("MPESA_CALLBACK_URL")
+    # Used when MPESA_LNMO_ENVIRONMENT=simulator (see daraja_simulator.py)
+    MPESA_SIMULATOR_URL = os.getenv("MPESA_SIMULATOR_URL", "http://localhost:8001")
 
     def __init__(self):
         # Validate required environment variables
@@ -48,10 +70,17 @@ class LNMORepository:
             if not getattr(self, var):
                 raise ValueError(f"Missing required environment variable: {var}")
 
+    @property
+    def base_url(self) -> str:
+        """Daraja host for the configured environment"""
+        if self.MPESA_LNMO_ENVIRONMENT == "simulator":
+            return self.MPESA_SIMULATOR_URL.rstrip("/")
+        return f"https://{self.MPESA_LNMO_ENVIRONMENT}.safaricom.co.ke"
+
     async def transact(self, data: Dict[str, Any], db: Session, user_id: int) -> Dict[str, Any]:
         """Handle MPESA LNMO transaction"""
         try:
-            endpoint = f"https://{self.MPESA_LNMO_ENVIRONMENT}.safaricom.co.ke/mpesa/stkpush/v1/processrequest"
+            endpoint = f"{self.base_url}/mpesa/stkpush/v1/processrequest"
             headers = {
                 "Authorization": "Bearer " + self.generate_access_token(),
                 "Content-Type": "application/json",
@@ -90,11 +119,11 @@ class LNMORepository:
                 transaction_code=None,
                 transaction_timestamp=datetime.now(),
                 transaction_details=f"Payment for order {data['order_id']}",
-                _feedback=response_data,
                 _status=models.TransactionStatus.PROCESSING,
                 user_id=user_id,
                 # order_id=None  
             )
+            transaction.payloads.append(compress_payload("stk_response", response_data))
 
             db.add(transaction)
             db.commit()
@@ -114,7 +143,7 @@ class LNMORepository:
     def query(self, transaction_id: str) -> Dict[str, Any]:
         """Query MPESA LNMO transaction status"""
         try:
-            endpoint = f"https://{self.MPESA_LNMO_ENVIRONMENT}.safaricom.co.ke/mpesa/stkpushquery/v1/query"
+            endpoint = f"{self.base_url}/mpesa/stkpushquery/v1/query"
             headers = {
                 "Authorization": "Bearer " + self.generate_access_token(),
                 "Content-Type": "application/json",
@@ -137,19 +166,23 @@ class LNMORepository:
                 detail=f"Query failed: {str(e)}"
             )
 
-    async def callback(self, data: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    async def callback(self, data: Dict[str, Any], db: AsyncSession) -> Dict[str, Any]:
         """Handle MPESA callback"""
         try:
             checkout_request_id = data["body"]["stkCallback"]["checkoutRequestID"]
 
             # Find the transaction in the database
-            transaction = db.query(models.Transaction).filter(
-                models.Transaction.transaction_id == checkout_request_id
-            ).first()
+            transaction = await db.scalar(
+                select(models.Transaction).filter(
+                    models.Transaction.transaction_id == checkout_request_id
+                )
+            )
 
             if transaction:
-                # Store the entire callback response in _feedback
-                transaction._feedback = data
+                # Keep the raw callback in the side table, not on the hot row
+                payload = compress_payload("callback", data)
+                payload.transaction_id = transaction.id
+                db.add(payload)
                 # Get the ResultCode to determine success or failure
                 result_code = data["body"]["stkCallback"]["resultCode"]
 
@@ -168,8 +201,18 @@ class LNMORepository:
                     # Transaction failed
                     transaction._status = models.TransactionStatus.REJECTED
 
-                db.commit()
+                await db.commit()
                 logger.info(f"Transaction {transaction.id} updated via callback: status {transaction._status}")
+
+                # Push the result to the waiting checkout page and to admins
+                event = {
+                    "order_id": transaction._pid,
+                    "transaction_id": transaction.transaction_id,
+                    "status": transaction._status.value,
+                    "transaction_code": transaction.transaction_code,
+                }
+                await publish_event(order_channel(transaction._pid), "payment_status", event)
+                await publish_event(ADMIN_ORDERS_CHANNEL, "payment_status", event)
             else:
                 logger.warning(f"Transaction not found for checkout_request_id: {checkout_request_id}")
 
@@ -177,7 +220,7 @@ class LNMORepository:
 
         except Exception as e:
             logger.error(f"Error in callback: {str(e)}")
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Callback processing failed: {str(e)}"
@@ -186,7 +229,7 @@ class LNMORepository:
     def generate_access_token(self) -> str:
         """Generate an access token for the MPESA API"""
         try:
-            endpoint = f"https://{self.MPESA_LNMO_ENVIRONMENT}.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"
+            endpoint = f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials"
             credentials = f"{self.MPESA_LNMO_CONSUMER_KEY}:{self.MPESA_LNMO_CONSUMER_SECRET}"
             encoded_credentials = base64.b64encode(credentials.encode()).decode()
 
@@ -319,7 +362,7 @@ async def query_payment(
 @router.post("/lnmo/callback")
 async def payment_callback(
     callback_data: CallbackRequest,
-    db: db_dependency
+    db: async_db_dependency
 ):
     """Handle MPESA callback (webhook endpoint)"""
     try:
@@ -343,30 +386,68 @@ async def payment_callback(
 @router.get("/transactions", status_code=status.HTTP_200_OK)
 async def get_user_transactions(
     user: user_dependency,
-    db: db_dependency
+    db: db_dependency,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
 ):
-    """Get user's transaction history"""
+    """Get user's transaction history, newest first, one page at a time"""
     try:
-        transactions = db.query(models.Transaction).filter(
-            models.Transaction.user_id == user.get("id")
-        ).order_by(models.Transaction.created_at.desc()).all()
-        
+        # Slim projection: the list view never needs the gateway payloads
+        query = db.query(
+            models.Transaction.id,
+            models.Transaction._pid.label("order_id"),
+            models.Transaction.transaction_amount,
+            models.Transaction._status.label("status"),
+            models.Transaction.transaction_code,
+            models.Transaction.transaction_id,
+            models.Transaction.created_at,
+            models.Transaction.party_a,
+        ).filter(models.Transaction.user_id == user.get("id"))
+
+        # Keyset pagination on (created_at, id) served by ix_transactions_user_created
+        if cursor:
+            last_created_at, last_id = decode_cursor(cursor)
+            query = query.filter(
+                or_(
+                    models.Transaction.created_at < last_created_at,
+                    and_(
+                        models.Transaction.created_at == last_created_at,
+                        models.Transaction.id < last_id,
+                    ),
+                )
+            )
+
+        rows = (
+            query.order_by(
+                models.Transaction.created_at.desc(), models.Transaction.id.desc()
+            )
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
         return {
             "transactions": [
                 {
                     "id": t.id,
-                    "order_id": t._pid,
+                    "order_id": t.order_id,
                     "amount": float(t.transaction_amount),
-                    "status": t._status.value,
+                    "status": t.status.value,
                     "transaction_code": t.transaction_code,
                     "transaction_id": t.transaction_id,
                     "created_at": t.created_at,
                     "phone_number": t.party_a
                 }
-                for t in transactions
-            ]
+                for t in rows
+            ],
+            "next_cursor": (
+                encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+            ),
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching transactions: {str(e)}")
         raise HTTPException(
@@ -385,7 +466,9 @@ async def get_transaction_by_order_id(
     try:
         transaction = db.query(models.Transaction).filter(
             models.Transaction._pid == request.order_id
-        ).order_by(models.Transaction.created_at.desc()).first()
+        ).order_by(
+            models.Transaction.created_at.desc(), models.Transaction.id.desc()
+        ).first()
         
         if not transaction:
             raise HTTPException(
@@ -411,7 +494,6 @@ async def get_transaction_by_order_id(
                 "transaction_aggregator": transaction.transaction_aggregator,
                 "transaction_timestamp": transaction.transaction_timestamp,
                 "transaction_details": transaction.transaction_details,
-                "feedback": transaction._feedback,
                 "updated_at": transaction.updated_at
             }
         }
@@ -423,4 +505,62 @@ async def get_transaction_by_order_id(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch transaction"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/transactions/{transaction_id}", status_code=status.HTTP_200_OK)
+async def get_transaction_detail(
+    transaction_id: int,
+    user: user_dependency,
+    db: db_dependency
+):
+    """Get a transaction with its raw M-Pesa request and callback payloads"""
+    try:
+        transaction = db.query(models.Transaction).filter(
+            models.Transaction.id == transaction_id
+        ).first()
+
+        if not transaction or (
+            transaction.user_id != user.get("id")
+            and user.get("role") not in [Role.ADMIN.value, Role.SUPERADMIN.value]
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Transaction not found"
+            )
+
+        payloads = db.query(models.TransactionPayload).filter(
+            models.TransactionPayload.transaction_id == transaction.id
+        ).order_by(models.TransactionPayload.created_at).all()
+
+        return {
+            "transaction": {
+                "id": transaction.id,
+                "order_id": transaction._pid,
+                "amount": float(transaction.transaction_amount),
+                "status": transaction._status.value,
+                "transaction_code": transaction.transaction_code,
+                "transaction_id": transaction.transaction_id,
+                "created_at": transaction.created_at,
+                "phone_number": transaction.party_a,
+                "transaction_details": transaction.transaction_details,
+                "updated_at": transaction.updated_at,
+                "payloads": [
+                    {
+                        "kind": p.kind,
+                        "created_at": p.created_at,
+                        "data": decompress_payload(p)
+                    }
+                    for p in payloads
+                ]
+            }
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching transaction detail: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch transaction"
+        )
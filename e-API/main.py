@@ -1,4 +1,13 @@
-from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Query
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Depends,
+    status,
+    UploadFile,
+    File,
+    Query,
+    Response,
+)
 from pydantic_models import (
     ProductsBase,
     CartPayload,
@@ -6,6 +15,7 @@ from pydantic_models import (
     CategoryBase,
     CategoryResponse,
     ProductResponse,
+    ProductDetailResponse,
     OrderResponse,
     Role,
     PaginatedProductResponse,
@@ -25,6 +35,8 @@ from pydantic_models import (
     ProductSpecificationResponse,
     FavoriteCreate,
     FavoriteResponse,
+    FavoriteBulkRequest,
+    FavoriteIdsResponse,
     ReviewCreate,
     ReviewResponse,
     ProductCreateRequest,
@@ -36,9 +48,17 @@ from pydantic_models import (
 )
 from typing import Annotated, List, Optional
 import models
-from database import engine, db_dependency
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy.exc import SQLAlchemyError
+from database import (
+    engine,
+    async_engine,
+    replica_async_engine,
+    db_dependency,
+    async_db_dependency,
+    SessionLocal,
+)
+from sqlalchemy.orm import Session, joinedload, noload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 import auth
 from auth import (
     get_active_user,
@@ -50,17 +70,45 @@ from auth import (
     send_admin_new_order_notification,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import func, or_
-from datetime import datetime, timedelta
+import asyncio
+from sqlalchemy import func, or_, and_, insert, update, case, select
+from pydantic import ValidationError
+from datetime import date, datetime, timedelta
 import logging
 from dotenv import load_dotenv
 import os
 from decimal import Decimal
 from math import ceil
-import uuid
-from pathlib import Path
-from fastapi.staticfiles import StaticFiles
 import lnmo
+import realtime
+import sales_analytics
+import background_jobs
+import upload_gc
+import metrics
+from background_jobs import Job, jobs
+from sales_analytics import apply_order_to_rollups, apply_status_change
+from token_revocation import revocation_cache
+from rate_limit import RateLimitMiddleware
+from replica_routing import (
+    ReadYourWritesMiddleware,
+    read_db_dependency,
+    async_read_db_dependency,
+)
+from password_hashing import password_hasher
+from user_stats import bump_user_stats, read_user_stats
+from user_search import apply_user_search, index_users
+from pagination import encode_cursor, decode_cursor
+from uploads import save_image_upload
+from storage import uploads_app
+import image_pipeline
+from image_pipeline import schedule_derivatives
+from favorites_cache import favorite_ids
+from streaming_export import encode_rows, streaming_download, EXPORT_FORMAT_PATTERN
+import collections
+import csv
+import io
+import itertools
+from realtime import publish_event, order_channel, ADMIN_ORDERS_CHANNEL
 from models import Users
 
 load_dotenv()
@@ -71,20 +119,57 @@ logger = logging.getLogger(__name__)
 app = FastAPI()
 app.include_router(auth.router)
 app.include_router(lnmo.router)
+app.include_router(realtime.router)
+app.include_router(sales_analytics.router)
+app.include_router(background_jobs.router)
+app.include_router(upload_gc.router)
+app.include_router(metrics.router)
 models.Base.metadata.create_all(bind=engine)
 
+# Innermost: records successful writes so the writer's next reads skip the replica
+app.add_middleware(ReadYourWritesMiddleware)
+# Added before CORS so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
 user_dependency = Annotated[dict, Depends(get_active_user)]
 
 
+@app.on_event("startup")
+async def start_event_broker():
+    await realtime.broker.start()
+
+
+@app.on_event("startup")
+async def start_token_revocation_sync():
+    app.state.revocation_sync = asyncio.create_task(revocation_cache.run_sync_loop())
+
+
+@app.on_event("shutdown")
+async def stop_event_broker():
+    await realtime.broker.stop()
+
+
+@app.on_event("shutdown")
+async def stop_image_pipeline():
+    image_pipeline.shutdown_executor()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+    if replica_async_engine is not None:
+        await replica_async_engine.dispose()
+
+
 def require_customer_only(current_user: dict = Depends(get_active_user)):
     """Dependency to ensure only customers can access"""
     if current_user["role"] != Role.CUSTOMER.value:
@@ -111,45 +196,24 @@ def require_admin(user: user_dependency):
     return user
 
 
-# Ensure uploads directory exists
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", uploads_app(), name="uploads")
 
 
 @app.post(
     "/upload-image", response_model=ImageResponse, status_code=status.HTTP_201_CREATED
 )
-async def upload_image(user: user_dependency, file: UploadFile = File(...)):
+async def upload_image(
+    user: user_dependency, db: db_dependency, file: UploadFile = File(...)
+):
     require_admin(user)
     try:
-        # Validate file type
-        if not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="Only image files are allowed")
-
-        # Validate file size (e.g., max 20MB)
-        max_size = 20 * 1024 * 1024  # 20MB in bytes
-        content = await file.read()
-        if len(content) > max_size:
-            raise HTTPException(status_code=400, detail="File size exceeds 20MB limit")
-
-        # Generate unique filename
-        file_extension = file.filename.split(".")[-1].lower()
-        if file_extension not in ["jpg", "jpeg", "png", "gif"]:
-            raise HTTPException(status_code=400, detail="Unsupported image format")
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
-
-        # Save file
-        with file_path.open("wb") as f:
-            f.write(content)
-
-        # Generate URL (assuming static file serving or CDN in production)
-        img_url = f"/uploads/{unique_filename}"
-
-        logger.info(f"Image uploaded: {unique_filename} by user {user.get('id')}")
+        # Content-addressed: re-uploading the same image returns the same URL
+        img_url = await save_image_upload(file, db)
+
+        logger.info(f"Image uploaded: {img_url} by user {user.get('id')}")
         return {"message": "Image uploaded successfully", "img_url": img_url}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading image: {str(e)}")
         raise HTTPException(status_code=500, detail="Error uploading image")
@@ -162,7 +226,7 @@ async def upload_image(user: user_dependency, file: UploadFile = File(...)):
     status_code=status.HTTP_200_OK,
 )
 async def browse_products(
-    db: db_dependency,
+    db: async_read_db_dependency,
     search: str = None,
     page: int = 1,
     limit: int = 8,
@@ -171,21 +235,37 @@ async def browse_products(
     ids: str = None,  # Add ids parameter for batch fetch
 ):
     try:
+        # Everything the response model reads must be loaded up front: an
+        # async session cannot lazy-load during serialization. Listings carry
+        # the stored rating and rating_count, so reviews serialize as [].
+        product_options = (
+            joinedload(models.Products.category),
+            joinedload(models.Products.subcategory),
+            joinedload(models.Products.images),
+            joinedload(models.Products.product_specifications).joinedload(
+                models.ProductSpecification.specification
+            ),
+            noload(models.Products.reviews),
+        )
+
         # Batch fetch by IDs
         if ids:
             id_list = [int(i) for i in ids.split(",") if i.isdigit()]
-            query = db.query(models.Products).filter(models.Products.id.in_(id_list))
-            total = query.count()
-            products = query.all()
+            result = await db.execute(
+                select(models.Products)
+                .options(*product_options)
+                .filter(models.Products.id.in_(id_list))
+            )
+            products = result.unique().scalars().all()
             return {
                 "items": products,
-                "total": total,
+                "total": len(products),
                 "page": 1,
                 "limit": len(products),
                 "pages": 1,
             }
         skip = (page - 1) * limit
-        query = db.query(models.Products)
+        query = select(models.Products)
 
         # Apply search filter
         if search:
@@ -202,22 +282,11 @@ async def browse_products(
             query = query.filter(models.Products.subcategory_id == subcategory_id)
             logger.info(f"Product subcategory filter: {subcategory_id}")
 
-        total = query.count()
-        products = (
-            query.options(
-                joinedload(models.Products.category),
-                joinedload(models.Products.subcategory),
-                joinedload(models.Products.images),
-                joinedload(models.Products.product_specifications).joinedload(
-                    models.ProductSpecification.specification
-                ),
-                joinedload(models.Products.favorites),
-                joinedload(models.Products.reviews),
-            )
-            .offset(skip)
-            .limit(limit)
-            .all()
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        result = await db.execute(
+            query.options(*product_options).offset(skip).limit(limit)
         )
+        products = result.unique().scalars().all()
 
         total_pages = ceil(total / limit)
 
@@ -235,13 +304,13 @@ async def browse_products(
 
 @app.get(
     "/public/products/{product_id}",
-    response_model=ProductResponse,
+    response_model=ProductDetailResponse,
     status_code=status.HTTP_200_OK,
 )
-async def get_product_by_id(product_id: int, db: db_dependency):
+async def get_product_by_id(product_id: int, db: async_read_db_dependency):
     try:
-        product = (
-            db.query(models.Products)
+        result = await db.execute(
+            select(models.Products)
             .options(
                 joinedload(models.Products.category),
                 joinedload(models.Products.subcategory),
@@ -249,16 +318,27 @@ async def get_product_by_id(product_id: int, db: db_dependency):
                 joinedload(models.Products.product_specifications).joinedload(
                     models.ProductSpecification.specification
                 ),
-                joinedload(models.Products.favorites),
-                joinedload(models.Products.reviews).joinedload(models.Review.user),
             )
             .filter(models.Products.id == product_id)
-            .first()
         )
+        product = result.unique().scalars().first()
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
+        # Only the newest page of reviews; the rest is paged via
+        # /products/{id}/reviews
+        reviews, next_cursor = await db.run_sync(
+            fetch_review_page, product_id, REVIEW_PAGE_SIZE
+        )
+        set_committed_value(product, "reviews", reviews)
+        product.reviews_next_cursor = next_cursor
+        product.rating_histogram = {
+            rating: getattr(product, f"rating_{rating}_count") or 0
+            for rating in range(1, 6)
+        }
         return product
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching product: {str(e)}")
         raise HTTPException(status_code=500, detail="Error fetching product")
@@ -269,7 +349,7 @@ async def get_product_by_id(product_id: int, db: db_dependency):
     response_model=List[CategoryResponse],
     status_code=status.HTTP_200_OK,
 )
-async def browse_categories(db: db_dependency):
+async def browse_categories(db: read_db_dependency):
     try:
         categories = db.query(models.Categories).all()
         return categories
@@ -283,7 +363,7 @@ async def browse_categories(db: db_dependency):
     response_model=List[SubcategoryResponse],
     status_code=status.HTTP_200_OK,
 )
-async def browse_subcategories(db: db_dependency, category_id: int = None):
+async def browse_subcategories(db: read_db_dependency, category_id: int = None):
     try:
         query = db.query(models.Subcategory)
         if category_id:
@@ -327,12 +407,11 @@ async def add_product(
         db.commit()
         db.refresh(add_product)
         # Add images
-        if payload.images:
-            for img in payload.images:
-                db_image = models.ProductImage(
-                    product_id=add_product.id, img_url=img.img_url
-                )
-                db.add(db_image)
+        db_images = [
+            models.ProductImage(product_id=add_product.id, img_url=img.img_url)
+            for img in payload.images or []
+        ]
+        db.add_all(db_images)
         # Add specifications
         if payload.specifications:
             for spec in payload.specifications:
@@ -343,6 +422,7 @@ async def add_product(
                 )
                 db.add(db_spec)
         db.commit()
+        schedule_derivatives(db_images)
         return {"message": "Product added successfully"}
     except SQLAlchemyError as e:
         db.rollback()
@@ -478,19 +558,17 @@ async def delete_category(category_id: int, db: db_dependency, user: user_depend
 # Update your create_order function to handle the new transaction relationship:
 @app.post("/create_order", status_code=status.HTTP_201_CREATED)
 async def create_order(
-    db: db_dependency, user: user_dependency, order_payload: CartPayload
+    db: async_db_dependency, user: user_dependency, order_payload: CartPayload
 ):
     try:
         # Validate address if provided
         address_id = order_payload.address_id
         if address_id:
-            address = (
-                db.query(models.Address)
-                .filter(
+            address = await db.scalar(
+                select(models.Address).filter(
                     models.Address.id == address_id,
                     models.Address.user_id == user.get("id"),
                 )
-                .first()
             )
             if not address:
                 raise HTTPException(status_code=400, detail="Invalid address ID")
@@ -507,24 +585,34 @@ async def create_order(
             status=OrderStatus.PENDING,  # Initial status
         )
         db.add(new_order)
-        db.commit()
-        db.refresh(new_order)
+        await db.flush()
+
+        # Load every cart product in one query
+        result = await db.execute(
+            select(models.Products).filter(
+                models.Products.id.in_({item.id for item in order_payload.cart})
+            )
+        )
+        products = {product.id: product for product in result.scalars()}
 
         # Process cart items and calculate total cost
         total_cost = Decimal("0")
+        product_list = []
         for item in order_payload.cart:
-            product = db.query(models.Products).filter_by(id=item.id).first()
+            product = products.get(item.id)
             if not product:
-                db.rollback()
+                await db.rollback()
                 raise HTTPException(
                     status_code=404, detail=f"Product ID {item.id} not found"
                 )
             quantity = Decimal(str(item.quantity))
             if product.stock_quantity < quantity:
-                db.rollback()
+                # rollback() expires product; reading it afterwards would be lazy IO
+                product_name = product.name
+                await db.rollback()
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Insufficient stock for product {product.name}",
+                    detail=f"Insufficient stock for product {product_name}",
                 )
 
             # Create order detail entry
@@ -537,15 +625,22 @@ async def create_order(
             total_cost += order_detail.total_price
             product.stock_quantity -= quantity
             db.add(order_detail)
+            product_list.append(
+                {
+                    "name": product.name,
+                    "quantity": float(quantity),
+                    "unit_price": float(product.price),
+                    "total_price": float(order_detail.total_price),
+                }
+            )
 
         # Update order total with cart total plus delivery fee
         new_order.total = total_cost + new_order.delivery_fee
 
         # Handle transaction linking if transaction_id is provided
         if order_payload.transaction_id:
-            transaction = (
-                db.query(models.Transaction)
-                .filter(
+            transaction = await db.scalar(
+                select(models.Transaction).filter(
                     models.Transaction.id == order_payload.transaction_id,
                     models.Transaction.user_id == user.get("id"),
                     models.Transaction.order_id.is_(
@@ -554,15 +649,14 @@ async def create_order(
                     models.Transaction._status
                     == models.TransactionStatus.ACCEPTED,  # ACCEPTED status
                 )
-                .first()
             )
             if not transaction:
-                db.rollback()
+                await db.rollback()
                 raise HTTPException(
                     status_code=400, detail="Invalid or already used transaction"
                 )
             if transaction.transaction_amount < new_order.total:
-                db.rollback()
+                await db.rollback()
                 raise HTTPException(
                     status_code=400, detail="Insufficient transaction amount"
                 )
@@ -572,38 +666,18 @@ async def create_order(
                 OrderStatus.PROCESSING
             )  # Payment confirmed, ready for processing
 
-        # Commit all changes
-        db.commit()
+        await db.run_sync(apply_order_to_rollups, new_order, 1)
 
-        # Fetch order details for email
-        order_details = (
-            db.query(models.OrderDetails)
-            .filter(models.OrderDetails.order_id == new_order.order_id)
-            .all()
-        )
-        product_list = []
-        for detail in order_details:
-            product = (
-                db.query(models.Products)
-                .filter(models.Products.id == detail.product_id)
-                .first()
-            )
-            product_list.append(
-                {
-                    "name": product.name,
-                    "quantity": float(detail.quantity),
-                    "unit_price": float(product.price),
-                    "total_price": float(detail.total_price),
-                }
-            )
+        # Commit all changes
+        await db.commit()
 
         # Send order confirmation email
         try:
-            user_obj = (
-                db.query(models.Users).filter(models.Users.id == user.get("id")).first()
-            )
+            user_obj = await db.get(models.Users, user.get("id"))
             if user_obj:
-                send_order_confirmation_email(
+                # SMTP is blocking; keep it off the event loop
+                await asyncio.to_thread(
+                    send_order_confirmation_email,
                     user_obj.email,
                     user_obj.username,
                     {
@@ -615,27 +689,40 @@ async def create_order(
                     },
                 )
                 # Send admin notification
-                send_admin_new_order_notification(
+                await asyncio.to_thread(
+                    send_admin_new_order_notification,
                     {
                         "order_id": new_order.order_id,
                         "total": float(new_order.total),
                         "customer_name": user_obj.username,
-                    }
+                    },
                 )
         except Exception as e:
             logger.error(f"Failed to send order confirmation email: {str(e)}")
 
+        await publish_event(
+            ADMIN_ORDERS_CHANNEL,
+            "order_created",
+            {
+                "order_id": new_order.order_id,
+                "user_id": user.get("id"),
+                "customer_name": user.get("username"),
+                "total": float(new_order.total),
+                "status": new_order.status.value,
+            },
+        )
+
         logger.info(f"Order {new_order.order_id} created for user {user.get('id')}")
         return {
             "message": "Order created successfully",
             "order_id": new_order.order_id,
         }
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error creating order: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
     except ValueError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Invalid quantity value: {str(e)}")
         raise HTTPException(status_code=400, detail="Invalid quantity value")
 
@@ -768,6 +855,7 @@ async def update_order_status(
             raise HTTPException(status_code=404, detail="Order not found")
 
         # Update status from the request body
+        apply_status_change(db, order, order.status, request.status)
         order.status = request.status
 
         # Set completed_at if status is DELIVERED
@@ -780,6 +868,14 @@ async def update_order_status(
         db.commit()
         db.refresh(order)
 
+        event = {
+            "order_id": order.order_id,
+            "status": order.status.value,
+            "completed_at": order.completed_at,
+        }
+        await publish_event(order_channel(order.order_id), "order_status", event)
+        await publish_event(ADMIN_ORDERS_CHANNEL, "order_status", event)
+
         logger.info(
             f"Order {order_id} status updated to {request.status} by user {user.get('id')}"
         )
@@ -994,6 +1090,188 @@ async def fetch_all_orders(
         raise HTTPException(status_code=500, detail="Error fetching orders")
 
 
+ORDER_EXPORT_BATCH_SIZE = 500
+ORDER_EXPORT_COLUMNS = [
+    "order_id",
+    "datetime",
+    "status",
+    "user_id",
+    "username",
+    "total",
+    "delivery_fee",
+    "completed_at",
+    "first_name",
+    "last_name",
+    "phone_number",
+    "address",
+    "city",
+    "region",
+    "payment_status",
+    "transaction_code",
+    "product_id",
+    "product_name",
+    "quantity",
+    "line_total",
+]
+
+
+def iter_exported_orders(
+    start_date: Optional[date],
+    end_date: Optional[date],
+    order_status: Optional[OrderStatus],
+):
+    """Yield orders with lines, address and latest payment, one keyset batch at a time.
+
+    Each batch is three indexed queries (orders, their lines, their
+    transactions) over at most ORDER_EXPORT_BATCH_SIZE orders, so memory
+    stays flat however long the date range is.
+    """
+    with SessionLocal() as db:
+        query = (
+            db.query(
+                models.Orders.order_id,
+                models.Orders.datetime,
+                models.Orders.status,
+                models.Orders.user_id,
+                models.Orders.total,
+                models.Orders.delivery_fee,
+                models.Orders.completed_at,
+                models.Users.username,
+                models.Address.first_name,
+                models.Address.last_name,
+                models.Address.phone_number,
+                models.Address.address,
+                models.Address.city,
+                models.Address.region,
+            )
+            .outerjoin(models.Users, models.Orders.user_id == models.Users.id)
+            .outerjoin(models.Address, models.Orders.address_id == models.Address.id)
+        )
+        if start_date:
+            query = query.filter(
+                models.Orders.datetime >= datetime.combine(start_date, datetime.min.time())
+            )
+        if end_date:
+            query = query.filter(
+                models.Orders.datetime
+                < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+            )
+        if order_status:
+            query = query.filter(models.Orders.status == order_status)
+
+        last_id = 0
+        while True:
+            orders = (
+                query.filter(models.Orders.order_id > last_id)
+                .order_by(models.Orders.order_id)
+                .limit(ORDER_EXPORT_BATCH_SIZE)
+                .all()
+            )
+            if not orders:
+                break
+            order_ids = [order.order_id for order in orders]
+            last_id = order_ids[-1]
+
+            lines = collections.defaultdict(list)
+            for line in (
+                db.query(
+                    models.OrderDetails.order_id,
+                    models.OrderDetails.product_id,
+                    models.OrderDetails.quantity,
+                    models.OrderDetails.total_price,
+                    models.Products.name,
+                )
+                .outerjoin(
+                    models.Products, models.OrderDetails.product_id == models.Products.id
+                )
+                .filter(models.OrderDetails.order_id.in_(order_ids))
+                .order_by(models.OrderDetails.order_detail_id)
+            ):
+                lines[line.order_id].append(
+                    {
+                        "product_id": line.product_id,
+                        "product_name": line.name,
+                        "quantity": line.quantity,
+                        "line_total": line.total_price,
+                    }
+                )
+
+            # Ascending scan leaves the latest transaction per order last
+            payments = {}
+            for txn in (
+                db.query(
+                    models.Transaction._pid,
+                    models.Transaction._status,
+                    models.Transaction.transaction_code,
+                )
+                .filter(models.Transaction._pid.in_(order_ids))
+                .order_by(models.Transaction.created_at, models.Transaction.id)
+            ):
+                payments[txn._pid] = txn
+
+            for order in orders:
+                payment = payments.get(order.order_id)
+                yield {
+                    "order_id": order.order_id,
+                    "datetime": order.datetime.isoformat() if order.datetime else None,
+                    "status": order.status.value if order.status else None,
+                    "user_id": order.user_id,
+                    "username": order.username,
+                    "total": order.total,
+                    "delivery_fee": order.delivery_fee,
+                    "completed_at": (
+                        order.completed_at.isoformat() if order.completed_at else None
+                    ),
+                    "first_name": order.first_name,
+                    "last_name": order.last_name,
+                    "phone_number": order.phone_number,
+                    "address": order.address,
+                    "city": order.city,
+                    "region": order.region,
+                    "payment_status": payment._status.name if payment else None,
+                    "transaction_code": payment.transaction_code if payment else None,
+                    "items": lines.get(order.order_id, []),
+                }
+
+
+def flatten_order_lines(orders):
+    """One CSV row per order line; orders without lines still get a row"""
+    for order in orders:
+        items = order.pop("items") or [{}]
+        for item in items:
+            yield {**order, **item}
+
+
+@app.get("/admin/orders/export", status_code=status.HTTP_200_OK)
+async def export_orders(
+    user: user_dependency,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    status: Optional[OrderStatus] = None,
+):
+    """Stream orders with lines, address and payment status as CSV or NDJSON (admin only).
+
+    CSV has one row per order line; NDJSON one object per order with an
+    items array.
+    """
+    require_admin(user)
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(
+            status_code=400, detail="end_date must not be before start_date"
+        )
+
+    orders = iter_exported_orders(start_date, end_date, status)
+    if format == "csv":
+        orders = flatten_order_lines(orders)
+    logger.info(
+        f"Admin {user.get('id')} exporting orders ({format}, {start_date} to {end_date}, status {status})"
+    )
+    return streaming_download(
+        encode_rows(orders, ORDER_EXPORT_COLUMNS, format), format, "orders"
+    )
+
+
 # Superadmin-only endpoints 1
 @app.get("/superadmin/users", status_code=status.HTTP_200_OK)
 async def get_all_users(
@@ -1008,15 +1286,7 @@ async def get_all_users(
 ):
     """Get all users with pagination and search - accessible by superadmin only"""
     try:
-        query = db.query(Users)
-
-        # Apply role filter
-        if role_filter == "admin":
-            query = query.filter(Users.role == Role.ADMIN.value)
-        elif role_filter == "customer":
-            query = query.filter(Users.role == Role.CUSTOMER.value)
-        elif role_filter == "superadmin":
-            query = query.filter(Users.role == Role.SUPERADMIN.value)
+        query = apply_role_filter(db.query(Users), role_filter)
 
         result = get_paginated_users(db, query, page, limit, search)
         logger.info(
@@ -1032,17 +1302,24 @@ async def get_all_users(
         )
 
 
+def apply_role_filter(query, role_filter: Optional[str]):
+    """Apply the superadmin screens' role_filter query parameter"""
+    if role_filter == "admin":
+        query = query.filter(Users.role == Role.ADMIN.value)
+    elif role_filter == "customer":
+        query = query.filter(Users.role == Role.CUSTOMER.value)
+    elif role_filter == "superadmin":
+        query = query.filter(Users.role == Role.SUPERADMIN.value)
+    return query
+
+
 # Helper function for user queries with pagination
 def get_paginated_users(
     db: Session, query, page: int, limit: int, search: Optional[str] = None
 ):
     """Helper function to handle user pagination and search"""
     if search:
-        search_term = f"%{search.lower()}%"
-        query = query.filter(
-            (func.lower(Users.username).like(search_term))
-            | (func.lower(Users.email).like(search_term))
-        )
+        query = apply_user_search(query, search)
 
     total = query.count()
     offset = (page - 1) * limit
@@ -1075,6 +1352,173 @@ def get_paginated_users(
     }
 
 
+USER_EXPORT_COLUMNS = ["id", "username", "email", "role", "is_verified", "created_at"]
+USER_EXPORT_BATCH_SIZE = 1000
+USER_IMPORT_BATCH_SIZE = 500
+USER_IMPORT_MAX_ERRORS = 50
+
+
+def iter_exported_users(role_filter: Optional[str]):
+    """Stream users from a server-side cursor, USER_EXPORT_BATCH_SIZE rows at a time"""
+    # Own session: the response outlives the request's db dependency
+    with SessionLocal() as db:
+        query = apply_role_filter(
+            db.query(
+                Users.id,
+                Users.username,
+                Users.email,
+                Users.role,
+                Users.is_verified,
+                Users.created_at,
+            ),
+            role_filter,
+        ).order_by(Users.id)
+        for row in query.yield_per(USER_EXPORT_BATCH_SIZE):
+            yield {
+                "id": row.id,
+                "username": row.username,
+                "email": row.email,
+                "role": get_user_role(row.role),
+                "is_verified": row.is_verified,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+            }
+
+
+@app.get("/superadmin/users/export", status_code=status.HTTP_200_OK)
+async def export_users(
+    current_user: dict = Depends(require_superadmin),
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    role_filter: Optional[str] = Query(
+        "all", description="Filter by role: admin, customer, superadmin, all"
+    ),
+):
+    """Stream all users as CSV or NDJSON in constant memory - superadmin only"""
+    logger.info(
+        f"Superadmin {current_user['username']} exporting users ({format}, {role_filter})"
+    )
+    return streaming_download(
+        encode_rows(iter_exported_users(role_filter), USER_EXPORT_COLUMNS, format),
+        format,
+        "users",
+    )
+
+
+@app.post("/superadmin/users/import", status_code=status.HTTP_200_OK)
+async def import_users(
+    db: db_dependency,
+    current_user: dict = Depends(require_superadmin),
+    file: UploadFile = File(...),
+):
+    """Import users from a CSV with username,email,password[,role] columns.
+
+    Rows are validated, hashed in parallel and inserted in batches; existing
+    usernames/emails are skipped. Imported accounts are marked verified.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+    created = skipped = 0
+    errors = []
+    line_number = 1  # header
+
+    try:
+        while True:
+            batch = await asyncio.to_thread(
+                list, itertools.islice(reader, USER_IMPORT_BATCH_SIZE)
+            )
+            if not batch:
+                break
+
+            valid_rows = []
+            seen = set()
+            for row in batch:
+                line_number += 1
+                try:
+                    request = CreateUserRequest(
+                        username=(row.get("username") or "").strip(),
+                        email=(row.get("email") or "").strip(),
+                        password=row.get("password") or "",
+                    )
+                    role = Role((row.get("role") or Role.CUSTOMER.value).strip())
+                    if role == Role.SUPERADMIN or not request.username or not request.password:
+                        raise ValueError("username, password and a non-superadmin role are required")
+                except (ValidationError, ValueError) as e:
+                    if len(errors) < USER_IMPORT_MAX_ERRORS:
+                        errors.append({"line": line_number, "error": str(e)})
+                    continue
+                key_user, key_email = request.username.lower(), request.email.lower()
+                if key_user in seen or key_email in seen:
+                    skipped += 1
+                    continue
+                seen.update((key_user, key_email))
+                valid_rows.append((request, role))
+
+            if valid_rows:
+                existing = db.query(Users.username, Users.email).filter(
+                    or_(
+                        Users.username.in_([r.username for r, _ in valid_rows]),
+                        Users.email.in_([r.email for r, _ in valid_rows]),
+                    )
+                )
+                taken = set()
+                for username, email in existing:
+                    taken.update((username.lower(), email.lower()))
+                new_rows = [
+                    (r, role)
+                    for r, role in valid_rows
+                    if r.username.lower() not in taken and r.email.lower() not in taken
+                ]
+                skipped += len(valid_rows) - len(new_rows)
+
+                if new_rows:
+                    hashes = await password_hasher.hash_many(
+                        [r.password for r, _ in new_rows]
+                    )
+                    imported_by_role = collections.Counter(role for _, role in new_rows)
+                    for role, count in imported_by_role.items():
+                        bump_user_stats(db, role, count)
+                    db.execute(
+                        insert(Users),
+                        [
+                            {
+                                "username": r.username,
+                                "email": r.email,
+                                "hashed_password": hashed,
+                                "role": role.value,
+                                "is_verified": True,
+                            }
+                            for (r, role), hashed in zip(new_rows, hashes)
+                        ],
+                    )
+                    index_users(
+                        db,
+                        db.query(Users.id, Users.username, Users.email).filter(
+                            Users.username.in_([r.username for r, _ in new_rows])
+                        ),
+                    )
+                    db.commit()
+                    created += len(new_rows)
+
+        logger.info(
+            f"Superadmin {current_user['username']} imported {created} users ({skipped} skipped, {len(errors)} invalid)"
+        )
+        return {
+            "created": created,
+            "skipped": skipped,
+            "errors": errors,
+        }
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=400, detail=f"Unreadable CSV near line {line_number}: {str(e)}"
+        )
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error importing users: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import users after {created} rows",
+        )
+
+
 @app.get("/superadmin/users/{user_id}", status_code=status.HTTP_200_OK)
 async def get_user_by_id(
     user_id: int, db: db_dependency, current_user: dict = Depends(require_superadmin)
@@ -1117,32 +1561,17 @@ async def get_admin_stats(
 ):
     """Get user statistics for dashboard - accessible by superadmin only"""
     try:
-        # Count users by role
-        total_superadmins = (
-            db.query(Users).filter(Users.role == Role.SUPERADMIN.value).count()
-        )
-        total_admins = db.query(Users).filter(Users.role == Role.ADMIN.value).count()
-        total_customers = (
-            db.query(Users).filter(Users.role == Role.CUSTOMER.value).count()
-        )
-
-        # Count users created this month (if created_at field exists)
-        current_month_start = datetime.now().replace(
-            day=1, hour=0, minute=0, second=0, microsecond=0
-        )
-        monthly_counts = {"admins": 0, "customers": 0, "superadmins": 0}
-
-        if hasattr(Users, "created_at"):
-            for role, key in [
-                (Role.ADMIN.value, "admins"),
-                (Role.CUSTOMER.value, "customers"),
-                (Role.SUPERADMIN.value, "superadmins"),
-            ]:
-                monthly_counts[key] = (
-                    db.query(Users)
-                    .filter(Users.role == role, Users.created_at >= current_month_start)
-                    .count()
-                )
+        # Counters are maintained on signup/delete, so this reads a handful
+        # of rows no matter how many users exist
+        stats = read_user_stats(db)
+        total_superadmins = stats[Role.SUPERADMIN.value]["total"]
+        total_admins = stats[Role.ADMIN.value]["total"]
+        total_customers = stats[Role.CUSTOMER.value]["total"]
+        monthly_counts = {
+            "superadmins": stats[Role.SUPERADMIN.value]["this_month"],
+            "admins": stats[Role.ADMIN.value]["this_month"],
+            "customers": stats[Role.CUSTOMER.value]["this_month"],
+        }
 
         logger.info(
             f"User statistics retrieved by superadmin {current_user['username']}"
@@ -1197,11 +1626,12 @@ async def add_product_image(
     db.add(db_image)
     db.commit()
     db.refresh(db_image)
+    schedule_derivatives([db_image])
     return db_image
 
 
 @app.get("/products/{product_id}/images", response_model=List[ProductImageResponse])
-async def get_product_images(product_id: int, db: db_dependency):
+async def get_product_images(product_id: int, db: read_db_dependency):
     images = (
         db.query(models.ProductImage)
         .filter(models.ProductImage.product_id == product_id)
@@ -1234,7 +1664,7 @@ async def add_category_specification(
     "/categories/{category_id}/specifications",
     response_model=List[SpecificationResponse],
 )
-async def get_category_specifications(category_id: int, db: db_dependency):
+async def get_category_specifications(category_id: int, db: read_db_dependency):
     specs = (
         db.query(models.Specification)
         .filter(models.Specification.category_id == category_id)
@@ -1429,7 +1859,7 @@ async def add_product_specification(
     "/products/{product_id}/specifications",
     response_model=List[ProductSpecificationResponse],
 )
-async def get_product_specifications(product_id: int, db: db_dependency):
+async def get_product_specifications(product_id: int, db: read_db_dependency):
     specs = (
         db.query(models.ProductSpecification)
         .filter(models.ProductSpecification.product_id == product_id)
@@ -1439,25 +1869,135 @@ async def get_product_specifications(product_id: int, db: db_dependency):
 
 
 # --- Favorites (Wishlist) ---
+def load_favorite_product_ids(db: Session, user_id: int):
+    return favorite_ids.get(
+        user_id,
+        lambda: [
+            row.product_id
+            for row in db.query(models.Favorite.product_id).filter(
+                models.Favorite.user_id == user_id
+            )
+        ],
+    )
+
+
 @app.post("/favorites", response_model=FavoriteResponse)
 async def add_favorite(
     favorite: FavoriteCreate, db: db_dependency, user: user_dependency
 ):
-    db_fav = models.Favorite(user_id=user.get("id"), product_id=favorite.product_id)
-    db.add(db_fav)
+    """Favorite a product; favoriting it again returns the existing row"""
+    filters = (
+        models.Favorite.user_id == user.get("id"),
+        models.Favorite.product_id == favorite.product_id,
+    )
+    db_fav = db.query(models.Favorite).filter(*filters).first()
+    if db_fav:
+        return FavoriteResponse(
+            id=db_fav.id, user_id=db_fav.user_id, product_id=db_fav.product_id
+        )
+
+    try:
+        db_fav = models.Favorite(user_id=user.get("id"), product_id=favorite.product_id)
+        db.add(db_fav)
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent add, or the product does not exist
+        db.rollback()
+        db_fav = db.query(models.Favorite).filter(*filters).first()
+        if not db_fav:
+            raise HTTPException(status_code=404, detail="Product not found")
+    favorite_ids.invalidate(user.get("id"))
+    return FavoriteResponse(
+        id=db_fav.id, user_id=db_fav.user_id, product_id=db_fav.product_id
+    )
+
+
+@app.post("/favorites/bulk", response_model=FavoriteIdsResponse)
+async def add_favorites_bulk(
+    request: FavoriteBulkRequest, db: db_dependency, user: user_dependency
+):
+    """Favorite several products at once; already favorited or unknown ids are skipped"""
+    user_id = user.get("id")
+    requested = set(request.product_ids)
+    try:
+        existing = {
+            row.product_id
+            for row in db.query(models.Favorite.product_id).filter(
+                models.Favorite.user_id == user_id,
+                models.Favorite.product_id.in_(requested),
+            )
+        }
+        to_add = [
+            row.id
+            for row in db.query(models.Products.id).filter(
+                models.Products.id.in_(requested - existing)
+            )
+        ]
+        if to_add:
+            db.execute(
+                insert(models.Favorite),
+                [{"user_id": user_id, "product_id": pid} for pid in to_add],
+            )
+        db.commit()
+    except IntegrityError:
+        # A concurrent request added some of them first; retry one by one
+        db.rollback()
+        for pid in to_add:
+            try:
+                with db.begin_nested():
+                    db.add(models.Favorite(user_id=user_id, product_id=pid))
+            except IntegrityError:
+                pass
+        db.commit()
+    finally:
+        favorite_ids.invalidate(user_id)
+
+    return {"product_ids": sorted(load_favorite_product_ids(db, user_id))}
+
+
+@app.post("/favorites/bulk-delete", response_model=FavoriteIdsResponse)
+async def remove_favorites_bulk(
+    request: FavoriteBulkRequest, db: db_dependency, user: user_dependency
+):
+    """Unfavorite several products at once; ids that are not favorited are ignored"""
+    user_id = user.get("id")
+    db.query(models.Favorite).filter(
+        models.Favorite.user_id == user_id,
+        models.Favorite.product_id.in_(request.product_ids),
+    ).delete(synchronize_session=False)
     db.commit()
-    db.refresh(db_fav)
-    return db_fav
+    favorite_ids.invalidate(user_id)
+    return {"product_ids": sorted(load_favorite_product_ids(db, user_id))}
+
+
+@app.get("/favorites/ids", response_model=FavoriteIdsResponse)
+async def get_favorite_ids(db: db_dependency, user: user_dependency):
+    """Favorited product ids, for marking items in product listings"""
+    return {"product_ids": sorted(load_favorite_product_ids(db, user.get("id")))}
 
 
 @app.get("/favorites", response_model=List[FavoriteResponse])
-async def get_favorites(db: db_dependency, user: user_dependency):
-    favs = (
-        db.query(models.Favorite)
-        .filter(models.Favorite.user_id == user.get("id"))
-        .all()
+async def get_favorites(
+    db: db_dependency,
+    user: user_dependency,
+    expand: Optional[str] = Query(None, pattern="^products$"),
+):
+    """List favorites; expand=products embeds product summaries in the same query"""
+    query = db.query(models.Favorite).filter(
+        models.Favorite.user_id == user.get("id")
     )
-    return favs
+    if expand == "products":
+        return (
+            query.options(
+                joinedload(models.Favorite.product).joinedload(models.Products.images)
+            )
+            .order_by(models.Favorite.id.desc())
+            .all()
+        )
+    return [
+        FavoriteResponse(id=fav.id, user_id=fav.user_id, product_id=fav.product_id)
+        for fav in query.all()
+    ]
 
 
 @app.delete("/favorites/{favorite_id}", status_code=status.HTTP_200_OK)
@@ -1471,32 +2011,88 @@ async def delete_favorite(favorite_id: int, db: db_dependency, user: user_depend
         )
     db.delete(fav)
     db.commit()
+    favorite_ids.invalidate(user.get("id"))
     return {"message": "Favorite removed successfully"}
 
 
 # Utility function to calculate and update product rating from reviews
-def update_product_rating(db: Session, product_id: int):
-    """Calculate average rating from reviews and update product rating"""
-    try:
-        # Calculate average rating from all reviews for this product
-        avg_rating = (
-            db.query(func.avg(models.Review.rating))
-            .filter(models.Review.product_id == product_id)
-            .scalar()
-        )
+def rating_histogram_column(rating: Optional[int]):
+    if rating is not None and 1 <= rating <= 5:
+        return getattr(models.Products, f"rating_{rating}_count")
+    return None
 
-        # Update product rating
-        product = (
-            db.query(models.Products).filter(models.Products.id == product_id).first()
+
+def adjust_product_rating(
+    db: Session,
+    product_id: int,
+    old_rating: Optional[int] = None,
+    new_rating: Optional[int] = None,
+):
+    """Apply one review write to the product's running totals; the caller commits.
+
+    Pass old_rating=None for a new review and new_rating=None for a deleted
+    one. One UPDATE whatever the number of reviews. rating is assigned first
+    because MySQL evaluates SET clauses left to right against already
+    updated values, so it is written in terms of the old totals.
+    """
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    new_sum = models.Products.rating_sum + sum_delta
+    new_count = models.Products.rating_count + count_delta
+
+    values = [
+        (
+            models.Products.rating,
+            case((new_count > 0, new_sum * 1.0 / new_count), else_=0),
+        ),
+        (models.Products.rating_sum, new_sum),
+        (models.Products.rating_count, new_count),
+    ]
+    histogram = collections.Counter()
+    histogram[old_rating] -= 1
+    histogram[new_rating] += 1
+    for rating, delta in histogram.items():
+        column = rating_histogram_column(rating)
+        if column is not None and delta:
+            values.append((column, column + delta))
+
+    db.execute(
+        update(models.Products)
+        .where(models.Products.id == product_id)
+        .ordered_values(*values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+REVIEW_PAGE_SIZE = 20
+
+
+def fetch_review_page(
+    db: Session, product_id: int, limit: int, cursor: Optional[str] = None
+):
+    """Newest-first page of a product's reviews and the cursor for the next one"""
+    query = db.query(models.Review).filter(models.Review.product_id == product_id)
+    if cursor:
+        created_at, review_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                models.Review.created_at < created_at,
+                and_(
+                    models.Review.created_at == created_at,
+                    models.Review.id < review_id,
+                ),
+            )
         )
-        if product:
-            product.rating = float(avg_rating) if avg_rating else 0.0
-            db.commit()
-            return product.rating
-    except Exception as e:
-        logger.error(f"Error updating product rating: {str(e)}")
-        db.rollback()
-        return 0.0
+    reviews = (
+        query.order_by(models.Review.created_at.desc(), models.Review.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = encode_cursor(reviews[-1].created_at, reviews[-1].id)
+    return reviews, next_cursor
 
 
 @app.post("/reviews", response_model=ReviewResponse)
@@ -1524,14 +2120,13 @@ async def add_review(review: ReviewCreate, db: db_dependency, user: user_depende
             order_id=review.order_id,
             rating=review.rating,
             comment=review.comment,
+            username=user.get("username"),
         )
         db.add(db_review)
+        adjust_product_rating(db, review.product_id, new_rating=review.rating)
         db.commit()
         db.refresh(db_review)
 
-        # Update product rating
-        update_product_rating(db, review.product_id)
-
         return db_review
     except SQLAlchemyError as e:
         db.rollback()
@@ -1540,10 +2135,17 @@ async def add_review(review: ReviewCreate, db: db_dependency, user: user_depende
 
 
 @app.get("/products/{product_id}/reviews", response_model=List[ReviewResponse])
-async def get_product_reviews(product_id: int, db: db_dependency):
-    reviews = (
-        db.query(models.Review).filter(models.Review.product_id == product_id).all()
-    )
+async def get_product_reviews(
+    product_id: int,
+    db: read_db_dependency,
+    response: Response,
+    limit: int = Query(REVIEW_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+):
+    """Newest-first page of reviews; the next page's cursor is in X-Next-Cursor"""
+    reviews, next_cursor = fetch_review_page(db, product_id, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return reviews
 
 
@@ -1565,6 +2167,11 @@ async def update_review(
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
 
+        if review_update.rating != review.rating:
+            adjust_product_rating(
+                db, review.product_id, review.rating, review_update.rating
+            )
+
         # Update review fields
         review.rating = review_update.rating
         review.comment = review_update.comment
@@ -1572,9 +2179,6 @@ async def update_review(
         db.commit()
         db.refresh(review)
 
-        # Recalculate product rating
-        update_product_rating(db, review.product_id)
-
         return review
     except SQLAlchemyError as e:
         db.rollback()
@@ -1598,15 +2202,11 @@ async def delete_review(review_id: int, db: db_dependency, user: user_dependency
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
 
-        product_id = review.product_id
-
         # Delete the review
+        adjust_product_rating(db, review.product_id, old_rating=review.rating)
         db.delete(review)
         db.commit()
 
-        # Recalculate product rating
-        update_product_rating(db, product_id)
-
         return {"message": "Review deleted successfully"}
     except SQLAlchemyError as e:
         db.rollback()
@@ -1640,7 +2240,7 @@ async def create_subcategory(
     response_model=List[SubcategoryResponse],
     status_code=status.HTTP_200_OK,
 )
-async def get_category_subcategories(category_id: int, db: db_dependency):
+async def get_category_subcategories(category_id: int, db: read_db_dependency):
     try:
         subcategories = (
             db.query(models.Subcategory)
@@ -1676,7 +2276,7 @@ def format_specifications_to_string(
     response_model=List[SubcategoryResponse],
     status_code=status.HTTP_200_OK,
 )
-async def get_all_subcategories(db: db_dependency, category_id: int = None):
+async def get_all_subcategories(db: read_db_dependency, category_id: int = None):
     """Get all subcategories, optionally filtered by category"""
     try:
         query = db.query(models.Subcategory)
@@ -1695,7 +2295,7 @@ async def get_all_subcategories(db: db_dependency, category_id: int = None):
     response_model=SubcategoryResponse,
     status_code=status.HTTP_200_OK,
 )
-async def get_subcategory_by_id(subcategory_id: int, db: db_dependency):
+async def get_subcategory_by_id(subcategory_id: int, db: read_db_dependency):
     """Get a specific subcategory by ID"""
     try:
         subcategory = (
@@ -1794,7 +2394,7 @@ async def delete_subcategory(
 )
 async def get_products_by_subcategory(
     subcategory_id: int,
-    db: db_dependency,
+    db: read_db_dependency,
     page: int = 1,
     limit: int = 8,
     search: str = None,
@@ -1825,31 +2425,88 @@ async def get_products_by_subcategory(
         raise HTTPException(status_code=500, detail="Error fetching products")
 
 
-@app.post("/admin/recalculate-product-ratings", status_code=status.HTTP_200_OK)
-async def recalculate_all_product_ratings(db: db_dependency, user: user_dependency):
-    """Recalculate ratings for all products from their reviews"""
-    require_admin(user)
-    try:
-        # Get all products
-        products = db.query(models.Products).all()
-        updated_count = 0
+RATING_RECALC_CHUNK_SIZE = 1000
 
-        for product in products:
-            old_rating = product.rating
-            new_rating = update_product_rating(db, product.id)
-            if old_rating != new_rating:
-                updated_count += 1
 
-        return {
-            "message": f"Product ratings recalculated successfully",
-            "products_updated": updated_count,
-            "total_products": len(products),
-        }
-    except Exception as e:
-        logger.error(f"Error recalculating product ratings: {str(e)}")
-        raise HTTPException(
-            status_code=500, detail="Error recalculating product ratings"
-        )
+def recalculate_product_ratings(job: Job):
+    """Recompute every product's rating totals with chunked set-based UPDATEs.
+
+    Each chunk is one UPDATE over an id range whose values come from
+    correlated aggregates on reviews (indexed by product_id).
+    """
+    with SessionLocal() as db:
+        first_id, last_id, total = db.query(
+            func.min(models.Products.id),
+            func.max(models.Products.id),
+            func.count(models.Products.id),
+        ).one()
+        job.report(0, total)
+        if not total:
+            return {"products_updated": 0, "total_products": 0}
+
+        def review_aggregate(aggregate):
+            return (
+                select(aggregate)
+                .where(models.Review.product_id == models.Products.id)
+                .correlate(models.Products)
+                .scalar_subquery()
+            )
+
+        rating_sum = review_aggregate(func.coalesce(func.sum(models.Review.rating), 0))
+        rating_count = review_aggregate(func.count(models.Review.id))
+        histogram = [
+            (
+                rating_histogram_column(rating),
+                review_aggregate(
+                    func.count(case((models.Review.rating == rating, 1)))
+                ),
+            )
+            for rating in range(1, 6)
+        ]
+
+        processed = 0
+        for lower in range(first_id, last_id + 1, RATING_RECALC_CHUNK_SIZE):
+            upper = lower + RATING_RECALC_CHUNK_SIZE - 1
+            # rating goes first: MySQL evaluates SET left to right
+            result = db.execute(
+                update(models.Products)
+                .where(models.Products.id.between(lower, upper))
+                .ordered_values(
+                    (
+                        models.Products.rating,
+                        case(
+                            (rating_count > 0, rating_sum * 1.0 / rating_count),
+                            else_=0,
+                        ),
+                    ),
+                    (models.Products.rating_sum, rating_sum),
+                    (models.Products.rating_count, rating_count),
+                    *histogram,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            processed += result.rowcount
+            job.report(processed)
+
+    return {"products_updated": processed, "total_products": total}
+
+
+@app.post("/admin/recalculate-product-ratings", status_code=status.HTTP_202_ACCEPTED)
+async def recalculate_all_product_ratings(user: user_dependency):
+    """Start recalculating ratings for all products from their reviews"""
+    require_admin(user)
+    job = jobs.running("recalculate_product_ratings") or jobs.start(
+        "recalculate_product_ratings", recalculate_product_ratings, user.get("id")
+    )
+    logger.info(
+        f"Product rating recalculation job {job.id} started by user {user.get('id')}"
+    )
+    return {
+        "message": "Product rating recalculation started",
+        "job_id": job.id,
+        "status_url": f"/admin/jobs/{job.id}",
+    }
 
 
 if __name__ == "__main__":
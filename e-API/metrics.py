@@ -0,0 +1,103 @@
+"""
+Prometheus text exposition of database pool and password hashing metrics.
+
+GET /metrics is unauthenticated unless METRICS_TOKEN is set, in which case
+scrapers must send "Authorization: Bearer <METRICS_TOKEN>". Metrics are per
+worker process; scrape each worker or sum them in the query.
+"""
+
+import os
+import secrets
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from db_pool import pool_snapshot
+from password_hashing import password_hasher
+
+router = APIRouter(tags=["Metrics"])
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# name, type, help, snapshot key
+POOL_METRICS = [
+    ("db_pool_size", "gauge", "Configured persistent connections", "size"),
+    ("db_pool_checked_out", "gauge", "Connections currently in use", "checked_out"),
+    ("db_pool_checked_in", "gauge", "Idle connections in the pool", "checked_in"),
+    ("db_pool_overflow", "gauge", "Connections open beyond pool_size", "overflow"),
+    ("db_pool_max_overflow", "gauge", "Configured overflow limit", "max_overflow"),
+    ("db_pool_checkouts_total", "counter", "Connection checkouts", "checkouts"),
+    (
+        "db_pool_timeouts_total",
+        "counter",
+        "Checkouts that gave up after pool_timeout",
+        "timeouts",
+    ),
+    (
+        "db_pool_wait_seconds_total",
+        "counter",
+        "Time spent waiting for a connection",
+        "wait_seconds_total",
+    ),
+    (
+        "db_pool_wait_seconds_max",
+        "gauge",
+        "Longest wait for a connection since start",
+        "wait_seconds_max",
+    ),
+]
+
+HASHER_METRICS = [
+    ("password_hash_workers", "gauge", "Hashing threads", "workers"),
+    ("password_hash_in_flight", "gauge", "Hashes running or queued", "in_flight"),
+    ("password_hash_queued", "gauge", "Hashes waiting for a thread", "queued"),
+    ("password_hash_completed_total", "counter", "Hashes completed", "completed"),
+    (
+        "password_hash_rejected_total",
+        "counter",
+        "Hash requests rejected with 503",
+        "rejected",
+    ),
+    ("password_hash_rehashed_total", "counter", "Passwords rehashed", "rehashed"),
+    (
+        "password_hash_wait_seconds_total",
+        "counter",
+        "Time hashes spent queued",
+        "wait_seconds_total",
+    ),
+    (
+        "password_hash_run_seconds_total",
+        "counter",
+        "Time spent hashing",
+        "run_seconds_total",
+    ),
+]
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    pools = pool_snapshot()
+    for name, kind, help_text, key in POOL_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for label, stats in pools.items():
+            lines.append(f'{name}{{pool="{label}"}} {stats[key]}')
+
+    hasher = password_hasher.snapshot()
+    for name, kind, help_text, key in HASHER_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {hasher[key]}")
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus scrape endpoint"""
+    if METRICS_TOKEN and not secrets.compare_digest(
+        authorization or "", f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
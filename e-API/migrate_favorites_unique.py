@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Migration script to remove duplicate favorites and add the unique
+(user_id, product_id) constraint.
+Run this script to update your existing database.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def run_migration():
+    """Keep the oldest favorite per user/product and add uq_favorites_user_product"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            print("Removing duplicate favorites...")
+            result = conn.execute(
+                text(
+                    """
+                DELETE f FROM favorites f
+                JOIN favorites keep
+                  ON keep.user_id = f.user_id
+                 AND keep.product_id = f.product_id
+                 AND keep.id < f.id
+            """
+                )
+            )
+            print(f"✓ {result.rowcount} duplicate favorites removed")
+
+            result = conn.execute(
+                text(
+                    """
+                SELECT COUNT(*)
+                FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'favorites'
+                AND INDEX_NAME = 'uq_favorites_user_product'
+            """
+                )
+            )
+            if not result.scalar():
+                print("Adding uq_favorites_user_product...")
+                conn.execute(
+                    text(
+                        """
+                    ALTER TABLE favorites
+                    ADD CONSTRAINT uq_favorites_user_product UNIQUE (user_id, product_id)
+                """
+                    )
+                )
+                print("✓ uq_favorites_user_product added")
+
+            conn.commit()
+            print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting favorites migration...")
+    run_migration()
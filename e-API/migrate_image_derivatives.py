@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Migration script to add product_images.derivatives for the thumbnail /
+medium WebP and JPEG renditions.
+Run this script to update your existing database, then render derivatives
+for existing images with:
+    python image_pipeline.py
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def run_migration():
+    """Add the nullable derivatives JSON column"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(
+                text(
+                    """
+                SELECT COLUMN_NAME
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'product_images'
+                AND COLUMN_NAME = 'derivatives'
+            """
+                )
+            )
+            if not result.fetchall():
+                print("Adding product_images.derivatives...")
+                conn.execute(
+                    text("ALTER TABLE product_images ADD COLUMN derivatives JSON NULL")
+                )
+                print("✓ product_images.derivatives added")
+
+            conn.commit()
+            print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting image derivatives migration...")
+    run_migration()
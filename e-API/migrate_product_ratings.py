@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Migration script to add running rating totals (rating_sum, rating_count)
+to products and backfill them from existing reviews.
+Run this script to update your existing database.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def run_migration():
+    """Add products.rating_sum / rating_count and recompute rating from reviews"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(
+                text(
+                    """
+                SELECT COLUMN_NAME
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'products'
+                AND COLUMN_NAME IN ('rating_sum', 'rating_count')
+            """
+                )
+            )
+            existing_columns = [row[0] for row in result.fetchall()]
+
+            for column in ("rating_sum", "rating_count"):
+                if column not in existing_columns:
+                    print(f"Adding products.{column}...")
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE products ADD COLUMN {column} INT NOT NULL DEFAULT 0"
+                        )
+                    )
+                    print(f"✓ products.{column} added")
+
+            print("Backfilling rating totals from reviews...")
+            conn.execute(
+                text(
+                    """
+                UPDATE products p
+                LEFT JOIN (
+                    SELECT product_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+                    FROM reviews
+                    GROUP BY product_id
+                ) r ON r.product_id = p.id
+                SET p.rating = IF(r.rating_count > 0, r.rating_sum / r.rating_count, 0),
+                    p.rating_sum = COALESCE(r.rating_sum, 0),
+                    p.rating_count = COALESCE(r.rating_count, 0)
+            """
+                )
+            )
+            print("✓ rating totals backfilled")
+
+            conn.commit()
+            print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting product rating migration...")
+    run_migration()
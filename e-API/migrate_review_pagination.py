@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Migration script for paginated reviews: denormalizes the reviewer's
+username onto reviews, adds the (product_id, created_at, id) index and the
+per-product star histogram columns.
+Run this script to update your existing database.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HISTOGRAM_COLUMNS = [f"rating_{rating}_count" for rating in range(1, 6)]
+
+
+def run_migration():
+    """Add reviews.username, the keyset index and products.rating_N_count"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(
+                text(
+                    """
+                SELECT TABLE_NAME, COLUMN_NAME
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME IN ('reviews', 'products')
+            """
+                )
+            )
+            existing_columns = {(row[0], row[1]) for row in result.fetchall()}
+
+            if ("reviews", "username") not in existing_columns:
+                print("Adding reviews.username...")
+                conn.execute(
+                    text("ALTER TABLE reviews ADD COLUMN username VARCHAR(50) NULL")
+                )
+                print("✓ reviews.username added")
+
+            print("Copying usernames onto reviews...")
+            conn.execute(
+                text(
+                    """
+                UPDATE reviews r
+                JOIN users u ON u.id = r.user_id
+                SET r.username = u.username
+                WHERE r.username IS NULL
+            """
+                )
+            )
+            print("✓ usernames copied")
+
+            result = conn.execute(
+                text(
+                    """
+                SELECT COUNT(*)
+                FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'reviews'
+                AND INDEX_NAME = 'ix_reviews_product_created'
+            """
+                )
+            )
+            if not result.scalar():
+                print("Creating ix_reviews_product_created...")
+                conn.execute(
+                    text(
+                        """
+                    CREATE INDEX ix_reviews_product_created
+                    ON reviews (product_id, created_at, id)
+                """
+                    )
+                )
+                print("✓ ix_reviews_product_created created")
+
+            for column in HISTOGRAM_COLUMNS:
+                if ("products", column) not in existing_columns:
+                    print(f"Adding products.{column}...")
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE products ADD COLUMN {column} INT NOT NULL DEFAULT 0"
+                        )
+                    )
+                    print(f"✓ products.{column} added")
+
+            print("Backfilling star histograms from reviews...")
+            conn.execute(
+                text(
+                    """
+                UPDATE products p
+                LEFT JOIN (
+                    SELECT product_id,
+                           SUM(rating = 1) AS r1, SUM(rating = 2) AS r2,
+                           SUM(rating = 3) AS r3, SUM(rating = 4) AS r4,
+                           SUM(rating = 5) AS r5
+                    FROM reviews
+                    GROUP BY product_id
+                ) r ON r.product_id = p.id
+                SET p.rating_1_count = COALESCE(r.r1, 0),
+                    p.rating_2_count = COALESCE(r.r2, 0),
+                    p.rating_3_count = COALESCE(r.r3, 0),
+                    p.rating_4_count = COALESCE(r.r4, 0),
+                    p.rating_5_count = COALESCE(r.r5, 0)
+            """
+                )
+            )
+            print("✓ star histograms backfilled")
+
+            conn.commit()
+            print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting review pagination migration...")
+    run_migration()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the daily sales rollup tables and backfill them
+from order history.
+Run this script to update your existing database.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def run_migration():
+    """Create sales_daily_rollups / sales_daily_order_rollups and backfill"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            print("Creating sales_daily_rollups table...")
+            conn.execute(
+                text(
+                    """
+                CREATE TABLE IF NOT EXISTS sales_daily_rollups (
+                    day DATE NOT NULL,
+                    category_id INT NOT NULL DEFAULT 0,
+                    subcategory_id INT NOT NULL DEFAULT 0,
+                    region VARCHAR(100) NOT NULL DEFAULT '',
+                    revenue DECIMAL(16, 2) NOT NULL DEFAULT 0,
+                    cost DECIMAL(16, 2) NOT NULL DEFAULT 0,
+                    units DECIMAL(16, 2) NOT NULL DEFAULT 0,
+                    order_count INT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, category_id, subcategory_id, region)
+                )
+            """
+                )
+            )
+            print("✓ sales_daily_rollups table ready")
+
+            print("Creating sales_daily_order_rollups table...")
+            conn.execute(
+                text(
+                    """
+                CREATE TABLE IF NOT EXISTS sales_daily_order_rollups (
+                    day DATE NOT NULL,
+                    region VARCHAR(100) NOT NULL DEFAULT '',
+                    order_count INT NOT NULL DEFAULT 0,
+                    revenue DECIMAL(16, 2) NOT NULL DEFAULT 0,
+                    delivery_fees DECIMAL(16, 2) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, region)
+                )
+            """
+                )
+            )
+            conn.commit()
+            print("✓ sales_daily_order_rollups table ready")
+
+        from sales_analytics import rebuild_sales_rollups
+
+        print("Backfilling rollups from order history...")
+        with sessionmaker(bind=engine)() as session:
+            count = rebuild_sales_rollups(session)
+        print(f"✓ {count} rollup rows written")
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting sales rollup migration...")
+    run_migration()
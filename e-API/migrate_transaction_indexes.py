@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Migration script to add composite indexes used by the transaction history
+and order payment-status lookups.
+Run this script to update your existing database.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INDEXES = {
+    "ix_transactions_user_created": "(user_id, created_at)",
+    "ix_transactions_pid_created": "(_pid, created_at)",
+}
+
+
+def run_migration():
+    """Add composite indexes to the transactions table"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(
+                text(
+                    """
+                SELECT DISTINCT INDEX_NAME
+                FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'transactions'
+            """
+                )
+            )
+            existing_indexes = {row[0] for row in result.fetchall()}
+
+            for index_name, columns in INDEXES.items():
+                if index_name in existing_indexes:
+                    print(f"✓ {index_name} already exists")
+                    continue
+                print(f"Adding {index_name}...")
+                conn.execute(
+                    text(f"CREATE INDEX {index_name} ON transactions {columns}")
+                )
+                print(f"✓ {index_name} added")
+
+            conn.commit()
+            print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting transaction index migration...")
+    run_migration()
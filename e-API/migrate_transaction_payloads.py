@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Migration script to move raw M-Pesa payloads out of transactions._feedback
+into the compressed transaction_payloads side table.
+Run this script to update your existing database.
+"""
+
+import json
+import os
+import sys
+import zlib
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BATCH_SIZE = 500
+
+
+def run_migration():
+    """Copy _feedback into transaction_payloads, then drop the column"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            print("Creating transaction_payloads table...")
+            conn.execute(
+                text(
+                    """
+                CREATE TABLE IF NOT EXISTS transaction_payloads (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    transaction_id INT NOT NULL,
+                    kind VARCHAR(20) NOT NULL,
+                    encoding VARCHAR(10) NOT NULL,
+                    payload MEDIUMBLOB NOT NULL,
+                    created_at DATETIME NULL,
+                    FOREIGN KEY (transaction_id) REFERENCES transactions(id) ON DELETE CASCADE,
+                    INDEX ix_transaction_payloads_txn_created (transaction_id, created_at)
+                )
+            """
+                )
+            )
+            print("✓ transaction_payloads table ready")
+
+            result = conn.execute(
+                text(
+                    """
+                SELECT COLUMN_NAME
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'transactions'
+                AND COLUMN_NAME = '_feedback'
+            """
+                )
+            )
+            if not result.fetchall():
+                print("✓ _feedback column already removed")
+                conn.commit()
+                return
+
+            # Batches commit in id order, so a re-run after an interruption
+            # resumes after the last copied transaction instead of duplicating
+            last_id = conn.execute(
+                text(
+                    """
+                SELECT COALESCE(MAX(transaction_id), 0)
+                FROM transaction_payloads
+                WHERE kind = 'legacy'
+            """
+                )
+            ).scalar()
+            if last_id:
+                print(f"Resuming _feedback copy after transaction {last_id}...")
+            else:
+                print("Copying _feedback payloads...")
+            copied = 0
+            while True:
+                rows = conn.execute(
+                    text(
+                        """
+                    SELECT id, _feedback, COALESCE(updated_at, created_at)
+                    FROM transactions
+                    WHERE id > :last_id
+                    ORDER BY id
+                    LIMIT :batch
+                """
+                    ),
+                    {"last_id": last_id, "batch": BATCH_SIZE},
+                ).fetchall()
+                if not rows:
+                    break
+
+                batch = [
+                    {
+                        "transaction_id": row[0],
+                        "kind": "legacy",
+                        "encoding": "zlib",
+                        "payload": zlib.compress(
+                            (row[1] if isinstance(row[1], str) else json.dumps(row[1])).encode(),
+                            6,
+                        ),
+                        "created_at": row[2],
+                    }
+                    for row in rows
+                    if row[1] is not None
+                ]
+                if batch:
+                    conn.execute(
+                        text(
+                            """
+                        INSERT INTO transaction_payloads
+                            (transaction_id, kind, encoding, payload, created_at)
+                        VALUES
+                            (:transaction_id, :kind, :encoding, :payload, :created_at)
+                    """
+                        ),
+                        batch,
+                    )
+                conn.commit()
+                copied += len(batch)
+                last_id = rows[-1][0]
+            print(f"✓ {copied} payloads copied")
+
+            print("Dropping transactions._feedback...")
+            conn.execute(text("ALTER TABLE transactions DROP COLUMN _feedback"))
+            print("✓ _feedback column dropped")
+
+            conn.commit()
+            print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting transaction payload migration...")
+    run_migration()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the upload_blobs table used for
+content-addressed, reference-counted image storage.
+Run this script to update your existing database. Files uploaded before
+this change keep their uuid names and are not tracked as blobs.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def run_migration():
+    """Create upload_blobs"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            print("Creating upload_blobs table...")
+            conn.execute(
+                text(
+                    """
+                CREATE TABLE IF NOT EXISTS upload_blobs (
+                    digest VARCHAR(64) NOT NULL PRIMARY KEY,
+                    url VARCHAR(200) NOT NULL,
+                    size BIGINT NOT NULL,
+                    ref_count INT NOT NULL DEFAULT 0,
+                    created_at DATETIME NULL,
+                    UNIQUE INDEX ix_upload_blobs_url (url)
+                )
+            """
+                )
+            )
+            print("✓ upload_blobs table ready")
+
+            conn.commit()
+            print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting upload blob migration...")
+    run_migration()
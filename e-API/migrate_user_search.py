@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the user_search_grams trigram table and index
+every existing user.
+Run this script to update your existing database.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def run_migration():
+    """Create user_search_grams and fill it from users"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            print("Creating user_search_grams table...")
+            conn.execute(
+                text(
+                    """
+                CREATE TABLE IF NOT EXISTS user_search_grams (
+                    gram VARCHAR(3) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+                    user_id INT NOT NULL,
+                    PRIMARY KEY (gram, user_id),
+                    INDEX ix_user_search_grams_user_id (user_id),
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+                )
+            """
+                )
+            )
+            conn.commit()
+            print("✓ user_search_grams table ready")
+
+        from user_search import rebuild_user_search_index
+
+        print("Indexing existing users...")
+        with sessionmaker(bind=engine)() as session:
+            count = rebuild_user_search_index(session)
+        print(f"✓ {count} users indexed")
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting user search index migration...")
+    run_migration()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the user_stats counters table and fill it from
+the existing users.
+Run this script to update your existing database.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def run_migration():
+    """Create user_stats and backfill one counter per role and signup month"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            print("Creating user_stats table...")
+            conn.execute(
+                text(
+                    """
+                CREATE TABLE IF NOT EXISTS user_stats (
+                    role ENUM('ADMIN', 'CUSTOMER', 'SUPERADMIN') NOT NULL,
+                    month DATE NOT NULL,
+                    count INT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (role, month)
+                )
+            """
+                )
+            )
+            print("✓ user_stats table ready")
+
+            print("Backfilling counters from users...")
+            conn.execute(text("DELETE FROM user_stats"))
+            conn.execute(
+                text(
+                    """
+                INSERT INTO user_stats (role, month, count)
+                SELECT role,
+                       COALESCE(DATE_FORMAT(created_at, '%Y-%m-01'), '1970-01-01'),
+                       COUNT(*)
+                FROM users
+                GROUP BY role, COALESCE(DATE_FORMAT(created_at, '%Y-%m-01'), '1970-01-01')
+            """
+                )
+            )
+            print("✓ user_stats backfilled")
+
+            conn.commit()
+            print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting user stats migration...")
+    run_migration()
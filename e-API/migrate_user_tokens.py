@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Migration script to move verification and password-reset tokens off the
+users table into the hashed, indexed user_tokens table.
+Run this script to update your existing database.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LEGACY_COLUMNS = [
+    "verification_token",
+    "verification_expires",
+    "reset_token",
+    "reset_token_expires",
+]
+
+
+def run_migration():
+    """Create user_tokens, copy live tokens as SHA-256 digests, drop old columns"""
+    password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_name = os.getenv("DB_NAME", "ecommerce")
+    database_url = f"mysql+pymysql://root:{password}@{db_host}:3306/{db_name}"
+
+    engine = create_engine(database_url)
+
+    try:
+        with engine.connect() as conn:
+            print("Creating user_tokens table...")
+            conn.execute(
+                text(
+                    """
+                CREATE TABLE IF NOT EXISTS user_tokens (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    user_id INT NOT NULL,
+                    purpose VARCHAR(32) NOT NULL,
+                    token_hash VARCHAR(64) NOT NULL,
+                    expires_at DATETIME NOT NULL,
+                    created_at DATETIME NULL,
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                    UNIQUE INDEX ix_user_tokens_token_hash (token_hash),
+                    INDEX ix_user_tokens_user_id (user_id),
+                    INDEX ix_user_tokens_expires_at (expires_at)
+                )
+            """
+                )
+            )
+            print("✓ user_tokens table ready")
+
+            result = conn.execute(
+                text(
+                    """
+                SELECT COLUMN_NAME
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'users'
+                AND COLUMN_NAME IN ('verification_token', 'verification_expires',
+                                    'reset_token', 'reset_token_expires')
+            """
+                )
+            )
+            existing_columns = [row[0] for row in result.fetchall()]
+
+            if "verification_token" in existing_columns:
+                print("Copying unexpired verification tokens...")
+                conn.execute(
+                    text(
+                        """
+                    INSERT INTO user_tokens (user_id, purpose, token_hash, expires_at, created_at)
+                    SELECT id, 'EMAIL_VERIFICATION', SHA2(verification_token, 256),
+                           verification_expires, UTC_TIMESTAMP()
+                    FROM users
+                    WHERE verification_token IS NOT NULL
+                    AND is_verified = FALSE
+                    AND verification_expires > UTC_TIMESTAMP()
+                """
+                    )
+                )
+                print("✓ verification tokens copied")
+
+            if "reset_token" in existing_columns:
+                print("Copying unexpired password reset tokens...")
+                conn.execute(
+                    text(
+                        """
+                    INSERT INTO user_tokens (user_id, purpose, token_hash, expires_at, created_at)
+                    SELECT id, 'PASSWORD_RESET', SHA2(reset_token, 256),
+                           reset_token_expires, UTC_TIMESTAMP()
+                    FROM users
+                    WHERE reset_token IS NOT NULL
+                    AND reset_token_expires > UTC_TIMESTAMP()
+                """
+                    )
+                )
+                print("✓ password reset tokens copied")
+
+            for column in LEGACY_COLUMNS:
+                if column in existing_columns:
+                    print(f"Dropping users.{column}...")
+                    conn.execute(text(f"ALTER TABLE users DROP COLUMN {column}"))
+                    print(f"✓ users.{column} dropped")
+
+            conn.commit()
+            print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    print("Starting user token migration...")
+    run_migration()
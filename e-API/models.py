@@ -1,20 +1,26 @@
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     String,
     func,
     DateTime,
+    Date,
     Numeric,
     ForeignKey,
     Enum,
     Boolean,
     Text,
     Table,
+    Index,
+    UniqueConstraint,
+    LargeBinary,
 )
 from database import Base
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
+from sqlalchemy.dialects import mysql
 from sqlalchemy.dialects.mysql import JSON
 
 
@@ -32,6 +38,12 @@ class Role(enum.Enum):
     SUPERADMIN = "SUPERADMIN"
 
 
+class TokenPurpose(enum.Enum):
+    EMAIL_VERIFICATION = "email_verification"
+    PASSWORD_RESET = "password_reset"
+    REFRESH = "refresh"
+
+
 class OrderStatus(enum.Enum):
     PENDING = "pending"
     DELIVERED = "delivered"
@@ -49,10 +61,6 @@ class Users(Base):
     created_at = Column(DateTime, default=func.now())
     # Email verification fields
     is_verified = Column(Boolean, default=False, nullable=False)
-    verification_token = Column(String(255), nullable=True)
-    verification_expires = Column(DateTime, nullable=True)
-    reset_token = Column(String(255), nullable=True)
-    reset_token_expires = Column(DateTime, nullable=True)
     orders = relationship("Orders", back_populates="user")
     products = relationship("Products", back_populates="user")
     addresses = relationship("Address", back_populates="user")
@@ -63,6 +71,59 @@ class Users(Base):
     reviews = relationship(
         "Review", back_populates="user", cascade="all, delete-orphan"
     )
+    tokens = relationship(
+        "UserToken", back_populates="user", cascade="all, delete-orphan"
+    )
+
+
+# Single-use tokens sent by email (verification, password reset). Only the
+# SHA-256 digest is stored, behind a unique index for O(log n) lookups.
+class UserToken(Base):
+    __tablename__ = "user_tokens"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    purpose = Column(Enum(TokenPurpose, native_enum=False, length=32), nullable=False)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    user = relationship("Users", back_populates="tokens")
+
+
+# Access tokens revoked before expiry (logout). Workers mirror this table in
+# memory, see token_revocation.py; rows can be purged once expires_at passes.
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+# Per-role, per-month signup counters behind /superadmin/stats. Maintained
+# by user_stats.bump_user_stats and reconciled nightly against users.
+class UserStat(Base):
+    __tablename__ = "user_stats"
+    role = Column(Enum(Role), primary_key=True)
+    month = Column(Date, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+# Trigram index over lowercased username and email for superadmin user
+# search. Maintained by user_search.index_users / unindex_user.
+class UserSearchGram(Base):
+    __tablename__ = "user_search_grams"
+    gram = Column(
+        String(3).with_variant(mysql.VARCHAR(3, collation="utf8mb4_bin"), "mysql"),
+        primary_key=True,
+    )
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
 
 
 class Categories(Base):
@@ -102,6 +163,15 @@ class Products(Base):
     rating = Column(
         Numeric(precision=3, scale=2), nullable=True, default=0.0
     )  # New field (0.00 to 5.00)
+    # Running review totals; rating is derived from these on every review write
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    # Star histogram, maintained alongside the totals
+    rating_1_count = Column(Integer, nullable=False, default=0)
+    rating_2_count = Column(Integer, nullable=False, default=0)
+    rating_3_count = Column(Integer, nullable=False, default=0)
+    rating_4_count = Column(Integer, nullable=False, default=0)
+    rating_5_count = Column(Integer, nullable=False, default=0)
     discount = Column(
         Numeric(precision=5, scale=2), nullable=True, default=0.0
     )  # New field - discount percentage
@@ -179,6 +249,32 @@ class Address(Base):
     orders = relationship("Orders", back_populates="address")
 
 
+# Daily sales rollups. Lines are keyed by category/subcategory (0 when
+# unset) and delivery region ("" when unknown); maintained incrementally by
+# sales_analytics.apply_order_to_rollups and rebuilt by its backfill job.
+class SalesDailyRollup(Base):
+    __tablename__ = "sales_daily_rollups"
+    day = Column(Date, primary_key=True)
+    category_id = Column(Integer, primary_key=True, default=0)
+    subcategory_id = Column(Integer, primary_key=True, default=0)
+    region = Column(String(100), primary_key=True, default="")
+    revenue = Column(Numeric(precision=16, scale=2), nullable=False, default=0)
+    cost = Column(Numeric(precision=16, scale=2), nullable=False, default=0)
+    units = Column(Numeric(precision=16, scale=2), nullable=False, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+
+
+# Order-level totals per day and region; an order spanning several
+# categories is counted once here
+class SalesDailyOrderRollup(Base):
+    __tablename__ = "sales_daily_order_rollups"
+    day = Column(Date, primary_key=True)
+    region = Column(String(100), primary_key=True, default="")
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(precision=16, scale=2), nullable=False, default=0)
+    delivery_fees = Column(Numeric(precision=16, scale=2), nullable=False, default=0)
+
+
 class Transaction(Base):
     __tablename__ = "transactions"
 
@@ -196,7 +292,6 @@ class Transaction(Base):
     transaction_code = Column(String(100), unique=True, nullable=True)
     transaction_timestamp = Column(DateTime, default=datetime.utcnow)
     transaction_details = Column(Text, nullable=False)
-    _feedback = Column(JSON, nullable=False)
     _status = Column(Enum(TransactionStatus), default=TransactionStatus.PENDING)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, onupdate=func.now())
@@ -204,6 +299,35 @@ class Transaction(Base):
 
     user = relationship("Users", back_populates="transactions")
     order = relationship("Orders", back_populates="transactions")
+    payloads = relationship(
+        "TransactionPayload", back_populates="transaction", cascade="all, delete-orphan"
+    )
+
+    # InnoDB appends the primary key to secondary indexes, so these also
+    # serve the (created_at, id) keyset ordering used by the history endpoints
+    __table_args__ = (
+        Index("ix_transactions_user_created", "user_id", "created_at"),
+        Index("ix_transactions_pid_created", "_pid", "created_at"),
+    )
+
+
+# Raw M-Pesa request/callback payloads, compressed and kept off the hot
+# transactions row; only the transaction detail endpoint reads them
+class TransactionPayload(Base):
+    __tablename__ = "transaction_payloads"
+    id = Column(Integer, primary_key=True, index=True)
+    transaction_id = Column(
+        Integer, ForeignKey("transactions.id", ondelete="CASCADE"), nullable=False
+    )
+    kind = Column(String(20), nullable=False)  # e.g. 'stk_response', 'callback'
+    encoding = Column(String(10), nullable=False, default="zlib")
+    payload = Column(LargeBinary(length=16777215), nullable=False)  # MEDIUMBLOB
+    created_at = Column(DateTime, default=datetime.utcnow)
+    transaction = relationship("Transaction", back_populates="payloads")
+
+    __table_args__ = (
+        Index("ix_transaction_payloads_txn_created", "transaction_id", "created_at"),
+    )
 
 
 # New table for multiple product images
@@ -212,9 +336,23 @@ class ProductImage(Base):
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     img_url = Column(String(200), nullable=False)
+    # {"thumb": {"webp": url, "jpeg": url}, "medium": {...}}; filled in by
+    # image_pipeline once the renditions exist
+    derivatives = Column(JSON, nullable=True)
     product = relationship("Products", back_populates="images")
 
 
+# One row per stored upload, keyed by content hash. ref_count tracks how
+# many product_images rows point at url (see uploads.py mapper events).
+class UploadBlob(Base):
+    __tablename__ = "upload_blobs"
+    digest = Column(String(64), primary_key=True)
+    url = Column(String(200), unique=True, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 # New table for specifications linked to categories
 class Specification(Base):
     __tablename__ = "specifications"
@@ -246,6 +384,9 @@ class ProductSpecification(Base):
 # New table for favorites (wishlist)
 class Favorite(Base):
     __tablename__ = "favorites"
+    __table_args__ = (
+        UniqueConstraint("user_id", "product_id", name="uq_favorites_user_product"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
@@ -256,6 +397,10 @@ class Favorite(Base):
 # New table for reviews
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Keyset pagination of a product's reviews, newest first
+        Index("ix_reviews_product_created", "product_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
@@ -263,5 +408,7 @@ class Review(Base):
     rating = Column(Integer, nullable=False)
     comment = Column(String(1000), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Copied from users at write time so review pages need no join
+    username = Column(String(50), nullable=True)
     user = relationship("Users", back_populates="reviews")
     product = relationship("Products", back_populates="reviews")
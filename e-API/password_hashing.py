@@ -0,0 +1,133 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+
+# Work factor. Pinning min/max to the same value makes passlib flag every
+# hash made with a different factor, so logins rehash after a change.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+bcrypt_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism
+    without the pickling overhead of a process pool.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, max_queue: int):
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._in_flight = 0
+        self._metrics = {
+            "completed": 0,
+            "rejected": 0,
+            "rehashed": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    async def _run(self, fn: Callable, *args, enforce_cap: bool = True) -> Any:
+        if enforce_cap and self._in_flight >= self.workers + self.max_queue:
+            self._metrics["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, waited, ran = await loop.run_in_executor(self._executor, timed)
+        finally:
+            self._in_flight -= 1
+
+        self._metrics["completed"] += 1
+        self._metrics["wait_seconds_total"] += waited
+        self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], waited)
+        self._metrics["run_seconds_total"] += ran
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash a batch for bulk imports.
+
+        Submits at most one hash per worker at a time so interactive logins
+        queued in between are never stuck behind a whole import batch.
+        """
+        hashes: List[str] = []
+        for start in range(0, len(passwords), self.workers):
+            chunk = passwords[start : start + self.workers]
+            hashes.extend(
+                await asyncio.gather(
+                    *[
+                        self._run(self.context.hash, p, enforce_cap=False)
+                        for p in chunk
+                    ]
+                )
+            )
+        return hashes
+
+    async def verify_and_update(
+        self, password: str, hashed: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also returns a new hash if the work factor changed"""
+        valid, new_hash = await self._run(
+            self.context.verify_and_update, password, hashed
+        )
+        if new_hash:
+            self._metrics["rehashed"] += 1
+        return valid, new_hash
+
+    def snapshot(self) -> Dict[str, Any]:
+        completed = self._metrics["completed"]
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": max(self._in_flight - self.workers, 0),
+            "rounds": BCRYPT_ROUNDS,
+            **self._metrics,
+            "wait_ms_avg": (
+                self._metrics["wait_seconds_total"] / completed * 1000
+                if completed
+                else 0.0
+            ),
+        }
+
+
+password_hasher = PasswordHasher(
+    bcrypt_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
+)
@@ -45,6 +45,16 @@ class LoginUserRequest(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 
 class CategoryBase(BaseModel):
@@ -104,6 +114,7 @@ class ProductImageCreate(ProductImageBase):
 
 class ProductImageResponse(ProductImageBase):
     id: int
+    derivatives: Optional[Dict[str, Dict[str, str]]] = None
 
     class Config:
         from_attributes = True
@@ -152,14 +163,40 @@ class FavoriteCreate(FavoriteBase):
     user_id: Optional[int] = None
 
 
+class FavoriteProductSummary(BaseModel):
+    id: int
+    name: str
+    price: float
+    original_price: Optional[float] = None
+    discount: Optional[float] = 0.0
+    stock_quantity: float
+    brand: Optional[str] = None
+    rating: Optional[float] = 0.0
+    rating_count: Optional[int] = 0
+    images: List[ProductImageResponse] = []
+
+    class Config:
+        from_attributes = True
+
+
 class FavoriteResponse(FavoriteBase):
     id: int
     user_id: int
+    # Only populated for GET /favorites?expand=products
+    product: Optional[FavoriteProductSummary] = None
 
     class Config:
         from_attributes = True
 
 
+class FavoriteBulkRequest(BaseModel):
+    product_ids: List[int] = Field(..., min_length=1, max_length=500)
+
+
+class FavoriteIdsResponse(BaseModel):
+    product_ids: List[int]
+
+
 class ReviewBase(BaseModel):
     rating: int
     comment: Optional[str] = None
@@ -191,13 +228,21 @@ class ProductResponse(ProductsBase):
     subcategory: Optional[SubcategoryResponse]  # New field
     images: Optional[List[ProductImageResponse]] = []
     product_specifications: Optional[List[ProductSpecificationResponse]] = []
-    favorites: Optional[List[FavoriteResponse]] = []
+    # No favorites list: it grows with popularity and clients use /favorites/ids
     reviews: Optional[List[ReviewResponse]] = []
+    rating: Optional[float] = 0.0
+    rating_count: Optional[int] = 0
 
     class Config:
         from_attributes = True
 
 
+class ProductDetailResponse(ProductResponse):
+    # reviews holds only the newest page; fetch more with the cursor
+    rating_histogram: Dict[int, int] = {}
+    reviews_next_cursor: Optional[str] = None
+
+
 class CartItem(BaseModel):
     id: int
     quantity: float
@@ -250,6 +295,7 @@ class EmailVerificationResponse(BaseModel):
     message: str
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
     user_role: str
     username: str
 
@@ -0,0 +1,222 @@
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Optional shared state across workers, e.g. redis://localhost:6379/1
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+# Only trust X-Forwarded-For when running behind our own proxy
+RATE_LIMIT_TRUST_FORWARDED = (
+    os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Token bucket: `capacity` requests in a burst, refilled at `per_seconds` pace"""
+
+    capacity: int
+    per_seconds: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+
+@dataclass(frozen=True)
+class RouteRule:
+    name: str
+    budget: Budget
+    # Only limit when this query parameter is present (e.g. ?search=)
+    query_param: Optional[str] = None
+
+
+# Per-IP budgets, keyed by (method, path)
+ROUTE_RULES: Dict[Tuple[str, str], RouteRule] = {
+    ("POST", "/auth/login"): RouteRule("login", Budget(10, 60)),
+    ("POST", "/auth/register/customer"): RouteRule("register", Budget(5, 600)),
+    ("POST", "/auth/request-password-reset"): RouteRule(
+        "password_reset", Budget(5, 900)
+    ),
+    ("POST", "/auth/resend-verification"): RouteRule(
+        "resend_verification", Budget(5, 900)
+    ),
+    ("GET", "/public/products"): RouteRule(
+        "product_search", Budget(30, 15), query_param="search"
+    ),
+}
+
+# Per-account budgets, enforced inside the handlers that know the account
+ACCOUNT_BUDGETS: Dict[str, Budget] = {
+    # Login is keyed by account and caller IP
+    "login": Budget(5, 300),
+    "register": Budget(3, 3600),
+    "password_reset": Budget(3, 900),
+    "resend_verification": Budget(3, 900),
+}
+
+
+class InMemoryBucketStore:
+    """Token buckets for this worker, evicting the least recently used keys"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._max_keys = max_keys
+
+    async def take(self, key: str, budget: Budget) -> float:
+        """Consume one token; returns 0 if allowed, else seconds until retry"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (budget.capacity, now))
+        tokens = min(budget.capacity, tokens + (now - updated) * budget.refill_rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            retry_after = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = (1 - tokens) / budget.refill_rate
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self._max_keys:
+            # An evicted bucket simply starts full again next time
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RedisBucketStore:
+    """Token buckets shared by every worker through Redis"""
+
+    # KEYS[1] bucket; ARGV capacity, refill rate (tokens/s), ttl (s)
+    SCRIPT = """
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry_after = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    return tostring(retry_after)
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    async def take(self, key: str, budget: Budget) -> float:
+        result = await self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[budget.capacity, budget.refill_rate, math.ceil(budget.per_seconds)],
+        )
+        return float(result)
+
+
+class RateLimiter:
+    def __init__(self, store):
+        self.store = store
+
+    async def hit(self, key: str, budget: Budget) -> float:
+        try:
+            return await self.store.take(key, budget)
+        except Exception as e:
+            # Fail open: a limiter outage must not take logins down with it
+            logger.error(f"Rate limiter backend failed: {str(e)}")
+            return 0.0
+
+
+def create_limiter() -> RateLimiter:
+    if RATE_LIMIT_REDIS_URL:
+        logger.info("Using Redis rate limit store")
+        return RateLimiter(RedisBucketStore(RATE_LIMIT_REDIS_URL))
+    return RateLimiter(InMemoryBucketStore())
+
+
+limiter = create_limiter()
+
+
+async def enforce_account_limit(rule_name: str, account) -> None:
+    """Per-account limit for handlers; raises 429 with Retry-After when exceeded"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    retry_after = await limiter.hit(
+        f"acct:{rule_name}:{str(account).lower()}", ACCOUNT_BUDGETS[rule_name]
+    )
+    if retry_after:
+        logger.warning(f"Rate limit hit for {rule_name} on account {account}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def client_ip(scope) -> str:
+    """The caller's address, from X-Forwarded-For when behind our proxy"""
+    if RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode().split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """Per-IP token-bucket limits for the routes listed in ROUTE_RULES.
+
+    Plain ASGI rather than BaseHTTPMiddleware: unlimited routes cost one
+    dict lookup, limited ones a bucket update.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+
+        rule = ROUTE_RULES.get((scope["method"], scope["path"]))
+        if rule is None or (
+            rule.query_param
+            and rule.query_param not in parse_qs(scope["query_string"].decode())
+        ):
+            return await self.app(scope, receive, send)
+
+        ip = client_ip(scope)
+        retry_after = await limiter.hit(f"ip:{rule.name}:{ip}", rule.budget)
+        if not retry_after:
+            return await self.app(scope, receive, send)
+
+        logger.warning(f"Rate limit hit for {rule.name} from {ip}")
+        body = json.dumps({"detail": "Too many requests, please try again later"})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(math.ceil(retry_after)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body.encode()})
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Set
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+
+import models
+from auth import get_active_user
+from database import SessionLocal
+from pydantic_models import Role
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+# Broker configuration. Leave REALTIME_BROKER_URL unset for a single worker;
+# point it at redis://... when running several uvicorn/gunicorn workers.
+REALTIME_BROKER_URL = os.getenv("REALTIME_BROKER_URL", "")
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+REALTIME_HEARTBEAT_SECONDS = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", "15"))
+
+ADMIN_ORDERS_CHANNEL = "admin:orders"
+
+
+def order_channel(order_id: int) -> str:
+    """Channel carrying status changes for a single order"""
+    return f"order:{order_id}"
+
+
+class Subscription:
+    """A single subscriber's bounded queue on one channel"""
+
+    def __init__(self, broker: "InProcessBroker", channel: str):
+        self.broker = broker
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=REALTIME_QUEUE_SIZE)
+
+    async def get(self, timeout: float) -> Dict[str, Any]:
+        """Wait for the next event; raises asyncio.TimeoutError when idle"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fans events out to subscribers connected to this worker process"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, event: Dict[str, Any]):
+        self._fan_out(channel, event)
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel)
+        self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.channel)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.channel]
+
+    def _fan_out(self, channel: str, event: Dict[str, Any]):
+        for subscription in list(self._subscribers.get(channel, ())):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A stalled client must not hold up everyone else
+                logger.warning(f"Dropping event for slow subscriber on {channel}")
+
+
+class RedisBroker(InProcessBroker):
+    """Relays events through Redis pub/sub so every worker receives them"""
+
+    PREFIX = "flowtech:events:"
+
+    def __init__(self, url: str):
+        super().__init__()
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.from_url(url)
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.psubscribe(f"{self.PREFIX}*")
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+        if self._pubsub:
+            await self._pubsub.close()
+        await self._redis.close()
+
+    async def publish(self, channel: str, event: Dict[str, Any]):
+        await self._redis.publish(
+            f"{self.PREFIX}{channel}", json.dumps(event, default=str)
+        )
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"].decode()[len(self.PREFIX) :]
+                    self._fan_out(channel, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis event listener failed: {str(e)}")
+                await asyncio.sleep(1)
+
+
+def create_broker() -> InProcessBroker:
+    if REALTIME_BROKER_URL.startswith(("redis://", "rediss://")):
+        logger.info("Using Redis event broker")
+        return RedisBroker(REALTIME_BROKER_URL)
+    return InProcessBroker()
+
+
+broker = create_broker()
+
+
+async def publish_event(channel: str, event_type: str, data: Dict[str, Any]):
+    """Publish an event without ever failing the calling request"""
+    try:
+        await broker.publish(channel, {"type": event_type, "data": data})
+    except Exception as e:
+        logger.error(f"Failed to publish {event_type} on {channel}: {str(e)}")
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    payload = json.dumps(event["data"], default=str)
+    return f"event: {event['type']}\ndata: {payload}\n\n"
+
+
+async def _event_stream(
+    request: Request, subscription: Subscription, snapshot: Optional[Dict] = None
+):
+    try:
+        yield "retry: 3000\n\n"
+        if snapshot is not None:
+            yield _format_sse({"type": "snapshot", "data": snapshot})
+        while not await request.is_disconnected():
+            try:
+                event = await subscription.get(REALTIME_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            yield _format_sse(event)
+    finally:
+        subscription.close()
+
+
+def _sse_response(stream) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+oauth2_optional = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
+
+
+async def get_stream_user(
+    header_token: Optional[str] = Depends(oauth2_optional),
+    token: Optional[str] = Query(None),
+):
+    """Authenticate a stream; EventSource cannot set headers, so ?token= works too"""
+    raw_token = header_token or token
+    if not raw_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await get_active_user(raw_token)
+
+
+def _order_snapshot(order_id: int, user: dict) -> Dict[str, Any]:
+    # Short-lived session: the stream itself may stay open for minutes and
+    # must not pin a pooled connection while it waits for events
+    with SessionLocal() as db:
+        order = (
+            db.query(models.Orders).filter(models.Orders.order_id == order_id).first()
+        )
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if order.user_id != user["id"] and user["role"] not in [
+            Role.ADMIN.value,
+            Role.SUPERADMIN.value,
+        ]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to follow this order",
+            )
+        transaction = (
+            db.query(models.Transaction)
+            .filter(models.Transaction._pid == order_id)
+            .order_by(models.Transaction.created_at.desc(), models.Transaction.id.desc())
+            .first()
+        )
+        return {
+            "order_id": order.order_id,
+            "order_status": order.status.value,
+            "payment_status": transaction._status.value if transaction else None,
+            "transaction_code": transaction.transaction_code if transaction else None,
+        }
+
+
+@router.get("/orders/{order_id}")
+async def stream_order_events(
+    order_id: int, request: Request, user: dict = Depends(get_stream_user)
+):
+    """Stream payment and status updates for one of the user's orders"""
+    snapshot = _order_snapshot(order_id, user)
+    subscription = broker.subscribe(order_channel(order_id))
+    logger.info(f"User {user['id']} subscribed to order {order_id} events")
+    return _sse_response(_event_stream(request, subscription, snapshot))
+
+
+@router.get("/admin/orders")
+async def stream_admin_order_events(
+    request: Request, user: dict = Depends(get_stream_user)
+):
+    """Stream new orders and order/payment status changes to admins"""
+    if user["role"] not in [Role.ADMIN.value, Role.SUPERADMIN.value]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required to access this resource",
+        )
+    subscription = broker.subscribe(ADMIN_ORDERS_CHANNEL)
+    logger.info(f"Admin {user['id']} subscribed to order events")
+    return _sse_response(_event_stream(request, subscription))
@@ -0,0 +1,234 @@
+"""
+Read-replica routing for read-only handlers.
+
+Handlers opt in by taking read_db_dependency / async_read_db_dependency
+instead of db_dependency. Such a request goes to the replica unless:
+    - no replica is configured (REPLICA_DATABASE_URL / DB_REPLICA_HOST),
+    - the replica lags more than REPLICA_MAX_LAG_SECONDS behind the primary
+      (checked at most every REPLICA_LAG_CHECK_SECONDS; MySQL only), or
+    - the same user or the same client IP made a successful write within
+      the last REPLICA_STICKY_SECONDS, so they read their own write.
+
+Writes are recorded by ReadYourWritesMiddleware for every successful
+non-GET request. Set REPLICA_STICKY_REDIS_URL to share that record
+between workers; otherwise it is per worker.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Annotated, List, Optional
+
+import jwt
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+
+import database
+from auth import ALGORITHM, SECRET_KEY
+from rate_limit import client_ip
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "2"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+REPLICA_STICKY_REDIS_URL = os.getenv("REPLICA_STICKY_REDIS_URL", "")
+REPLICA_STICKY_MAX_KEYS = int(os.getenv("REPLICA_STICKY_MAX_KEYS", "100000"))
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class InMemoryStickyStore:
+    """Recent writers for this worker, evicting the oldest entries"""
+
+    def __init__(self, max_keys: int = REPLICA_STICKY_MAX_KEYS):
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+        self._max_keys = max_keys
+
+    async def mark(self, identity: str, seconds: float) -> None:
+        self._until[identity] = time.monotonic() + seconds
+        self._until.move_to_end(identity)
+        if len(self._until) > self._max_keys:
+            self._until.popitem(last=False)
+
+    async def is_sticky(self, identity: str) -> bool:
+        until = self._until.get(identity)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del self._until[identity]
+            return False
+        return True
+
+
+class RedisStickyStore:
+    """Recent writers shared by every worker through Redis"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.from_url(url)
+
+    async def mark(self, identity: str, seconds: float) -> None:
+        await self._redis.set(f"primary-read:{identity}", 1, px=int(seconds * 1000))
+
+    async def is_sticky(self, identity: str) -> bool:
+        return bool(await self._redis.exists(f"primary-read:{identity}"))
+
+
+class ReplicaLagMonitor:
+    """Cached answer to "is the replica fresh enough to read from?"."""
+
+    def __init__(self):
+        self._healthy = False
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self.last_lag: Optional[float] = None
+
+    async def _measure_lag(self) -> Optional[float]:
+        """Seconds behind the primary; None if replication is broken"""
+        engine = database.replica_async_engine
+        if engine.dialect.name != "mysql":
+            # SQLite files and other test setups have no replication to lag
+            return 0.0
+        async with engine.connect() as conn:
+            for statement, column in (
+                ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+                ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+            ):
+                try:
+                    row = (await conn.execute(text(statement))).mappings().first()
+                except Exception:
+                    continue  # MySQL before 8.0.22 only knows SHOW SLAVE STATUS
+                if row is None:
+                    # A standalone server (e.g. a local copy) has nothing to lag behind
+                    return 0.0
+                lag = row.get(column)
+                return None if lag is None else float(lag)
+        return None
+
+    async def healthy(self) -> bool:
+        if time.monotonic() - self._checked_at < REPLICA_LAG_CHECK_SECONDS:
+            return self._healthy
+        async with self._lock:
+            if time.monotonic() - self._checked_at < REPLICA_LAG_CHECK_SECONDS:
+                return self._healthy
+            try:
+                self.last_lag = await self._measure_lag()
+            except Exception as e:
+                logger.error(f"Replica lag check failed: {str(e)}")
+                self.last_lag = None
+            healthy = (
+                self.last_lag is not None and self.last_lag <= REPLICA_MAX_LAG_SECONDS
+            )
+            if healthy != self._healthy:
+                logger.warning(
+                    f"Replica {'in use' if healthy else 'bypassed'} (lag: {self.last_lag})"
+                )
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+            return healthy
+
+
+def create_sticky_store():
+    if REPLICA_STICKY_REDIS_URL:
+        logger.info("Using Redis read-your-writes store")
+        return RedisStickyStore(REPLICA_STICKY_REDIS_URL)
+    return InMemoryStickyStore()
+
+
+sticky_writers = create_sticky_store()
+lag_monitor = ReplicaLagMonitor()
+
+
+def request_identities(scope) -> List[str]:
+    """The client IP, plus the signed-in user if the bearer token is valid.
+
+    Writes mark both, so a read matches either one: the catalog pages fetch
+    anonymously even when the same browser wrote with a token.
+    """
+    identities = [f"ip:{client_ip(scope)}"]
+    authorization = Headers(scope=scope).get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+            if payload.get("id") is not None:
+                identities.append(f"user:{payload['id']}")
+        except jwt.PyJWTError:
+            pass
+    return identities
+
+
+async def use_replica(request: Request) -> bool:
+    if database.AsyncReplicaSessionLocal is None:
+        return False
+    try:
+        for identity in request_identities(request.scope):
+            if await sticky_writers.is_sticky(identity):
+                return False
+    except Exception as e:
+        logger.error(f"Read-your-writes lookup failed: {str(e)}")
+        return False
+    return await lag_monitor.healthy()
+
+
+async def get_read_db(request: Request):
+    """Sync session on the replica when safe, else on the primary"""
+    factory = (
+        database.ReplicaSessionLocal
+        if await use_replica(request)
+        else database.SessionLocal
+    )
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Async session on the replica when safe, else on the primary"""
+    factory = (
+        database.AsyncReplicaSessionLocal
+        if await use_replica(request)
+        else database.AsyncSessionLocal
+    )
+    async with factory() as db:
+        yield db
+
+
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
+async_read_db_dependency = Annotated[AsyncSession, Depends(get_async_read_db)]
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client to the primary for a while after each successful write"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or database.AsyncReplicaSessionLocal is None
+        ):
+            return await self.app(scope, receive, send)
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                try:
+                    for identity in request_identities(scope):
+                        await sticky_writers.mark(identity, REPLICA_STICKY_SECONDS)
+                except Exception as e:
+                    logger.error(f"Failed to record write for replica routing: {str(e)}")
+            await send(message)
+
+        await self.app(scope, receive, send_and_record)
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Pre-aggregated daily sales rollups and the admin analytics API.
+
+Every non-cancelled order contributes to two rollups:
+    sales_daily_rollups        day x category x subcategory x region lines
+    sales_daily_order_rollups  day x region order totals
+They are updated in the same transaction as order creation and
+cancellation, so reports never touch orders/order_details.
+
+Margins use Products.cost at the time the order is recorded (order lines
+do not snapshot cost); a backfill recomputes them with current costs.
+
+Run this module directly to rebuild the rollups from order history:
+    python sales_analytics.py [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import models
+from auth import require_admin_or_above
+from database import db_dependency
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin/analytics", tags=["Analytics"])
+
+BACKFILL_WINDOW_DAYS = 31
+UNKNOWN_REGION = ""
+
+
+def counts_as_sale(order_status) -> bool:
+    """Cancelled orders are excluded from the rollups"""
+    return getattr(order_status, "value", order_status) != (
+        models.OrderStatus.CANCELLED.value
+    )
+
+
+def _bump(db: Session, model, key: Dict[str, Any], deltas: Dict[str, Any]) -> None:
+    """Add deltas to the rollup row at key, creating it if needed"""
+    filters = [getattr(model, column) == value for column, value in key.items()]
+    values = {
+        getattr(model, column): getattr(model, column) + delta
+        for column, delta in deltas.items()
+    }
+    if db.query(model).filter(*filters).update(values, synchronize_session=False):
+        return
+    try:
+        with db.begin_nested():
+            db.add(model(**key, **deltas))
+    except IntegrityError:
+        db.query(model).filter(*filters).update(values, synchronize_session=False)
+
+
+def apply_order_to_rollups(db: Session, order: models.Orders, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) an order's contribution; caller commits"""
+    # Sessions run with autoflush off; pending order lines must be visible below
+    db.flush()
+    day = (order.datetime or datetime.now()).date()
+    region = UNKNOWN_REGION
+    if order.address_id:
+        region = (
+            db.query(models.Address.region)
+            .filter(models.Address.id == order.address_id)
+            .scalar()
+            or UNKNOWN_REGION
+        )
+
+    lines = (
+        db.query(
+            models.OrderDetails.quantity,
+            models.OrderDetails.total_price,
+            models.Products.category_id,
+            models.Products.subcategory_id,
+            models.Products.cost,
+        )
+        .join(models.Products, models.OrderDetails.product_id == models.Products.id)
+        .filter(models.OrderDetails.order_id == order.order_id)
+        .all()
+    )
+
+    groups = defaultdict(lambda: [Decimal("0"), Decimal("0"), Decimal("0")])
+    for line in lines:
+        totals = groups[(line.category_id or 0, line.subcategory_id or 0)]
+        totals[0] += line.total_price or 0
+        totals[1] += (line.cost or 0) * (line.quantity or 0)
+        totals[2] += line.quantity or 0
+
+    for (category_id, subcategory_id), (revenue, cost, units) in groups.items():
+        _bump(
+            db,
+            models.SalesDailyRollup,
+            {
+                "day": day,
+                "category_id": category_id,
+                "subcategory_id": subcategory_id,
+                "region": region,
+            },
+            {
+                "revenue": sign * revenue,
+                "cost": sign * cost,
+                "units": sign * units,
+                "order_count": sign,
+            },
+        )
+
+    _bump(
+        db,
+        models.SalesDailyOrderRollup,
+        {"day": day, "region": region},
+        {
+            "order_count": sign,
+            "revenue": sign * (order.total or 0),
+            "delivery_fees": sign * (order.delivery_fee or 0),
+        },
+    )
+
+
+def apply_status_change(
+    db: Session, order: models.Orders, previous_status, new_status
+) -> None:
+    """Keep rollups in step when an order is cancelled or un-cancelled"""
+    was_counted = counts_as_sale(previous_status)
+    is_counted = counts_as_sale(new_status)
+    if was_counted and not is_counted:
+        apply_order_to_rollups(db, order, -1)
+    elif is_counted and not was_counted:
+        apply_order_to_rollups(db, order, 1)
+
+
+def _as_date(value) -> date:
+    # DATE() comes back as a string on SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _rebuild_window(db: Session, start: date, end: date) -> int:
+    start_at = datetime.combine(start, datetime.min.time())
+    end_at = datetime.combine(end, datetime.min.time())
+    day = func.date(models.Orders.datetime)
+    region = func.coalesce(models.Address.region, UNKNOWN_REGION)
+    category_id = func.coalesce(models.Products.category_id, 0)
+    subcategory_id = func.coalesce(models.Products.subcategory_id, 0)
+    counted = [
+        models.Orders.status != models.OrderStatus.CANCELLED,
+        models.Orders.datetime >= start_at,
+        models.Orders.datetime < end_at,
+    ]
+
+    lines = (
+        db.query(
+            day,
+            category_id,
+            subcategory_id,
+            region,
+            func.sum(models.OrderDetails.total_price),
+            func.sum(models.Products.cost * models.OrderDetails.quantity),
+            func.sum(models.OrderDetails.quantity),
+            func.count(func.distinct(models.Orders.order_id)),
+        )
+        .select_from(models.Orders)
+        .join(
+            models.OrderDetails,
+            models.OrderDetails.order_id == models.Orders.order_id,
+        )
+        .join(models.Products, models.OrderDetails.product_id == models.Products.id)
+        .outerjoin(models.Address, models.Orders.address_id == models.Address.id)
+        .filter(*counted)
+        .group_by(day, category_id, subcategory_id, region)
+        .all()
+    )
+    orders = (
+        db.query(
+            day,
+            region,
+            func.count(models.Orders.order_id),
+            func.sum(models.Orders.total),
+            func.sum(models.Orders.delivery_fee),
+        )
+        .select_from(models.Orders)
+        .outerjoin(models.Address, models.Orders.address_id == models.Address.id)
+        .filter(*counted)
+        .group_by(day, region)
+        .all()
+    )
+
+    for model in (models.SalesDailyRollup, models.SalesDailyOrderRollup):
+        db.query(model).filter(model.day >= start, model.day < end).delete(
+            synchronize_session=False
+        )
+    db.add_all(
+        models.SalesDailyRollup(
+            day=_as_date(d),
+            category_id=c,
+            subcategory_id=s,
+            region=r,
+            revenue=revenue or 0,
+            cost=cost or 0,
+            units=units or 0,
+            order_count=count,
+        )
+        for d, c, s, r, revenue, cost, units, count in lines
+    )
+    db.add_all(
+        models.SalesDailyOrderRollup(
+            day=_as_date(d),
+            region=r,
+            order_count=count,
+            revenue=revenue or 0,
+            delivery_fees=fees or 0,
+        )
+        for d, r, count, revenue, fees in orders
+    )
+    db.commit()
+    return len(lines)
+
+
+def rebuild_sales_rollups(
+    db: Session, start: Optional[date] = None, end: Optional[date] = None
+) -> int:
+    """Recompute rollups for [start, end] from order history, a month at a time"""
+    if start is None or end is None:
+        first, last = db.query(
+            func.min(models.Orders.datetime), func.max(models.Orders.datetime)
+        ).one()
+        if first is None:
+            return 0
+        start = start or first.date()
+        end = end or last.date()
+
+    rebuilt = 0
+    window_start = start
+    while window_start <= end:
+        window_end = min(
+            window_start + timedelta(days=BACKFILL_WINDOW_DAYS), end + timedelta(days=1)
+        )
+        rebuilt += _rebuild_window(db, window_start, window_end)
+        logger.info(f"Rebuilt sales rollups {window_start} to {window_end}")
+        window_start = window_end
+    return rebuilt
+
+
+def _money(value) -> float:
+    return float(value or 0)
+
+
+@router.get("/sales")
+async def get_sales_analytics(
+    db: db_dependency,
+    current_user: dict = Depends(require_admin_or_above),
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    group_by: str = Query("day", pattern="^(day|category|subcategory|region)$"),
+    category_id: Optional[int] = Query(None),
+    subcategory_id: Optional[int] = Query(None),
+    region: Optional[str] = Query(None),
+):
+    """Revenue, cost, margin, units and orders for a date range (inclusive)"""
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=400, detail="end_date must not be before start_date"
+        )
+
+    try:
+        Lines = models.SalesDailyRollup
+        line_filters = [Lines.day >= start_date, Lines.day <= end_date]
+        if category_id is not None:
+            line_filters.append(Lines.category_id == category_id)
+        if subcategory_id is not None:
+            line_filters.append(Lines.subcategory_id == subcategory_id)
+        if region is not None:
+            line_filters.append(Lines.region == region)
+
+        group_column = {
+            "day": Lines.day,
+            "category": Lines.category_id,
+            "subcategory": Lines.subcategory_id,
+            "region": Lines.region,
+        }[group_by]
+        rows = (
+            db.query(
+                group_column.label("key"),
+                func.sum(Lines.revenue).label("revenue"),
+                func.sum(Lines.cost).label("cost"),
+                func.sum(Lines.units).label("units"),
+                func.sum(Lines.order_count).label("order_count"),
+            )
+            .filter(*line_filters)
+            .group_by(group_column)
+            .order_by(group_column)
+            .all()
+        )
+
+        # Orders spanning several categories are counted once per category in
+        # the line rollup, so exact order counts come from the order rollup
+        # whenever no category filter applies
+        order_counts = {}
+        totals_orders = delivery_fees = None
+        exact_orders = category_id is None and subcategory_id is None
+        if exact_orders:
+            Orders = models.SalesDailyOrderRollup
+            order_filters = [Orders.day >= start_date, Orders.day <= end_date]
+            if region is not None:
+                order_filters.append(Orders.region == region)
+            totals_orders, delivery_fees = (
+                db.query(func.sum(Orders.order_count), func.sum(Orders.delivery_fees))
+                .filter(*order_filters)
+                .one()
+            )
+            if group_by in ("day", "region"):
+                order_column = Orders.day if group_by == "day" else Orders.region
+                order_counts = dict(
+                    db.query(order_column, func.sum(Orders.order_count))
+                    .filter(*order_filters)
+                    .group_by(order_column)
+                    .all()
+                )
+
+        names = {}
+        if group_by == "category":
+            names = dict(db.query(models.Categories.id, models.Categories.name).all())
+        elif group_by == "subcategory":
+            names = dict(
+                db.query(models.Subcategory.id, models.Subcategory.name).all()
+            )
+
+        results = []
+        for row in rows:
+            key = _as_date(row.key) if group_by == "day" else row.key
+            revenue, cost = _money(row.revenue), _money(row.cost)
+            item = {
+                group_by: key.isoformat() if group_by == "day" else key,
+                "revenue": revenue,
+                "cost": cost,
+                "margin": round(revenue - cost, 2),
+                "units": _money(row.units),
+                "order_count": int(order_counts.get(row.key, row.order_count) or 0),
+            }
+            if names:
+                item["name"] = names.get(row.key)
+            results.append(item)
+
+        revenue = round(sum(item["revenue"] for item in results), 2)
+        cost = round(sum(item["cost"] for item in results), 2)
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "group_by": group_by,
+            "totals": {
+                "revenue": revenue,
+                "cost": cost,
+                "margin": round(revenue - cost, 2),
+                "margin_percent": round((revenue - cost) / revenue * 100, 2)
+                if revenue
+                else 0.0,
+                "units": sum(item["units"] for item in results),
+                "orders": int(totals_orders or 0) if exact_orders else None,
+                "delivery_fees": _money(delivery_fees) if exact_orders else None,
+            },
+            "rows": results,
+        }
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error fetching sales analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch sales analytics")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild daily sales rollups")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        count = rebuild_sales_rollups(session, args.start, args.end)
+    logger.info(f"Rebuilt {count} sales rollup rows")
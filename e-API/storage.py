@@ -0,0 +1,302 @@
+"""
+Storage backends for uploaded blobs and how /uploads is served.
+
+Blobs are addressed by an uploads-relative key ("ab/cd/<sha256>.jpg") and
+image URLs are always stored as /uploads/<key>, so switching backends never
+rewrites the database. Select the backend with STORAGE_BACKEND:
+
+    local  files under UPLOAD_DIR (default)
+    s3     an S3-compatible bucket (AWS, or MinIO locally via S3_ENDPOINT_URL);
+           needs boto3 and the usual AWS_ACCESS_KEY_ID/AWS_SECRET_ACCESS_KEY
+
+Keys are content hashes, so every response for /uploads is marked immutable.
+With UPLOADS_ACCEL_REDIRECT_PREFIX set, /uploads answers with an
+X-Accel-Redirect to that internal location and the proxy sends the bytes:
+
+    location /protected-uploads/ { internal; alias /srv/e-API/uploads/; }
+
+Run this module directly to copy existing local uploads into the
+configured backend:
+    python storage.py
+"""
+
+import asyncio
+import logging
+import mimetypes
+import os
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from dotenv import load_dotenv
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import PlainTextResponse, RedirectResponse, Response
+
+load_dotenv()
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
+UPLOAD_DIR.mkdir(exist_ok=True)
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+UPLOADS_ACCEL_REDIRECT_PREFIX = os.getenv("UPLOADS_ACCEL_REDIRECT_PREFIX", "")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Renditions rendered by image_pipeline, keyed derived/<shard>/<stem>-<size>.<fmt>
+DERIVED_PREFIX = "derived/"
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    modified: float  # unix timestamp
+
+
+def content_type_for(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class LocalDiskStorage:
+    """Blobs as files under root, the layout uploads/ has always had"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def store(self, temp_path: Path, key: str) -> bool:
+        """Move a finished temp file to key; returns False if key already existed"""
+        target = self.root / key
+        if target.exists():
+            temp_path.unlink(missing_ok=True)
+            # Restart the GC grace period: the blob is about to be referenced again
+            os.utime(target)
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, target)
+        return True
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    def fetch(self, key: str, target: Path) -> None:
+        """Make target a private copy of key (a hard link; blobs are immutable)"""
+        os.link(self.root / key, target)
+
+    def delete(self, key: str) -> None:
+        (self.root / key).unlink(missing_ok=True)
+
+    def url(self, key: str) -> str:
+        return f"/uploads/{key}"
+
+    def iter_objects(self) -> Iterator[StoredObject]:
+        """Every file under root, one directory listing in memory at a time"""
+        stack = [str(self.root)]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        yield StoredObject(
+                            Path(entry.path).relative_to(self.root).as_posix(),
+                            stat.st_size,
+                            stat.st_mtime,
+                        )
+
+
+class S3Storage:
+    """Blobs in an S3-compatible bucket, uploaded with immutable cache headers"""
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        public_url: Optional[str] = None,
+    ):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3") from e
+
+        self.bucket = bucket
+        # MinIO and most stand-ins only support path-style addressing
+        config = Config(s3={"addressing_style": "path"}) if endpoint_url else None
+        self._client = boto3.client(
+            "s3", endpoint_url=endpoint_url, region_name=region, config=config
+        )
+        if public_url:
+            self.public_url = public_url.rstrip("/")
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f"https://{bucket}.s3.amazonaws.com"
+
+    def _extra_args(self, key: str) -> dict:
+        return {
+            "ContentType": content_type_for(key),
+            "CacheControl": IMMUTABLE_CACHE_CONTROL,
+        }
+
+    def store(self, temp_path: Path, key: str) -> bool:
+        """Upload a finished temp file to key; returns False if key already existed"""
+        try:
+            if self.exists(key):
+                # Copying onto itself bumps LastModified, restarting the GC grace period
+                self._client.copy_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    CopySource={"Bucket": self.bucket, "Key": key},
+                    MetadataDirective="REPLACE",
+                    **self._extra_args(key),
+                )
+                return False
+            self._client.upload_file(
+                str(temp_path), self.bucket, key, ExtraArgs=self._extra_args(key)
+            )
+            return True
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    def fetch(self, key: str, target: Path) -> None:
+        """Download key to target"""
+        self._client.download_file(self.bucket, key, str(target))
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    def iter_objects(self) -> Iterator[StoredObject]:
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket):
+            for item in page.get("Contents", []):
+                yield StoredObject(
+                    item["Key"], item["Size"], item["LastModified"].timestamp()
+                )
+
+
+def create_storage():
+    if STORAGE_BACKEND == "local":
+        return LocalDiskStorage(UPLOAD_DIR)
+    if STORAGE_BACKEND == "s3":
+        bucket = os.getenv("S3_BUCKET")
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return S3Storage(
+            bucket,
+            endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+            region=os.getenv("S3_REGION") or None,
+            public_url=os.getenv("S3_PUBLIC_URL") or None,
+        )
+    raise RuntimeError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+
+storage = create_storage()
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles whose responses may be cached forever (keys are content hashes)"""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def _key_from_scope(scope) -> Optional[str]:
+    # Mount hands sub-apps the remainder of the path (/ab/cd/<digest>.jpg)
+    key = scope["path"].lstrip("/")
+    parts = key.split("/")
+    # Refuse traversal and hidden files (in-progress .part uploads)
+    if not key or any(part in ("", "..") or part.startswith(".") for part in parts):
+        return None
+    return key
+
+
+class UploadRedirects:
+    """Answers /uploads/<key> without reading the blob in Python.
+
+    With an accel prefix the proxy serves the bytes from its internal
+    location; otherwise clients are redirected to the storage URL.
+    """
+
+    def __init__(self, backend, accel_prefix: str = ""):
+        self.backend = backend
+        self.accel_prefix = accel_prefix.rstrip("/")
+
+    async def __call__(self, scope, receive, send):
+        key = _key_from_scope(scope)
+        if scope.get("method") not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+        elif key is None:
+            response = PlainTextResponse("Not Found", status_code=404)
+        elif self.accel_prefix:
+            response = Response(
+                headers={
+                    "X-Accel-Redirect": f"{self.accel_prefix}/{key}",
+                    "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+                }
+            )
+        elif key.startswith(DERIVED_PREFIX) and not await asyncio.to_thread(
+            self.backend.exists, key
+        ):
+            # Renditions can be missing from a backend that never rendered or
+            # received them; don't cache a redirect to nothing for a year
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            response = RedirectResponse(
+                self.backend.url(key),
+                status_code=301,
+                headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL},
+            )
+        await response(scope, receive, send)
+
+
+def uploads_app():
+    """ASGI app to mount at /uploads for the configured backend"""
+    if UPLOADS_ACCEL_REDIRECT_PREFIX:
+        return UploadRedirects(storage, UPLOADS_ACCEL_REDIRECT_PREFIX)
+    if isinstance(storage, LocalDiskStorage):
+        return ImmutableStaticFiles(directory=storage.root)
+    return UploadRedirects(storage)
+
+
+def sync_local_uploads() -> int:
+    """Copy local uploads and their derivatives missing from the configured backend.
+
+    Returns the count. ProductImage.derivatives keeps its /uploads/derived/
+    URLs, so those files must move along with the originals.
+    """
+    if isinstance(storage, LocalDiskStorage):
+        return 0
+    copied = 0
+    for obj in LocalDiskStorage(UPLOAD_DIR).iter_objects():
+        if obj.key.startswith(".") or storage.exists(obj.key):
+            continue
+        source = UPLOAD_DIR / obj.key
+        # store() consumes its temp file, so hand it a hard link
+        temp_path = source.with_name(f".sync-{source.name}.part")
+        os.link(source, temp_path)
+        storage.store(temp_path, obj.key)
+        copied += 1
+    return copied
+
+
+if __name__ == "__main__":
+    count = sync_local_uploads()
+    logger.info(f"Copied {count} local uploads to {STORAGE_BACKEND} storage")
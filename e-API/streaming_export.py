@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+from fastapi.responses import StreamingResponse
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_FORMAT_PATTERN = "^(csv|ndjson)$"
+
+
+def encode_rows(
+    records: Iterable[Dict[str, Any]], columns: List[str], fmt: str
+) -> Iterator[str]:
+    """Encode dict records as CSV (with header) or NDJSON, one chunk per batch.
+
+    Records are buffered into ~64 KB chunks so the response isn't flushed
+    once per row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(columns)
+    for record in records:
+        if fmt == "csv":
+            writer.writerow([record.get(column) for column in columns])
+        else:
+            buffer.write(json.dumps(record, default=str))
+            buffer.write("\n")
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def streaming_download(chunks: Iterator[str], fmt: str, name: str) -> StreamingResponse:
+    """Wrap an export generator in an attachment response"""
+    filename = f"{name}-{datetime.utcnow():%Y%m%d%H%M%S}.{fmt}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
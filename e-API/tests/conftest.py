@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Modules live flat in e-API/; keep test uploads out of the working tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="uploads-test-"))
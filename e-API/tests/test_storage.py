@@ -0,0 +1,76 @@
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from storage import (
+    IMMUTABLE_CACHE_CONTROL,
+    ImmutableStaticFiles,
+    LocalDiskStorage,
+    UploadRedirects,
+)
+
+KEY = "ab/cd/abcd.jpg"
+
+
+def client_for(uploads_app):
+    return TestClient(Starlette(routes=[Mount("/uploads", uploads_app)]))
+
+
+def test_static_files_are_immutable(tmp_path):
+    (tmp_path / "ab" / "cd").mkdir(parents=True)
+    (tmp_path / KEY).write_bytes(b"image")
+    response = client_for(ImmutableStaticFiles(directory=tmp_path)).get(
+        f"/uploads/{KEY}"
+    )
+    assert response.status_code == 200
+    assert response.content == b"image"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+
+def test_accel_redirect_hands_key_to_proxy(tmp_path):
+    client = client_for(UploadRedirects(LocalDiskStorage(tmp_path), "/protected/"))
+    response = client.get(f"/uploads/{KEY}")
+    assert response.status_code == 200
+    assert response.headers["x-accel-redirect"] == f"/protected/{KEY}"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+
+class FakeBucket:
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+
+    def exists(self, key):
+        return key in self.keys
+
+    def url(self, key):
+        return f"https://cdn.example.com/{key}"
+
+
+def test_redirect_to_storage_url():
+    response = client_for(UploadRedirects(FakeBucket())).get(
+        f"/uploads/{KEY}", follow_redirects=False
+    )
+    assert response.status_code == 301
+    assert response.headers["location"] == f"https://cdn.example.com/{KEY}"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+
+def test_redirects_refuse_hidden_and_traversal_paths(tmp_path):
+    client = client_for(UploadRedirects(LocalDiskStorage(tmp_path), "/protected"))
+    for path in ("/uploads/.upload-x.part", "/uploads/ab/%2e%2e/cd/x.jpg", "/uploads/"):
+        response = client.get(path)
+        assert response.status_code == 404
+        assert "x-accel-redirect" not in response.headers
+    assert client.post(f"/uploads/{KEY}").status_code == 405
+
+
+def test_missing_derivative_is_not_redirected():
+    derived = "derived/ab/cd/abcd-thumb.webp"
+    client = client_for(UploadRedirects(FakeBucket()))
+    response = client.get(f"/uploads/{derived}", follow_redirects=False)
+    assert response.status_code == 404
+    assert "cache-control" not in response.headers
+
+    client = client_for(UploadRedirects(FakeBucket([derived])))
+    response = client.get(f"/uploads/{derived}", follow_redirects=False)
+    assert response.status_code == 301
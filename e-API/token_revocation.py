@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import RevokedToken
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "30"))
+# How far each sync looks back past the previous one. Must cover the longest
+# gap between a revocation's insert and its commit, plus clock skew between
+# workers (created_at is stamped by the worker that revoked).
+TOKEN_REVOCATION_SYNC_OVERLAP = timedelta(
+    seconds=float(os.getenv("TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS", "120"))
+)
+PURGE_BATCH_SIZE = 5000
+
+
+class RevocationCache:
+    """In-memory mirror of revoked_tokens, checked on every authenticated request.
+
+    Only tokens that are revoked *and* not yet expired are kept, so with
+    short-lived access tokens the set stays small and exact; no DB round trip
+    is needed per request. Revocations made on another worker show up here
+    after at most one sync interval.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, datetime] = {}
+        self._synced_at: Optional[datetime] = None
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def add(self, jti: str, expires_at: datetime):
+        self._revoked[jti] = expires_at
+
+    def sync(self, db: Session):
+        """Pull revocations recorded since the last sync and drop expired ones"""
+        now = datetime.utcnow()
+        query = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(
+            RevokedToken.expires_at > now
+        )
+        if self._synced_at is not None:
+            # Ids and timestamps are assigned before commit, so a row can land
+            # after rows that sort later; re-scan a window instead of a watermark
+            since = self._synced_at - TOKEN_REVOCATION_SYNC_OVERLAP
+            query = query.filter(RevokedToken.created_at >= since)
+        for row in query.all():
+            self._revoked[row.jti] = row.expires_at
+        self._synced_at = now
+        for jti in [j for j, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[jti]
+
+    def _sync_with_new_session(self):
+        with SessionLocal() as db:
+            self.sync(db)
+
+    async def run_sync_loop(self):
+        """Background task started with the app"""
+        while True:
+            try:
+                await asyncio.to_thread(self._sync_with_new_session)
+            except SQLAlchemyError as e:
+                logger.error(f"Token revocation sync failed: {str(e)}")
+            await asyncio.sleep(TOKEN_REVOCATION_SYNC_SECONDS)
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+revocation_cache = RevocationCache()
+
+
+def revoke_access_token(db: Session, jti: str, expires_at: datetime):
+    """Record a revocation and apply it to this worker immediately; caller commits"""
+    if not db.query(RevokedToken.id).filter(RevokedToken.jti == jti).first():
+        db.add(RevokedToken(jti=jti, expires_at=expires_at))
+    revocation_cache.add(jti, expires_at)
+
+
+def purge_expired_revocations(db: Session, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Delete revocations whose tokens have expired anyway"""
+    now = datetime.utcnow()
+    purged = 0
+    while True:
+        ids = [
+            row.id
+            for row in db.query(RevokedToken.id)
+            .filter(RevokedToken.expires_at < now)
+            .limit(batch_size)
+            .all()
+        ]
+        if not ids:
+            break
+        db.query(RevokedToken).filter(RevokedToken.id.in_(ids)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        purged += len(ids)
+    return purged
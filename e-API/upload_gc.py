@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Garbage collector for orphaned files under uploads/.
+
+Builds the set of referenced uploads from product_images in one streamed
+query, then lists the storage backend (an os.scandir walk for local disk,
+paginated listing for S3) and deletes blobs nobody references once they
+are older than the grace period (so images uploaded for a product form
+that is still being filled in survive). Derivatives under uploads/derived/
+live and die with their original. Memory is the referenced set plus one
+directory listing or page at a time.
+
+Product images are the only upload references in the database today;
+add any new referencing table to referenced_keys().
+
+Run it from cron, preferably with --dry-run first:
+    python upload_gc.py [--dry-run] [--grace-hours 24]
+"""
+
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Set
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+
+from auth import require_superadmin
+from background_jobs import Job, jobs
+from database import SessionLocal
+from image_pipeline import DERIVED_DIR
+from models import ProductImage, UploadBlob
+from storage import UPLOAD_DIR, storage
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/superadmin/uploads", tags=["Uploads"])
+
+UPLOAD_GC_GRACE_HOURS = float(os.getenv("UPLOAD_GC_GRACE_HOURS", "24"))
+REFERENCE_BATCH_SIZE = 5000
+BLOB_DELETE_BATCH_SIZE = 500
+PROGRESS_EVERY = 10000
+
+
+def upload_key(relative_path: str) -> str:
+    """Shard directory plus stem: 'ab/cd/<sha256>' for 'ab/cd/<sha256>.jpg'"""
+    stem, _, _ = relative_path.rpartition(".")
+    return stem or relative_path
+
+
+def derived_key(relative_path: str) -> str:
+    """Key of the original a derivative belongs to ('ab/cd/<sha>-thumb.webp')"""
+    stem = upload_key(relative_path)
+    base, _, _ = stem.rpartition("-")
+    return base or stem
+
+
+def referenced_keys(db: Session) -> Set[str]:
+    keys = set()
+    for (img_url,) in db.query(ProductImage.img_url).yield_per(REFERENCE_BATCH_SIZE):
+        if img_url and img_url.startswith("/uploads/"):
+            keys.add(upload_key(img_url[len("/uploads/") :]))
+    return keys
+
+
+def _forget_blobs(db: Session, digests):
+    # product_images is the source of truth; a deleted file's blob row goes too
+    db.query(UploadBlob).filter(UploadBlob.digest.in_(digests)).delete(
+        synchronize_session=False
+    )
+    db.commit()
+
+
+def collect_garbage(
+    db: Session,
+    dry_run: bool = False,
+    grace_hours: float = UPLOAD_GC_GRACE_HOURS,
+    job: Optional[Job] = None,
+) -> Dict[str, Any]:
+    """Delete unreferenced uploads older than grace_hours; returns a summary"""
+    keys = referenced_keys(db)
+    cutoff = time.time() - grace_hours * 3600
+    stats = {
+        "dry_run": dry_run,
+        "referenced": len(keys),
+        "scanned": 0,
+        "deleted": 0,
+        "bytes_freed": 0,
+        "kept_in_grace": 0,
+    }
+    derived_prefix = DERIVED_DIR.relative_to(UPLOAD_DIR).as_posix() + "/"
+    forgotten = []
+
+    for obj in storage.iter_objects():
+        stats["scanned"] += 1
+        if job and stats["scanned"] % PROGRESS_EVERY == 0:
+            job.report(stats["scanned"])
+
+        is_derivative = obj.key.startswith(derived_prefix)
+        if is_derivative:
+            key = derived_key(obj.key[len(derived_prefix) :])
+        else:
+            key = upload_key(obj.key)
+        if key in keys:
+            continue
+
+        if obj.modified > cutoff:
+            stats["kept_in_grace"] += 1
+            continue
+
+        stats["deleted"] += 1
+        stats["bytes_freed"] += obj.size
+        if dry_run:
+            logger.info(f"Would delete {obj.key}")
+            continue
+        storage.delete(obj.key)
+        if is_derivative:
+            continue
+        forgotten.append(obj.key.rsplit("/", 1)[-1].split(".", 1)[0])
+        if len(forgotten) >= BLOB_DELETE_BATCH_SIZE:
+            _forget_blobs(db, forgotten)
+            forgotten = []
+
+    if forgotten:
+        _forget_blobs(db, forgotten)
+    if job:
+        job.report(stats["scanned"], stats["scanned"])
+    logger.info(f"Upload GC finished: {stats}")
+    return stats
+
+
+@router.post("/gc", status_code=status.HTTP_202_ACCEPTED)
+async def start_upload_gc(
+    current_user: dict = Depends(require_superadmin),
+    dry_run: bool = Query(True),
+    grace_hours: float = Query(UPLOAD_GC_GRACE_HOURS, ge=1),
+):
+    """Start the orphaned-upload collector as a background job (dry run by default)"""
+
+    def run(job: Job):
+        with SessionLocal() as db:
+            return collect_garbage(db, dry_run, grace_hours, job)
+
+    job = jobs.running("upload_gc") or jobs.start("upload_gc", run, current_user["id"])
+    logger.info(
+        f"Upload GC job {job.id} started by superadmin {current_user['username']} (dry_run={dry_run})"
+    )
+    return {
+        "message": "Upload garbage collection started",
+        "job_id": job.id,
+        "status_url": f"/admin/jobs/{job.id}",
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Delete orphaned uploads")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--grace-hours", type=float, default=UPLOAD_GC_GRACE_HOURS)
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        collect_garbage(session, args.dry_run, args.grace_hours)
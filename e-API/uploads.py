@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import event, inspect, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from image_pipeline import link_for_render, prerender_derivatives
+from models import ProductImage, UploadBlob
+from storage import UPLOAD_DIR, storage
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+ALLOWED_IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif"}
+# jpeg and jpg are the same bytes; store both under one name
+CANONICAL_EXTENSIONS = {"jpeg": "jpg"}
+
+
+def blob_relative_path(digest: str, extension: str) -> str:
+    """uploads-relative path for a blob, fanned out as ab/cd/<digest>.<ext>"""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+
+def _copy_to_temp(source: BinaryIO, max_bytes: int) -> Tuple[Path, str, int]:
+    """Copy source to a temp file in UPLOAD_DIR chunk by chunk, aborting past max_bytes.
+
+    Returns the temp path, the SHA-256 of the content and its size.
+    """
+    # Same filesystem as the destination so the final rename is atomic
+    temp = tempfile.NamedTemporaryFile(
+        dir=UPLOAD_DIR, prefix=".upload-", suffix=".part", delete=False
+    )
+    temp_path = Path(temp.name)
+    digest = hashlib.sha256()
+    try:
+        with temp:
+            written = 0
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File size exceeds {max_bytes // (1024 * 1024)}MB limit",
+                    )
+                digest.update(chunk)
+                temp.write(chunk)
+        return temp_path, digest.hexdigest(), written
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def register_blob(db: Session, digest: str, url: str, size: int) -> str:
+    """Record a stored blob and return the URL on record for its digest.
+
+    That is url unless a concurrent upload of the same bytes under another
+    extension registered first; the caller commits.
+    """
+    blob = db.get(UploadBlob, digest)
+    if blob:
+        return blob.url
+    try:
+        with db.begin_nested():
+            db.add(UploadBlob(digest=digest, url=url, size=size, ref_count=0))
+    except IntegrityError:
+        # A locking read sees the row the other upload committed, whatever
+        # snapshot this transaction started with
+        blob = (
+            db.query(UploadBlob)
+            .filter(UploadBlob.digest == digest)
+            .with_for_update()
+            .one()
+        )
+        return blob.url
+    return url
+
+
+async def save_image_upload(file: UploadFile, db: Session) -> str:
+    """Validate and store an uploaded image by content hash; returns its URL.
+
+    Memory use is one chunk per upload whatever the file size, and the
+    copy runs on a worker thread so the event loop never blocks on disk.
+    Identical content is stored once and the existing URL returned.
+    Derivatives start rendering in the background.
+    """
+    if not (file.content_type or "").startswith("image/"):
+        raise HTTPException(status_code=400, detail="Only image files are allowed")
+    extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+    if extension not in ALLOWED_IMAGE_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported image format")
+    extension = CANONICAL_EXTENSIONS.get(extension, extension)
+
+    temp_path, digest, size = await asyncio.to_thread(
+        _copy_to_temp, file.file, MAX_UPLOAD_BYTES
+    )
+    blob = db.get(UploadBlob, digest)
+    # Blobs are keyed by content alone: the same bytes uploaded as .png and
+    # .jpg share the first upload's file, whose store() refreshes its mtime
+    url = blob.url if blob else f"/uploads/{blob_relative_path(digest, extension)}"
+    relative_path = url[len("/uploads/") :]
+    # Derivatives render in the background from a link to the temp file,
+    # since the storage backend takes ownership of it (S3 keeps no local copy)
+    render_source = await asyncio.to_thread(link_for_render, temp_path)
+    prerender_derivatives(url, render_source)
+    await asyncio.to_thread(storage.store, temp_path, relative_path)
+
+    url = register_blob(db, digest, url, size)
+    db.commit()
+    return url
+
+
+# Reference counting: every ProductImage row pointing at a blob's URL holds
+# one reference. Events run inside the flush, so counts commit atomically
+# with the rows. Bulk query.delete() bypasses them; upload_gc reconciles.
+def _adjust_refs(connection, url: Optional[str], delta: int):
+    if url:
+        connection.execute(
+            update(UploadBlob)
+            .where(UploadBlob.url == url)
+            .values(ref_count=UploadBlob.ref_count + delta)
+        )
+
+
+@event.listens_for(ProductImage, "after_insert")
+def _product_image_inserted(mapper, connection, target):
+    _adjust_refs(connection, target.img_url, 1)
+
+
+@event.listens_for(ProductImage, "after_delete")
+def _product_image_deleted(mapper, connection, target):
+    _adjust_refs(connection, target.img_url, -1)
+
+
+@event.listens_for(ProductImage, "after_update")
+def _product_image_updated(mapper, connection, target):
+    history = inspect(target).attrs.img_url.history
+    if history.has_changes():
+        _adjust_refs(connection, (history.deleted or [None])[0], -1)
+        _adjust_refs(connection, (history.added or [None])[0], 1)
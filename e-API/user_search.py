@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Trigram search over usernames and emails for the superadmin user screens.
+
+Every user is indexed by the distinct 3-character substrings of their
+lowercased username and email. A substring search intersects the posting
+lists of the term's trigrams through the primary key, then verifies and
+ranks only the candidates. Terms shorter than three characters fall back
+to prefix matches, which the unique username/email indexes can serve.
+
+Run this module directly to rebuild the index, e.g. after a restore:
+    python user_search.py
+"""
+
+import logging
+from typing import Iterable, Set, Tuple
+
+from sqlalchemy import case, func, insert, or_
+from sqlalchemy.orm import Query, Session
+
+from models import Users, UserSearchGram
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GRAM_SIZE = 3
+REBUILD_BATCH_SIZE = 2000
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def grams_for(*values: str) -> Set[str]:
+    grams = set()
+    for value in values:
+        value = (value or "").lower()
+        grams.update(
+            value[i : i + GRAM_SIZE] for i in range(len(value) - GRAM_SIZE + 1)
+        )
+    return grams
+
+
+def index_users(db: Session, users: Iterable[Tuple[int, str, str]]) -> None:
+    """Index (id, username, email) tuples; the caller commits"""
+    rows = [
+        {"gram": gram, "user_id": user_id}
+        for user_id, username, email in users
+        for gram in grams_for(username, email)
+    ]
+    if rows:
+        db.execute(insert(UserSearchGram), rows)
+
+
+def unindex_user(db: Session, user_id: int) -> None:
+    db.query(UserSearchGram).filter(UserSearchGram.user_id == user_id).delete(
+        synchronize_session=False
+    )
+
+
+def apply_user_search(query: Query, term: str) -> Query:
+    """Filter a Users query to matches of `term`, best matches first.
+
+    Ranking: exact username/email, then prefix, then substring matches.
+    """
+    term = term.strip().lower()
+    if not term:
+        return query
+
+    prefix = f"{_escape_like(term)}%"
+    if len(term) < GRAM_SIZE:
+        query = query.filter(
+            or_(
+                Users.username.like(prefix, escape="\\"),
+                Users.email.like(prefix, escape="\\"),
+            )
+        )
+    else:
+        grams = grams_for(term)
+        candidates = (
+            query.session.query(UserSearchGram.user_id)
+            .filter(UserSearchGram.gram.in_(grams))
+            .group_by(UserSearchGram.user_id)
+            .having(func.count() == len(grams))
+        )
+        # Sharing every trigram is necessary but not sufficient; verify
+        substring = f"%{_escape_like(term)}%"
+        query = query.filter(
+            Users.id.in_(candidates.scalar_subquery()),
+            or_(
+                func.lower(Users.username).like(substring, escape="\\"),
+                func.lower(Users.email).like(substring, escape="\\"),
+            ),
+        )
+
+    rank = case(
+        (or_(func.lower(Users.username) == term, func.lower(Users.email) == term), 0),
+        (
+            or_(
+                func.lower(Users.username).like(prefix, escape="\\"),
+                func.lower(Users.email).like(prefix, escape="\\"),
+            ),
+            1,
+        ),
+        else_=2,
+    )
+    return query.order_by(rank, Users.username)
+
+
+def rebuild_user_search_index(db: Session, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """Re-index every user in id order; returns the number of users indexed"""
+    db.query(UserSearchGram).delete(synchronize_session=False)
+    db.commit()
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(Users.id, Users.username, Users.email)
+            .filter(Users.id > last_id)
+            .order_by(Users.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        index_users(db, batch)
+        db.commit()
+        indexed += len(batch)
+        last_id = batch[-1].id
+    return indexed
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        count = rebuild_user_search_index(session)
+    logger.info(f"Indexed {count} users for search")
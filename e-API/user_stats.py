@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Incrementally maintained user counters (role x signup month) for the
+superadmin dashboard.
+
+Run this module directly to rebuild the counters from the users table,
+e.g. from a nightly cron:
+    python user_stats.py
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Dict, Optional
+
+from sqlalchemy import case, extract, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Role, Users, UserStat
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def month_start(when: Optional[datetime] = None) -> date:
+    return (when or datetime.now()).date().replace(day=1)
+
+
+def _as_role(role) -> Role:
+    return role if isinstance(role, Role) else Role(getattr(role, "value", role))
+
+
+def bump_user_stats(
+    db: Session, role, delta: int = 1, created_at: Optional[datetime] = None
+) -> None:
+    """Add `delta` to the counter for role/month; the caller commits"""
+    role = _as_role(role)
+    month = month_start(created_at)
+    updated = (
+        db.query(UserStat)
+        .filter(UserStat.role == role, UserStat.month == month)
+        .update({UserStat.count: UserStat.count + delta}, synchronize_session=False)
+    )
+    if updated:
+        return
+    try:
+        # First signup of the month; another request may create the row first
+        with db.begin_nested():
+            db.add(UserStat(role=role, month=month, count=delta))
+    except IntegrityError:
+        db.query(UserStat).filter(
+            UserStat.role == role, UserStat.month == month
+        ).update({UserStat.count: UserStat.count + delta}, synchronize_session=False)
+
+
+def read_user_stats(db: Session) -> Dict[str, Dict[str, int]]:
+    """Totals and this-month counts per role in one GROUP BY over user_stats"""
+    current_month = month_start()
+    rows = (
+        db.query(
+            UserStat.role,
+            func.sum(UserStat.count).label("total"),
+            func.sum(
+                case((UserStat.month == current_month, UserStat.count), else_=0)
+            ).label("this_month"),
+        )
+        .group_by(UserStat.role)
+        .all()
+    )
+    stats = {role.value: {"total": 0, "this_month": 0} for role in Role}
+    for row in rows:
+        stats[_as_role(row.role).value] = {
+            "total": int(row.total or 0),
+            "this_month": int(row.this_month or 0),
+        }
+    return stats
+
+
+def reconcile_user_stats(db: Session) -> int:
+    """Rebuild every counter from users; returns the number of counter rows"""
+    year = extract("year", Users.created_at)
+    month = extract("month", Users.created_at)
+    rows = (
+        db.query(Users.role, year.label("year"), month.label("month"), func.count())
+        .group_by(Users.role, year, month)
+        .all()
+    )
+    db.query(UserStat).delete(synchronize_session=False)
+    db.add_all(
+        UserStat(
+            role=_as_role(role),
+            # Rows without created_at are counted in the oldest possible month
+            month=date(int(y), int(m), 1) if y else date(1970, 1, 1),
+            count=count,
+        )
+        for role, y, m, count in rows
+    )
+    db.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        counters = reconcile_user_stats(session)
+    logger.info(f"Rebuilt {counters} user stat counters")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Hashed user tokens (email verification, password reset, refresh tokens).
+
+Run this module directly to purge expired tokens and access-token
+revocations, e.g. from a nightly cron:
+    python user_tokens.py
+"""
+
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from models import TokenPurpose, UserToken
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 5000
+
+
+def hash_token(raw_token: str) -> str:
+    """SHA-256 digest stored in place of the raw token"""
+    return hashlib.sha256(raw_token.encode()).hexdigest()
+
+
+def issue_token(
+    db: Session,
+    user_id: int,
+    purpose: TokenPurpose,
+    ttl: timedelta,
+    replace_existing: bool = True,
+) -> str:
+    """Create a token for the user, by default replacing any earlier one for
+    the same purpose (refresh tokens keep one per session instead).
+
+    Returns the raw token; the caller commits.
+    """
+    if replace_existing:
+        db.query(UserToken).filter(
+            UserToken.user_id == user_id, UserToken.purpose == purpose
+        ).delete(synchronize_session=False)
+    raw_token = secrets.token_urlsafe(32)
+    db.add(
+        UserToken(
+            user_id=user_id,
+            purpose=purpose,
+            token_hash=hash_token(raw_token),
+            expires_at=datetime.utcnow() + ttl,
+        )
+    )
+    return raw_token
+
+
+def find_token(
+    db: Session, raw_token: str, purpose: TokenPurpose
+) -> Optional[UserToken]:
+    """Look a token up by digest; expiry is left to the caller to report"""
+    return (
+        db.query(UserToken)
+        .filter(
+            UserToken.token_hash == hash_token(raw_token),
+            UserToken.purpose == purpose,
+        )
+        .first()
+    )
+
+
+def purge_expired_tokens(db: Session, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Delete expired tokens in bounded batches; returns the number removed"""
+    now = datetime.utcnow()
+    purged = 0
+    while True:
+        ids = [
+            row.id
+            for row in db.query(UserToken.id)
+            .filter(UserToken.expires_at < now)
+            .limit(batch_size)
+            .all()
+        ]
+        if not ids:
+            break
+        db.query(UserToken).filter(UserToken.id.in_(ids)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        purged += len(ids)
+    return purged
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    from token_revocation import purge_expired_revocations
+
+    with SessionLocal() as session:
+        count = purge_expired_tokens(session)
+        revocations = purge_expired_revocations(session)
+    logger.info(
+        f"Purged {count} expired user tokens and {revocations} expired revocations"
+    )
@@ -20,6 +20,7 @@ import { useShoppingCart } from "../context/ShoppingCartContext";
 import { toast } from "react-toastify";
 import { useFavorites } from "../context/FavoritesContext";
 import { useAuth } from "../context/AuthContext";
+import ProductPicture, { type ProductImageData } from "./ProductPicture";
 
 // Define types for our data
 type Category = {
@@ -53,15 +54,8 @@ type Product = {
   is_new: boolean;
   category: Category;
   subcategory?: Subcategory;
-  images: Array<{
-    id: number;
-    img_url: string;
-  }>;
-  reviews: Array<{
-    id: number;
-    rating: number;
-    comment: string;
-  }>;
+  images: Array<ProductImageData & { id: number }>;
+  rating_count: number;
 };
 
 const CategoryProductsPage = () => {
@@ -349,14 +343,8 @@ const CategoryProductsPage = () => {
     return matchesSearch && matchesPrice;
   });
 
-  // Helper to get average rating from reviews array or fallback to product.rating
-  const getAverageRating = (product: Product) => {
-    if (product.reviews && product.reviews.length > 0) {
-      const sum = product.reviews.reduce((acc, r) => acc + (r.rating || 0), 0);
-      return sum / product.reviews.length;
-    }
-    return product.rating || 0;
-  };
+  // Listings don't carry reviews; the API keeps the average in product.rating
+  const getAverageRating = (product: Product) => product.rating || 0;
 
   const sortedProducts = [...filteredProducts].sort(
     (a: Product, b: Product) => {
@@ -715,14 +703,16 @@ const CategoryProductsPage = () => {
       >
         {/* Image Section */}
         <div className="relative overflow-hidden group/image">
-          <img
-            src={getProductImage(product)}
+          <ProductPicture
+            image={product.images?.[0]}
+            size="thumb"
             alt={product.name}
+            fallbackSrc={
+              product.images?.length
+                ? "https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=400&h=400&fit=crop"
+                : getProductImage(product)
+            }
             className="w-full h-64 object-cover group-hover:scale-110 transition-transform duration-700"
-            onError={(e) => {
-              (e.target as HTMLImageElement).src =
-                "https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=400&h=400&fit=crop";
-            }}
           />
 
           {/* Enhanced Badges */}
@@ -817,7 +807,7 @@ const CategoryProductsPage = () => {
 
           {/* Rating */}
           <div className="mb-3">
-            {renderRating(product.rating, product.reviews?.length, product)}
+            {renderRating(product.rating, product.rating_count, product)}
           </div>
 
           {/* Price Section */}
@@ -8,6 +8,7 @@ import { jwtDecode } from "jwt-decode";
 import { useUserStats } from "../context/UserStatsContext";
 import { useFavorites } from "../context/FavoritesContext";
 import { toast } from "react-toastify";
+import ProductPicture, { type ProductImageData } from "./ProductPicture";
 
 interface Product {
   id: string;
@@ -17,6 +18,8 @@ interface Product {
   rating: number;
   reviews: number;
   img_url: string;
+  // First API image, for its thumbnail rendition
+  image?: ProductImageData;
   category: string;
   brand: string;
   inStock: boolean;
@@ -115,18 +118,15 @@ const ProductCard: React.FC<ProductCardProps> = ({
       {/* Image Container */}
       <div className="relative aspect-square overflow-hidden bg-gray-50">
         {/* Image */}
-        <img
-          src={product.img_url}
+        <ProductPicture
+          image={product.image ?? { img_url: product.img_url }}
+          size="thumb"
           alt={product.name}
+          fallbackSrc="https://images.unsplash.com/photo-1560472354-b33ff0c44a43?w=600&h=600&fit=crop"
           className={`w-full h-full object-cover transition-all duration-700 ${
             imageLoaded ? "opacity-100 scale-100" : "opacity-0 scale-105"
           } group-hover:scale-110`}
           onLoad={() => setImageLoaded(true)}
-          onError={(e) => {
-            (e.target as HTMLImageElement).src =
-              "https://images.unsplash.com/photo-1560472354-b33ff0c44a43?w=600&h=600&fit=crop";
-            setImageLoaded(true);
-          }}
         />
 
         {/* Image Loading Skeleton */}
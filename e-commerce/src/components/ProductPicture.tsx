@@ -0,0 +1,84 @@
+import React, { useEffect, useState } from "react";
+
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
+
+// An entry of a product's `images` as the API returns it. `derivatives`
+// maps size -> format -> URL and is null until the renditions are rendered.
+export interface ProductImageData {
+  img_url: string;
+  derivatives?: Record<string, Record<string, string>> | null;
+}
+
+// thumb is at most 320px on its long edge, medium 960px
+export type ImageSize = "thumb" | "medium";
+
+export const absoluteImageUrl = (url: string) =>
+  url.startsWith("http") ? url : `${API_BASE_URL}${url}`;
+
+interface ProductPictureProps {
+  image?: ProductImageData | null;
+  size: ImageSize;
+  alt: string;
+  // Shown when there is no image or neither rendition nor original loads
+  fallbackSrc: string;
+  className?: string;
+  onLoad?: () => void;
+  onClick?: () => void;
+}
+
+// Serves the WebP rendition where supported, the JPEG one otherwise, and
+// the original only if the renditions are missing, so lists never download
+// multi-megabyte uploads.
+const ProductPicture: React.FC<ProductPictureProps> = ({
+  image,
+  size,
+  alt,
+  fallbackSrc,
+  className,
+  onLoad,
+  onClick,
+}) => {
+  // 0: rendition, 1: original, 2: fallback
+  const [attempt, setAttempt] = useState(0);
+  useEffect(() => setAttempt(0), [image?.img_url]);
+
+  const rendition = image?.derivatives?.[size];
+  // Hero images load eagerly; lists and thumbnails wait until scrolled into view
+  const loading = size === "thumb" ? "lazy" : undefined;
+
+  if (image && attempt === 0 && rendition?.jpeg) {
+    return (
+      <picture>
+        {rendition.webp && (
+          <source
+            type="image/webp"
+            srcSet={absoluteImageUrl(rendition.webp)}
+          />
+        )}
+        <img
+          src={absoluteImageUrl(rendition.jpeg)}
+          alt={alt}
+          className={className}
+          loading={loading}
+          onLoad={onLoad}
+          onClick={onClick}
+          onError={() => setAttempt(1)}
+        />
+      </picture>
+    );
+  }
+
+  return (
+    <img
+      src={image && attempt < 2 ? absoluteImageUrl(image.img_url) : fallbackSrc}
+      alt={alt}
+      className={className}
+      loading={loading}
+      onLoad={onLoad}
+      onClick={onClick}
+      onError={attempt < 2 ? () => setAttempt(2) : undefined}
+    />
+  );
+};
+
+export default ProductPicture;
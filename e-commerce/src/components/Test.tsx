@@ -19,6 +19,7 @@ import { useShoppingCart } from "../context/ShoppingCartContext";
 import { toast } from "react-toastify";
 import { useFavorites } from "../context/FavoritesContext";
 import { useAuth } from "../context/AuthContext";
+import ProductPicture, { type ProductImageData } from "./ProductPicture";
 
 // Define types for our data
 type Category = {
@@ -46,15 +47,8 @@ type Product = {
     name: string;
     description: string | null;
   };
-  images: Array<{
-    id: number;
-    img_url: string;
-  }>;
-  reviews: Array<{
-    id: number;
-    rating: number;
-    comment: string;
-  }>;
+  images: Array<ProductImageData & { id: number }>;
+  rating_count: number;
 };
 
 type Banner = {
@@ -142,14 +136,8 @@ const ModernEcommerceHomepage = () => {
     }
   };
 
-  // Helper to get average rating from reviews array or fallback to product.rating
-  const getAverageRating = (product: Product) => {
-    if (product.reviews && product.reviews.length > 0) {
-      const sum = product.reviews.reduce((acc, r) => acc + (r.rating || 0), 0);
-      return sum / product.reviews.length;
-    }
-    return product.rating || 0;
-  };
+  // Listings don't carry reviews; the API keeps the average in product.rating
+  const getAverageRating = (product: Product) => product.rating || 0;
 
   // Fetch featured products (one per category, max 6)
   const fetchFeaturedProducts = async () => {
@@ -605,9 +593,11 @@ const ModernEcommerceHomepage = () => {
                         className="bg-white rounded-2xl shadow-lg hover:shadow-2xl transition-all duration-300 transform hover:scale-105 overflow-hidden group"
                       >
                         <div className="relative">
-                          <img
-                            src={getProductImage(product)}
+                          <ProductPicture
+                            image={product.images?.[0]}
+                            size="thumb"
                             alt={product.name}
+                            fallbackSrc={getProductImage(product)}
                             className="w-full h-64 object-cover group-hover:scale-110 transition-transform duration-300"
                           />
                           <div className="absolute top-4 left-4 flex flex-col gap-2">
@@ -678,7 +668,7 @@ const ModernEcommerceHomepage = () => {
                             </div>
                             <span className="text-sm text-gray-600 ml-2">
                               ({getAverageRating(product).toFixed(1)}) •{" "}
-                              {product.reviews?.length || 0}
+                              {product.rating_count || 0}
                             </span>
                           </div>
 
@@ -754,9 +744,11 @@ const ModernEcommerceHomepage = () => {
                           }
                         >
                           <div className="relative">
-                            <img
-                              src={getProductImage(product)}
+                            <ProductPicture
+                              image={product.images?.[0]}
+                              size="thumb"
                               alt={product.name}
+                              fallbackSrc={getProductImage(product)}
                               className="w-16 h-16 object-cover rounded-lg group-hover:scale-105 transition-transform duration-200"
                             />
                             <div className="absolute -top-2 -left-2 bg-gradient-to-r from-yellow-400 to-orange-500 text-white text-xs font-bold rounded-full w-6 h-6 flex items-center justify-center">
@@ -782,7 +774,7 @@ const ModernEcommerceHomepage = () => {
                               </div>
                               <span className="text-xs text-gray-600 ml-1">
                                 {getAverageRating(product).toFixed(1)} (
-                                {product.reviews?.length || 0})
+                                {product.rating_count || 0})
                               </span>
                             </div>
                             <div className="flex items-center mt-1">
@@ -1,4 +1,5 @@
 import React, { createContext, useContext, useState, useEffect } from "react";
+import axios, { type AxiosError, type InternalAxiosRequestConfig } from "axios";
 import { jwtDecode } from "jwt-decode";
 
 interface JwtPayload {
@@ -12,12 +13,94 @@ interface AuthContextType {
   isAuthenticated: boolean;
   token: string | null;
   role: string | null;
-  login: (token: string) => void;
+  login: (token: string, refreshToken?: string | null) => void;
   logout: () => void;
 }
 
 const AuthContext = createContext<AuthContextType | undefined>(undefined);
 
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
+// Renew the access token this long before it expires
+const REFRESH_MARGIN_MS = 60 * 1000;
+// Fired in this tab when the stored tokens change ("storage" only reaches other tabs)
+const TOKENS_CHANGED_EVENT = "auth-tokens-changed";
+
+const storeTokens = (token: string, refreshToken?: string | null) => {
+  localStorage.setItem("token", token);
+  localStorage.setItem("isLoggedIn", "true");
+  if (refreshToken) {
+    localStorage.setItem("refreshToken", refreshToken);
+  } else {
+    localStorage.removeItem("refreshToken");
+  }
+  window.dispatchEvent(new Event(TOKENS_CHANGED_EVENT));
+};
+
+const clearTokens = () => {
+  localStorage.removeItem("token");
+  localStorage.removeItem("refreshToken");
+  localStorage.removeItem("isLoggedIn");
+  window.dispatchEvent(new Event(TOKENS_CHANGED_EVENT));
+};
+
+let refreshInFlight: Promise<string | null> | null = null;
+
+// The refresh token rotates on use and the server accepts it only once, so
+// every caller in this tab shares a single /auth/refresh request.
+const refreshAccessToken = (): Promise<string | null> => {
+  if (refreshInFlight) return refreshInFlight;
+  const refreshToken = localStorage.getItem("refreshToken");
+  if (!refreshToken) return Promise.resolve(null);
+
+  refreshInFlight = (async () => {
+    try {
+      const response = await axios.post(`${API_BASE_URL}/auth/refresh`, {
+        refresh_token: refreshToken,
+      });
+      storeTokens(response.data.access_token, response.data.refresh_token);
+      return response.data.access_token as string;
+    } catch (err) {
+      // Another tab may have rotated the same refresh token first
+      const stored = localStorage.getItem("refreshToken");
+      if (stored && stored !== refreshToken) {
+        return localStorage.getItem("token");
+      }
+      console.error("Session refresh failed:", err);
+      clearTokens();
+      return null;
+    } finally {
+      refreshInFlight = null;
+    }
+  })();
+  return refreshInFlight;
+};
+
+type RetriableRequestConfig = InternalAxiosRequestConfig & {
+  _authRetried?: boolean;
+};
+
+// Retry API calls rejected with 401 once, after renewing the access token
+axios.interceptors.response.use(undefined, async (error: AxiosError) => {
+  const config = error.config as RetriableRequestConfig | undefined;
+  const authorization = config?.headers?.Authorization;
+  if (
+    error.response?.status !== 401 ||
+    !config ||
+    config._authRetried ||
+    !config.url?.startsWith(API_BASE_URL) ||
+    config.url.startsWith(`${API_BASE_URL}/auth/`) ||
+    typeof authorization !== "string" ||
+    !authorization.startsWith("Bearer ")
+  ) {
+    return Promise.reject(error);
+  }
+  const newToken = await refreshAccessToken();
+  if (!newToken) return Promise.reject(error);
+  config._authRetried = true;
+  config.headers.Authorization = `Bearer ${newToken}`;
+  return axios(config);
+});
+
 export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({
   children,
 }) => {
@@ -29,34 +112,36 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({
   );
   const [role, setRole] = useState<string | null>(null);
 
-  // Decode token and check expiration
+  // Decode token and renew it before it expires
   useEffect(() => {
-    if (token) {
-      try {
-        const decoded: JwtPayload = jwtDecode(token);
-        if (decoded.exp * 1000 < Date.now()) {
-          // Token is expired
-          setToken(null);
-          setRole(null);
-          setIsAuthenticated(false);
-          localStorage.removeItem("token");
-          localStorage.removeItem("isLoggedIn");
-        } else {
-          setRole(decoded.role);
-          setIsAuthenticated(true);
-        }
-      } catch (err) {
-        console.error("Invalid token:", err);
-        setToken(null);
-        setRole(null);
-        setIsAuthenticated(false);
-        localStorage.removeItem("token");
-        localStorage.removeItem("isLoggedIn");
-      }
-    } else {
+    if (!token) {
       setRole(null);
       setIsAuthenticated(false);
+      return;
     }
+
+    let decoded: JwtPayload;
+    try {
+      decoded = jwtDecode(token);
+    } catch (err) {
+      console.error("Invalid token:", err);
+      clearTokens();
+      return;
+    }
+
+    const expiresInMs = decoded.exp * 1000 - Date.now();
+    if (expiresInMs > 0) {
+      setRole(decoded.role);
+      setIsAuthenticated(true);
+    }
+    // Renew shortly before expiry (an expired token right away); sessions
+    // from before refresh tokens simply end when the token expires
+    const refreshable = !!localStorage.getItem("refreshToken");
+    const timer = window.setTimeout(
+      () => (refreshable ? refreshAccessToken() : clearTokens()),
+      Math.max(refreshable ? expiresInMs - REFRESH_MARGIN_MS : expiresInMs, 0)
+    );
+    return () => window.clearTimeout(timer);
   }, [token]);
 
   // Sync with localStorage changes
@@ -67,16 +152,34 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({
     };
 
     window.addEventListener("storage", handleStorageChange);
-    return () => window.removeEventListener("storage", handleStorageChange);
+    window.addEventListener(TOKENS_CHANGED_EVENT, handleStorageChange);
+    return () => {
+      window.removeEventListener("storage", handleStorageChange);
+      window.removeEventListener(TOKENS_CHANGED_EVENT, handleStorageChange);
+    };
   }, []);
 
-  const login = (newToken: string) => {
-    localStorage.setItem("token", newToken);
-    localStorage.setItem("isLoggedIn", "true");
+  const login = (newToken: string, refreshToken?: string | null) => {
+    storeTokens(newToken, refreshToken);
     setToken(newToken);
   };
 
   const logout = () => {
+    const currentToken = localStorage.getItem("token");
+    if (currentToken) {
+      // Revoke server-side too; keepalive lets it finish if the page navigates away
+      fetch(`${API_BASE_URL}/auth/logout`, {
+        method: "POST",
+        keepalive: true,
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${currentToken}`,
+        },
+        body: JSON.stringify({
+          refresh_token: localStorage.getItem("refreshToken"),
+        }),
+      }).catch(() => {});
+    }
     localStorage.clear();
     setToken(null);
     setRole(null);
@@ -76,6 +76,7 @@ interface ApiResponse<T> {
   pages?: number;
   detail?: string;
   access_token?: string;
+  refresh_token?: string;
 }
 
 const SuperAdminDashboard: React.FC = () => {
@@ -202,7 +203,7 @@ const SuperAdminDashboard: React.FC = () => {
         }
       );
       if (response.access_token) {
-        login(response.access_token);
+        login(response.access_token, response.refresh_token);
         toast.success("Login successful!");
       }
     } catch (error: any) {
@@ -13,6 +13,7 @@ interface LoginFormData {
 
 interface ApiResponse {
   access_token: string;
+  refresh_token?: string;
 }
 
 interface Alert {
@@ -70,7 +71,7 @@ const Login: React.FC = () => {
       });
 
       showAlert("success", "Login successful! Redirecting...");
-      login(response.data.access_token);
+      login(response.data.access_token, response.data.refresh_token);
 
       // Check if there's a redirect after login
       const redirectPath = sessionStorage.getItem("redirectAfterLogin");
@@ -21,6 +21,9 @@ import { useAuth } from "../context/AuthContext";
 import { useUserStats } from "../context/UserStatsContext";
 import { useFavorites } from "../context/FavoritesContext";
 import { toast } from "react-toastify";
+import ProductPicture, {
+  type ProductImageData,
+} from "../components/ProductPicture";
 
 // Types
 interface Product {
@@ -30,7 +33,11 @@ interface Product {
   originalPrice?: number;
   rating: number;
   reviews: number;
+  ratingHistogram?: Record<number, number>;
+  // Originals (full size, for the zoom modal) and the API entries whose
+  // renditions the page and thumbnails use
   images: string[];
+  pictures: ProductImageData[];
   category: string;
   brand: string;
   inStock: boolean;
@@ -82,6 +89,10 @@ const ProductDetail: React.FC = () => {
   const [product, setProduct] = useState<Product | null>(null);
   const [relatedProducts, setRelatedProducts] = useState<Product[]>([]);
   const [reviews, setReviews] = useState<Review[]>([]);
+  // Cursor for the next page of reviews; null when all are loaded
+  const [reviewsCursor, setReviewsCursor] = useState<string | null>(null);
+  const [loadingMoreReviews, setLoadingMoreReviews] =
+    useState<boolean>(false);
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
   const [selectedImageIndex, setSelectedImageIndex] = useState<number>(0);
@@ -101,12 +112,6 @@ const ProductDetail: React.FC = () => {
   const [isProcessingFavorite, setIsProcessingFavorite] =
     useState<boolean>(false);
 
-  const calculateAverageRating = (reviews: Review[]): number => {
-    if (!reviews || reviews.length === 0) return 0;
-    const totalRating = reviews.reduce((sum, review) => sum + review.rating, 0);
-    return totalRating / reviews.length;
-  };
-
   useEffect(() => {
     const fetchProduct = async () => {
       setLoading(true);
@@ -147,30 +152,23 @@ const ProductDetail: React.FC = () => {
           });
         }
 
-        // Fetch reviews first to calculate rating
-        let fetchedReviews: Review[] = [];
-        try {
-          const reviewsRes = await axios.get(
-            `${API_BASE_URL}/products/${data.id}/reviews`
-          );
-          fetchedReviews = reviewsRes.data;
-          setReviews(fetchedReviews);
-        } catch {
-          setReviews([]);
-        }
-
-        // Calculate rating from reviews
-        const calculatedRating = calculateAverageRating(fetchedReviews);
+        // The detail response carries the newest page of reviews; older
+        // ones are paged in with the cursor
+        setReviews(data.reviews || []);
+        setReviewsCursor(data.reviews_next_cursor || null);
 
-        // Compose product object with calculated rating
+        // Rating, count and histogram are maintained by the server over
+        // all reviews, not just the loaded page
         const prod: Product = {
           id: data.id,
           name: data.name,
           price: data.price,
           originalPrice: data.original_price,
-          rating: calculatedRating, // Use calculated rating
-          reviews: fetchedReviews.length, // Use actual review count
+          rating: data.rating || 0,
+          reviews: data.rating_count || 0,
+          ratingHistogram: data.rating_histogram || {},
           images,
+          pictures: data.images || [],
           category: data.category?.name || "Uncategorized",
           brand: data.brand || "Unknown",
           inStock: data.stock_quantity > 0,
@@ -195,32 +193,15 @@ const ProductDetail: React.FC = () => {
             (p: any) => p.id !== data.id
           );
 
-          // Fetch reviews for each related product to calculate ratings
-          const relatedProductsWithRatings = await Promise.all(
-            relItems.map(async (item: any) => {
-              let itemRating = 0;
-              let itemReviewCount = 0;
-
-              try {
-                const itemReviewsRes = await axios.get(
-                  `${API_BASE_URL}/products/${item.id}/reviews`
-                );
-                const itemReviews = itemReviewsRes.data;
-                itemRating = calculateAverageRating(itemReviews);
-                itemReviewCount = itemReviews.length;
-              } catch {
-                // If reviews fetch fails, keep default values
-                itemRating = 0;
-                itemReviewCount = 0;
-              }
-
+          const relatedProductsWithRatings: Product[] = relItems.map(
+            (item: any) => {
               return {
                 id: item.id,
                 name: item.name,
                 price: item.price,
                 originalPrice: item.original_price,
-                rating: itemRating, // Use calculated rating
-                reviews: itemReviewCount, // Use actual review count
+                rating: item.rating || 0,
+                reviews: item.rating_count || 0,
                 images:
                   item.images && item.images.length > 0
                     ? item.images.map((img: any) =>
@@ -231,6 +212,7 @@ const ProductDetail: React.FC = () => {
                     : [
                         "https://images.unsplash.com/photo-1560472354-b33ff0c44a43?w=400&h=400&fit=crop",
                       ],
+                pictures: item.images || [],
                 category: item.category?.name || "Uncategorized",
                 brand: item.brand || "Unknown",
                 inStock: item.stock_quantity > 0,
@@ -243,7 +225,7 @@ const ProductDetail: React.FC = () => {
                 createdAt: item.created_at,
                 specifications: {},
               };
-            })
+            }
           );
 
           setRelatedProducts(relatedProductsWithRatings);
@@ -259,6 +241,23 @@ const ProductDetail: React.FC = () => {
     fetchProduct();
   }, [id, API_BASE_URL, isAuthenticated, token]);
 
+  const loadMoreReviews = async () => {
+    if (!product || !reviewsCursor || loadingMoreReviews) return;
+    setLoadingMoreReviews(true);
+    try {
+      const res = await axios.get(
+        `${API_BASE_URL}/products/${product.id}/reviews`,
+        { params: { cursor: reviewsCursor } }
+      );
+      setReviews((prev) => [...prev, ...res.data]);
+      setReviewsCursor(res.headers["x-next-cursor"] || null);
+    } catch {
+      toast.error("Failed to load more reviews");
+    } finally {
+      setLoadingMoreReviews(false);
+    }
+  };
+
   const handleAddToCart = (): void => {
     if (!product) return;
     if (getItemQuantity(product.id) >= product.stockQuantity) {
@@ -443,9 +442,11 @@ const ProductDetail: React.FC = () => {
           {/* Product Images */}
           <div className="space-y-4">
             <div className="relative bg-white rounded-lg overflow-hidden shadow-lg">
-              <img
-                src={product.images[selectedImageIndex]}
+              <ProductPicture
+                image={product.pictures[selectedImageIndex]}
+                size="medium"
                 alt={product.name}
+                fallbackSrc={product.images[selectedImageIndex]}
                 className="w-full h-96 object-cover cursor-pointer"
                 onClick={() => setShowImageModal(true)}
               />
@@ -495,9 +496,11 @@ const ProductDetail: React.FC = () => {
                         : "border-gray-200"
                     }`}
                   >
-                    <img
-                      src={image}
+                    <ProductPicture
+                      image={product.pictures[index]}
+                      size="thumb"
                       alt={`${product.name} ${index + 1}`}
+                      fallbackSrc={image}
                       className="w-full h-full object-cover"
                     />
                   </button>
@@ -719,6 +722,31 @@ const ProductDetail: React.FC = () => {
 
             {activeTab === "reviews" && (
               <div className="space-y-6">
+                {product.reviews > 0 && product.ratingHistogram && (
+                  <div className="space-y-2 max-w-md">
+                    {[5, 4, 3, 2, 1].map((star) => {
+                      const count = product.ratingHistogram?.[star] || 0;
+                      return (
+                        <div key={star} className="flex items-center gap-3">
+                          <span className="text-sm text-gray-600 w-10">
+                            {star} ★
+                          </span>
+                          <div className="flex-1 h-2 bg-gray-200 rounded-full overflow-hidden">
+                            <div
+                              className="h-full bg-yellow-400"
+                              style={{
+                                width: `${(count / product.reviews) * 100}%`,
+                              }}
+                            />
+                          </div>
+                          <span className="text-sm text-gray-600 w-10 text-right">
+                            {count}
+                          </span>
+                        </div>
+                      );
+                    })}
+                  </div>
+                )}
                 {reviews.length > 0 ? (
                   reviews.map((review) => (
                     <div
@@ -751,6 +779,17 @@ const ProductDetail: React.FC = () => {
                     </p>
                   </div>
                 )}
+                {reviewsCursor && (
+                  <div className="text-center">
+                    <button
+                      onClick={loadMoreReviews}
+                      disabled={loadingMoreReviews}
+                      className="px-6 py-2 rounded-lg border border-gray-300 text-gray-700 hover:bg-gray-50 transition-colors disabled:opacity-50"
+                    >
+                      {loadingMoreReviews ? "Loading..." : "Show more reviews"}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
           </div>
@@ -809,9 +848,11 @@ const ProductDetail: React.FC = () => {
                           }
                           className="bg-white rounded-lg shadow-md overflow-hidden hover:shadow-lg transition-shadow cursor-pointer h-full"
                         >
-                          <img
-                            src={relatedProduct.images[0]}
+                          <ProductPicture
+                            image={relatedProduct.pictures[0]}
+                            size="thumb"
                             alt={relatedProduct.name}
+                            fallbackSrc={relatedProduct.images[0]}
                             className="w-full h-40 md:h-48 object-cover"
                           />
                           <div className="p-3 md:p-4">
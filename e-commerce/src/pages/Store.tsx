@@ -12,6 +12,7 @@ import { formatCurrency } from "../cart/formatCurrency";
 import { toast } from "react-toastify"; // Import toast
 import { useNavigate } from "react-router-dom";
 import ProductCard from "../components/ProductCard";
+import type { ProductImageData } from "../components/ProductPicture";
 import { useRef } from "react";
 
 interface Category {
@@ -19,24 +20,14 @@ interface Category {
   name: string;
 }
 
-interface ReviewObject {
-  rating: number;
-  comment: string;
-  id: string;
-  user_id: string;
-  product_id: string;
-  order_id: string;
-  created_at: string;
-}
-
 interface ApiProduct {
   id: string;
   name: string;
   price: number;
   original_price?: number;
   cost?: number;
-  rating?: number | ReviewObject[];
-  reviews?: number | ReviewObject[];
+  rating?: number;
+  rating_count?: number;
   img_url?: string;
   category?: { id: string; name: string };
   brand?: string;
@@ -46,7 +37,7 @@ interface ApiProduct {
   is_favorite?: boolean;
   description?: string;
   created_at: string;
-  images?: { img_url: string }[];
+  images?: ProductImageData[];
 }
 
 interface Product {
@@ -58,6 +49,7 @@ interface Product {
   reviews: number;
   images: string[];
   img_url: string;
+  image?: ProductImageData;
   category: string;
   brand: string;
   inStock: boolean;
@@ -86,30 +78,9 @@ const transformProduct = (apiProduct: ApiProduct): Product => {
       : new Date().getTime() - new Date(apiProduct.created_at).getTime() <
         30 * 24 * 60 * 60 * 1000;
 
-  // --- FIXED: Use reviews array for average rating if present ---
-  let ratingValue = 0;
-  if (Array.isArray(apiProduct.reviews) && apiProduct.reviews.length > 0) {
-    const ratings = apiProduct.reviews
-      .map((r: any) => (typeof r.rating === "number" ? r.rating : null))
-      .filter((r: number | null) => r !== null) as number[];
-    if (ratings.length > 0) {
-      ratingValue = ratings.reduce((a, b) => a + b, 0) / ratings.length;
-    }
-  } else if (typeof apiProduct.rating === "number") {
-    ratingValue = apiProduct.rating;
-  }
-
-  // Handle reviews count: if reviews is an array, use its length
-  let reviewsCount = 0;
-  if (typeof apiProduct.reviews === "number") {
-    reviewsCount = apiProduct.reviews;
-  } else if (
-    Array.isArray(apiProduct.reviews) &&
-    apiProduct.reviews &&
-    apiProduct.reviews.length > 0
-  ) {
-    reviewsCount = apiProduct.reviews.length;
-  }
+  // Listings don't carry reviews; the API keeps the average and count
+  const ratingValue = apiProduct.rating || 0;
+  const reviewsCount = apiProduct.rating_count || 0;
 
   // Build images array from API
   let images: string[] = [];
@@ -143,6 +114,7 @@ const transformProduct = (apiProduct: ApiProduct): Product => {
     reviews: reviewsCount,
     images,
     img_url: images[0],
+    image: apiProduct.images?.[0],
     category: apiProduct.category?.name || "Uncategorized",
     brand: apiProduct.brand || "Unknown",
     inStock: apiProduct.stock_quantity > 0,